@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 from django.urls import reverse_lazy
 
 LOGIN_URL = reverse_lazy("login")
@@ -46,6 +47,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so that it times the whole request
+    "pokepedia.metrics.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -59,10 +62,20 @@ ROOT_URLCONF = "examproject.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "pokepedia.metrics.DjangoTemplates",
         "DIRS": [os.path.join(BASE_DIR, "templates")],
-        "APP_DIRS": True,
         "OPTIONS": {
+            # templates are compiled once per process; while debugging, the
+            # autoreloader empties the cache when a template changes
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                )
+            ],
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -75,16 +88,71 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "examproject.wsgi.application"
 
+ASGI_APPLICATION = "examproject.asgi.application"
+
+# "asgi" serves the pokemon list and details with their async views; use it
+# when running under an ASGI server, e.g.,
+# `uvicorn examproject.asgi:application --workers 4`
+POKEPEDIA_SERVER_PROFILE = os.environ.get("POKEPEDIA_SERVER_PROFILE", "wsgi")
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
-
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# Set DATABASE_PROFILE to "postgres" to use PostgreSQL, configured with the
+# POSTGRES_* environment variables, instead of SQLite
+
+DATABASE_PROFILE = os.environ.get("DATABASE_PROFILE", "sqlite")
+
+if DATABASE_PROFILE == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("SQLITE_PATH", BASE_DIR / "db.sqlite3"),
+            "OPTIONS": {
+                # in WAL mode, readers and the writer do not block each other;
+                # writers wait for the lock for up to 20 seconds instead of
+                # failing with "database is locked"
+                "init_command": (
+                    "PRAGMA journal_mode=WAL;"
+                    "PRAGMA synchronous=NORMAL;"
+                    "PRAGMA busy_timeout=20000;"
+                    "PRAGMA mmap_size=268435456;"
+                ),
+                # transactions take the write lock when they begin, as a read
+                # lock that is upgraded later fails at once when it is busy
+                "transaction_mode": "IMMEDIATE",
+            },
+        }
     }
-}
+elif DATABASE_PROFILE == "postgres":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("POSTGRES_DB", "pokepedia"),
+            "USER": os.environ.get("POSTGRES_USER", "pokepedia"),
+            "PASSWORD": os.environ.get("POSTGRES_PASSWORD", ""),
+            "HOST": os.environ.get("POSTGRES_HOST", "localhost"),
+            "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+            # connections are kept between requests, and checked before reuse
+            "CONN_MAX_AGE": int(os.environ.get("POSTGRES_CONN_MAX_AGE", 60)),
+            "CONN_HEALTH_CHECKS": True,
+        }
+    }
+    # POSTGRES_POOL_SIZE uses a psycopg connection pool (`psycopg[pool]`)
+    # instead of persistent connections
+    if os.environ.get("POSTGRES_POOL_SIZE"):
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"]["OPTIONS"] = {
+            "pool": {
+                "min_size": 2,
+                "max_size": int(os.environ["POSTGRES_POOL_SIZE"]),
+                "timeout": 10,
+            }
+        }
+else:
+    raise ImproperlyConfigured(
+        f'DATABASE_PROFILE must be "sqlite" or "postgres", not "{DATABASE_PROFILE}"'
+    )
 
 
 # Password validation
@@ -106,6 +174,40 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/ref/settings/#caches
+# Set CACHE_BACKEND and CACHE_LOCATION to share the cache between processes,
+# e.g., `django.core.cache.backends.redis.RedisCache` and `redis://localhost:6379`
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", "pokepedia"),
+    }
+}
+if CACHES["default"]["BACKEND"].endswith("LocMemCache"):
+    # room for a cached pokemon and a few rendered fragments per pokemon
+    CACHES["default"]["OPTIONS"] = {"MAX_ENTRIES": 20000}
+
+# how long `PokemonDetailView` keeps a pokemon cached, in seconds
+POKEPEDIA_CACHE_TIMEOUT = 60 * 60 * 24
+
+# how long a process uses its type chart before checking whether another
+# process changed the types, in seconds
+POKEPEDIA_TYPE_CHART_CHECK_INTERVAL = 1.0
+
+# set POKEPEDIA_SNAPSHOT=1 to serve the pokemon list and details from an
+# in-memory copy of the pokedex, which each process reloads after a change,
+# instead of the database; see `pokepedia.snapshot`
+POKEPEDIA_SNAPSHOT = os.environ.get("POKEPEDIA_SNAPSHOT") == "1"
+
+# number of recent requests per url name that `RequestMetricsMiddleware`
+# computes percentiles over
+POKEPEDIA_METRICS_WINDOW = 1000
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -127,3 +229,13 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# PokeAPI response cache used by the `addpokemon` command
+
+POKEAPI_CACHE_DIR = os.environ.get("POKEAPI_CACHE_DIR", BASE_DIR / ".pokeapi-cache")
+
+# sprites downloaded by `addpokemon --download-sprites`, served by
+# `PokemonSpriteView`
+
+POKEPEDIA_SPRITE_DIR = os.environ.get("POKEPEDIA_SPRITE_DIR", BASE_DIR / "sprites")
@@ -1,16 +1,20 @@
 from django.contrib import admin
 
+from pokepedia.aggregates import GroupConcat
+from pokepedia.forms import PokemonForm
 from pokepedia.models import Pokemon, Type
 
 # Register your models here.
 
 
 class PokemonAdmin(admin.ModelAdmin):
+    form = PokemonForm
     fieldsets = [
         (
             "Details",
             {
                 "fields": [
+                    "pokedex_number",
                     "image",
                     "name",
                     "genus",
@@ -21,8 +25,9 @@ class PokemonAdmin(admin.ModelAdmin):
             },
         ),
         ("Types", {"fields": ["types"]}),
-        ("Evolutions", {"fields": ["evolutions"]}),
+        ("Evolutions", {"fields": ["evolves_from", "get_evolutions_list"]}),
     ]
+    readonly_fields = ["get_evolutions_list"]
     list_display = [
         "name",
         "flavor_text",
@@ -35,6 +40,10 @@ class PokemonAdmin(admin.ModelAdmin):
     list_filter = ["types", "genus"]
     search_fields = ["name"]
 
+    def get_queryset(self, request):
+        # `get_types` reads the prefetched types instead of querying every row
+        return super().get_queryset(request).prefetch_related("types")
+
 
 class TypeAdmin(admin.ModelAdmin):
     fieldsets = [
@@ -50,11 +59,28 @@ class TypeAdmin(admin.ModelAdmin):
                 "fields": ["weaknesses"],
             },
         ),
+        (
+            "Resistances",
+            {
+                "fields": ["resistances", "immunities"],
+            },
+        ),
     ]
     list_display = ["name", "get_weaknesses"]
     list_filter = ["weaknesses"]
     search_fields = ["name"]
 
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(weakness_names=GroupConcat("weaknesses__name"))
+        )
+
+    @admin.display(description="Weakness(es)")
+    def get_weaknesses(self, obj):
+        return obj.weakness_names or ""
+
 
 admin.site.register(Pokemon, PokemonAdmin)
 admin.site.register(Type, TypeAdmin)
@@ -0,0 +1,23 @@
+from django.db.models import Aggregate, CharField, Value
+
+
+class GroupConcat(Aggregate):
+    """
+    Joins the values of `expression` in each group into one string, with
+    SQLite's `GROUP_CONCAT()` (or `STRING_AGG()` on PostgreSQL).
+    """
+
+    function = "GROUP_CONCAT"
+    output_field = CharField()
+
+    def __init__(self, expression, delimiter=", ", **extra):
+        super().__init__(expression, Value(delimiter), **extra)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler,
+            connection,
+            function="STRING_AGG",
+            template="%(function)s(%(expressions)s)",
+            **extra_context,
+        )
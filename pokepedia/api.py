@@ -0,0 +1,252 @@
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.views.generic import View
+
+from pokepedia.models import Pokemon, Type
+from pokepedia.typechart import get_type_chart
+
+# fields read straight from `values()`, and fields assembled afterwards
+POKEMON_VALUE_FIELDS = [
+    "id",
+    "pokedex_number",
+    "name",
+    "image",
+    "genus",
+    "height",
+    "weight",
+    "flavor_text",
+]
+POKEMON_RELATED_FIELDS = [
+    "types",
+    "weaknesses",
+    "resistances",
+    "immunities",
+    "evolutions",
+]
+TYPE_VALUE_FIELDS = ["id", "name"]
+TYPE_RELATED_FIELDS = ["weaknesses", "resistances", "immunities"]
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+MAX_IDS = 500
+
+
+class APIError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def get_effectiveness_names(type_chart, field, type_names):
+    effectiveness = getattr(type_chart, f"get_{field}")(type_names)
+
+    return [name for name, multiplier in effectiveness]
+
+
+def serialize_pokemon(queryset, fields):
+    """
+    Returns a dict per pokemon of `queryset` with only `fields`.
+
+    Types and their damage relations come from the summary columns and the
+    cached type chart, and evolution families from one extra query, so the
+    number of queries does not depend on the number of pokemon.
+    """
+    value_fields = [field for field in POKEMON_VALUE_FIELDS if field in fields]
+    related_fields = [field for field in POKEMON_RELATED_FIELDS if field in fields]
+    rows = list(
+        queryset.values(
+            *dict.fromkeys(["id", "type_slots", "evolution_chain_id", *value_fields])
+        )
+    )
+
+    families = {}
+    if "evolutions" in fields:
+        for pokemon_id, chain_id, name in (
+            Pokemon.objects.filter(
+                evolution_chain_id__in={row["evolution_chain_id"] for row in rows}
+            )
+            .order_by("evolution_position", "pk")
+            .values_list("id", "evolution_chain_id", "name")
+        ):
+            families.setdefault(chain_id, []).append((pokemon_id, name))
+
+    type_chart = get_type_chart() if related_fields else None
+    results = []
+    for row in rows:
+        result = {field: row[field] for field in value_fields}
+        for field in related_fields:
+            if field == "types":
+                result["types"] = row["type_slots"]
+            elif field == "evolutions":
+                result["evolutions"] = [
+                    name
+                    for pokemon_id, name in families.get(row["evolution_chain_id"], [])
+                    if pokemon_id != row["id"]
+                ]
+            else:
+                result[field] = get_effectiveness_names(
+                    type_chart, field, row["type_slots"]
+                )
+        results.append(result)
+
+    return results
+
+
+def serialize_types(queryset, fields):
+    value_fields = [field for field in TYPE_VALUE_FIELDS if field in fields]
+    related_fields = [field for field in TYPE_RELATED_FIELDS if field in fields]
+    rows = list(queryset.values(*dict.fromkeys(["name", *value_fields])))
+
+    type_chart = get_type_chart() if related_fields else None
+    results = []
+    for row in rows:
+        result = {field: row[field] for field in value_fields}
+        for field in related_fields:
+            result[field] = get_effectiveness_names(type_chart, field, [row["name"]])
+        results.append(result)
+
+    return results
+
+
+class APIView(View):
+    """
+    Base of the read-only JSON endpoints.
+
+    `?fields=name,types` limits each object to the listed fields, and errors
+    are reported as `{"error": "..."}` with a 4xx status.
+    """
+
+    http_method_names = ["get", "head", "options"]
+    fields = []
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except APIError as err:
+            return JsonResponse({"error": str(err)}, status=err.status)
+
+    def get_fields(self):
+        fields = self.request.GET.get("fields")
+        if not fields:
+            return self.fields
+
+        fields = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown_fields = [field for field in fields if field not in self.fields]
+        if unknown_fields:
+            raise APIError(f"unknown fields: {', '.join(unknown_fields)}")
+
+        return fields
+
+    def get_int_parameter(self, name, default=None):
+        value = self.request.GET.get(name)
+        if value is None:
+            return default
+
+        try:
+            return int(value)
+        except ValueError:
+            raise APIError(f"`{name}` must be an integer")
+
+    def get_ids(self):
+        # `?ids=1,4,7`, or None for every object
+        ids = self.request.GET.get("ids")
+        if ids is None:
+            return None
+
+        try:
+            ids = [int(pk) for pk in ids.split(",") if pk.strip()]
+        except ValueError:
+            raise APIError("`ids` must be comma-separated integers")
+        if len(ids) > MAX_IDS:
+            raise APIError(f"at most {MAX_IDS} ids can be requested at once")
+
+        return ids
+
+    def serialize(self, queryset, fields):
+        raise NotImplementedError
+
+    def get_object_data(self, queryset, pk):
+        results = self.serialize(queryset.filter(pk=pk), self.get_fields())
+        if not results:
+            raise APIError("not found", status=404)
+
+        return results[0]
+
+    def get_list_data(self, queryset, url_name):
+        """
+        Returns a page of `queryset`, or the objects of `?ids=` in that order.
+
+        Pages are read by keyset: `next` links to `?after=<last id>`.
+        """
+        fields = self.get_fields()
+        ids = self.get_ids()
+        if ids is not None:
+            results = {
+                result["id"]: result
+                for result in self.serialize(
+                    queryset.filter(pk__in=ids), {"id", *fields}
+                )
+            }
+
+            return {
+                "results": [
+                    {field: results[pk][field] for field in fields}
+                    for pk in dict.fromkeys(ids)
+                    if pk in results
+                ]
+            }
+
+        limit = self.get_int_parameter("limit", DEFAULT_LIMIT)
+        if not 1 <= limit <= MAX_LIMIT:
+            raise APIError(f"`limit` must be between 1 and {MAX_LIMIT}")
+        after = self.get_int_parameter("after", 0)
+
+        # one extra row tells whether there is a next page, without a count
+        page = queryset.order_by("pk").filter(pk__gt=after)[: limit + 1]
+        results = self.serialize(page, {"id", *fields})
+        next_url = None
+        if len(results) > limit:
+            results = results[:limit]
+            parameters = self.request.GET.copy()
+            parameters["after"] = results[-1]["id"]
+            next_url = f"{reverse(url_name)}?{urlencode(parameters, doseq=True)}"
+
+        return {
+            "results": [
+                {field: result[field] for field in fields} for result in results
+            ],
+            "next": next_url,
+        }
+
+
+class PokemonAPIListView(APIView):
+    fields = POKEMON_VALUE_FIELDS + POKEMON_RELATED_FIELDS
+
+    def serialize(self, queryset, fields):
+        return serialize_pokemon(queryset, fields)
+
+    def get(self, request):
+        return JsonResponse(
+            self.get_list_data(Pokemon.objects.all(), "api-pokemon-list")
+        )
+
+
+class PokemonAPIDetailView(PokemonAPIListView):
+    def get(self, request, pk):
+        return JsonResponse(self.get_object_data(Pokemon.objects.all(), pk))
+
+
+class TypeAPIListView(APIView):
+    fields = TYPE_VALUE_FIELDS + TYPE_RELATED_FIELDS
+
+    def serialize(self, queryset, fields):
+        return serialize_types(queryset, fields)
+
+    def get(self, request):
+        return JsonResponse(self.get_list_data(Type.objects.all(), "api-type-list"))
+
+
+class TypeAPIDetailView(TypeAPIListView):
+    def get(self, request, pk):
+        return JsonResponse(self.get_object_data(Type.objects.all(), pk))
@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class PokepediaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pokepedia'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+
+        from pokepedia import signals  # noqa: F401
+        from pokepedia.metrics import install_query_recorder
+        from pokepedia.search import install_search_index
+        from pokepedia.snapshot import install_revision_triggers
+
+        post_migrate.connect(install_search_index, sender=self)
+        post_migrate.connect(install_revision_triggers, sender=self)
+        connection_created.connect(install_query_recorder)
@@ -0,0 +1,352 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from pokepedia.ingest import (
+    DEFAULT_BATCH_SIZE,
+    PokedexData,
+    delete_pokedex,
+    store_pokedex,
+    sync_pokedex,
+)
+from pokepedia.models import Pokemon, Type
+
+TYPE_NAMES = [
+    "normal",
+    "fire",
+    "water",
+    "grass",
+    "electric",
+    "ice",
+    "fighting",
+    "poison",
+    "ground",
+    "flying",
+    "psychic",
+    "bug",
+    "rock",
+    "ghost",
+    "dragon",
+    "dark",
+    "steel",
+    "fairy",
+]
+SYLLABLES = (
+    "bul char squir pi ka chu saur mander tle ee vee geo dude mew two zu bat ra "
+    "tata sand shrew ni do ran clef vul pix jiggly puff odd ish gloom para sect "
+    "veno nat dig lett meo wth psy duck man key grow lithe"
+).split()
+
+# (weight, chain shape) of generated evolution chains; a shape lists the
+# number of pokemon evolving from each pokemon of the previous stage
+CHAIN_SHAPES = [
+    (30, []),
+    (30, [1]),
+    (30, [1, 1]),
+    (7, [2]),
+    (3, [8]),
+]
+
+
+def get_type_resource(rng, name):
+    others = [type_name for type_name in TYPE_NAMES if type_name != name]
+    relations = rng.sample(others, rng.randint(2, 7))
+    immunity_count = 1 if rng.random() < 0.2 else 0
+
+    def named(names):
+        return [{"name": type_name} for type_name in names]
+
+    return {
+        "name": name,
+        "damage_relations": {
+            "double_damage_from": named(relations[immunity_count : 3 + immunity_count]),
+            "half_damage_from": named(relations[3 + immunity_count :]),
+            "no_damage_from": named(relations[:immunity_count]),
+        },
+    }
+
+
+def get_pokemon_resources(rng, number, name):
+    type_names = rng.sample(TYPE_NAMES, 2 if rng.random() < 0.5 else 1)
+    pokemon = {
+        "id": number,
+        "name": name,
+        "sprites": {"front_default": f"https://example.com/sprites/{number}.png"},
+        "height": rng.randint(1, 40),
+        "weight": rng.randint(1, 2000),
+        "types": [{"type": {"name": type_name}} for type_name in type_names],
+    }
+    species = {
+        "genera": [{"language": {"name": "en"}, "genus": f"{name.title()} Pokemon"}],
+        "flavor_text_entries": [
+            {
+                "language": {"name": "en"},
+                "flavor_text": " ".join(rng.choices(SYLLABLES, k=12)),
+            }
+        ],
+    }
+
+    return pokemon, species
+
+
+def get_chain_resource(chain_id, names, shape):
+    # builds the nested chain of `names`, stage by stage, following `shape`
+    root = {"species": {"name": names[0]}, "evolves_to": []}
+    stage = [root]
+    position = 1
+    for fan_out in shape:
+        next_stage = []
+        for node in stage:
+            for _ in range(fan_out):
+                if position == len(names):
+                    break
+                evolution = {"species": {"name": names[position]}, "evolves_to": []}
+                node["evolves_to"].append(evolution)
+                next_stage.append(evolution)
+                position += 1
+        stage = next_stage
+
+    return {"id": chain_id, "chain": root}
+
+
+class SyntheticPokedex:
+    """
+    A deterministic made-up pokedex of `size` pokemon, with 18 types, half of
+    the pokemon having two types, and evolution chains of one to nine pokemon.
+    """
+
+    def __init__(self, size, seed=0):
+        rng = random.Random(seed)
+        self.types = [get_type_resource(rng, name) for name in TYPE_NAMES]
+
+        names = set()
+        self.entries = []
+        while len(self.entries) < size:
+            name = "".join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+            if name not in names:
+                names.add(name)
+                number = len(self.entries) + 1
+                self.entries.append(get_pokemon_resources(rng, number, name))
+
+        # each pokemon's chain, in pokedex order
+        self.chains = []
+        shapes = [shape for _, shape in CHAIN_SHAPES]
+        weights = [weight for weight, _ in CHAIN_SHAPES]
+        position = 0
+        while position < size:
+            shape = rng.choices(shapes, weights)[0]
+            chain_size = min(1 + sum_fan_out(shape), size - position)
+            chain_names = [
+                pokemon["name"]
+                for pokemon, _ in self.entries[position : position + chain_size]
+            ]
+            chain = get_chain_resource(len(self.chains) + 1, chain_names, shape)
+            self.chains.extend([chain] * chain_size)
+            position += chain_size
+
+    def iter_batches(self, batch_size=DEFAULT_BATCH_SIZE):
+        """Yields `PokedexData` batches, the first of them with the types."""
+        for start in range(0, len(self.entries), batch_size):
+            data = PokedexData()
+            if start == 0:
+                for type_resource in self.types:
+                    data.add_type(type_resource)
+            for pokemon, species in self.entries[start : start + batch_size]:
+                data.add_pokemon(pokemon, species)
+            for chain in {
+                chain["id"]: chain for chain in self.chains[start : start + batch_size]
+            }.values():
+                data.add_evolution_chain(chain)
+
+            yield data
+
+
+def sum_fan_out(shape):
+    stage_size = 1
+    total = 0
+    for fan_out in shape:
+        stage_size *= fan_out
+        total += stage_size
+
+    return total
+
+
+def get_latency_summary(latencies):
+    if len(latencies) < 2:
+        return {"p50_ms": latencies[0] * 1000, "p95_ms": latencies[0] * 1000}
+
+    percentiles = statistics.quantiles(latencies, n=20, method="inclusive")
+
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentiles[18] * 1000,
+    }
+
+
+def time_ingestion(pokedex, batch_size=DEFAULT_BATCH_SIZE):
+    """Stores `pokedex` like `addpokemon`, then syncs it unchanged like `--sync`."""
+    results = []
+    for scenario, store in [
+        ("ingest", store_pokedex),
+        ("sync-unchanged", sync_pokedex),
+    ]:
+        started_at = time.perf_counter()
+        for data in pokedex.iter_batches(batch_size):
+            store(data)
+        elapsed = time.perf_counter() - started_at
+
+        results.append(
+            {
+                "scenario": scenario,
+                "seconds": elapsed,
+                "pokemon_per_second": len(pokedex.entries) / elapsed,
+            }
+        )
+
+    return results
+
+
+def get_page_scenarios(rng):
+    """Returns `(scenario, function returning a url, clears the cache)` to time."""
+    pokemon_ids = list(Pokemon.objects.order_by("pk").values_list("pk", flat=True))
+    names = list(Pokemon.objects.values_list("name", flat=True)[:1000])
+    type_ids = list(Type.objects.values_list("pk", flat=True))
+    list_url = reverse("pokemon-list")
+    changelist_url = reverse("admin:pokepedia_pokemon_changelist")
+
+    return [
+        ("list", lambda: list_url, False),
+        ("list-last-page", lambda: f"{list_url}?page=last", False),
+        (
+            "list-after",
+            lambda: f"{list_url}?after={rng.choice(pokemon_ids)}",
+            False,
+        ),
+        (
+            "search",
+            lambda: f"{list_url}?pokemon_name={rng.choice(names)[:3]}",
+            False,
+        ),
+        (
+            "search-type",
+            lambda: f"{list_url}?pokemon_type={rng.choice(type_ids)}",
+            False,
+        ),
+        (
+            "filter-types",
+            lambda: f"{list_url}?"
+            + "&".join(f"pokemon_type={type_id}" for type_id in rng.sample(type_ids, 2))
+            + "&type_match=all",
+            False,
+        ),
+        (
+            "filter-weakness-height",
+            lambda: f"{list_url}?weak_to={rng.choice(type_ids)}"
+            f"&min_height={rng.randint(1, 20)}&max_height={rng.randint(20, 40)}",
+            False,
+        ),
+        (
+            "detail-cold",
+            lambda: reverse("pokemon-details", args=[rng.choice(pokemon_ids)]),
+            True,
+        ),
+        (
+            "detail-warm",
+            lambda: reverse("pokemon-details", args=[pokemon_ids[0]]),
+            False,
+        ),
+        ("api-list", lambda: reverse("api-pokemon-list"), False),
+        ("admin-changelist", lambda: changelist_url, False),
+        (
+            "admin-search",
+            lambda: f"{changelist_url}?q={rng.choice(names)[:3]}",
+            False,
+        ),
+    ]
+
+
+def time_pages(repeat, seed=0):
+    """
+    Requests every page scenario `repeat` times, after one warm-up request,
+    returning their latency percentiles and median query counts.
+    """
+    rng = random.Random(seed)
+    admin = User.objects.filter(is_superuser=True).first()
+    if admin is None:
+        admin = User.objects.create_superuser("benchmark", password=None)
+    # public pages are timed for anonymous visitors
+    client = Client()
+    admin_client = Client()
+    admin_client.force_login(admin)
+
+    results = []
+    for scenario, get_url, is_cold in get_page_scenarios(rng):
+        latencies = []
+        query_counts = []
+        for _ in range(repeat + 1):
+            url = get_url()
+            if is_cold:
+                cache.clear()
+
+            with CaptureQueriesContext(connection) as queries:
+                started_at = time.perf_counter()
+                if scenario.startswith("admin-"):
+                    response = admin_client.get(url)
+                else:
+                    response = client.get(url)
+                if response.streaming:
+                    b"".join(response.streaming_content)
+                latencies.append(time.perf_counter() - started_at)
+            query_counts.append(len(queries))
+
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} answered with status {response.status_code}")
+
+        results.append(
+            {
+                "scenario": scenario,
+                **get_latency_summary(latencies[1:]),
+                "queries": statistics.median(query_counts[1:]),
+            }
+        )
+
+    return results
+
+
+def run_benchmark(size, repeat, seed=0, batch_size=DEFAULT_BATCH_SIZE):
+    """Fills the database with a `SyntheticPokedex` of `size` and times it."""
+    pokedex = SyntheticPokedex(size, seed)
+    # without the signals `QuerySet.delete()` sends for every pokemon
+    delete_pokedex()
+    cache.clear()
+
+    results = time_ingestion(pokedex, batch_size) + time_pages(repeat, seed)
+    for result in results:
+        result["size"] = size
+
+    return results
+
+
+def compare_results(results, baseline):
+    """
+    Yields `(result, baseline result, ratio)` for every result also in
+    `baseline`, with `ratio` its time over the baseline's.
+    """
+    baseline_results = {
+        (result["size"], result["scenario"]): result for result in baseline
+    }
+    for result in results:
+        previous = baseline_results.get((result["size"], result["scenario"]))
+        if previous is None:
+            continue
+
+        key = "seconds" if "seconds" in result else "p50_ms"
+        ratio = result[key] / previous[key] if previous[key] else 1.0
+        yield result, previous, ratio
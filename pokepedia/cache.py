@@ -0,0 +1,170 @@
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from pokepedia.metrics import record_cache_lookup
+from pokepedia.models import Pokemon
+
+GENERATION_KEY = "pokepedia:generation"
+DEFAULT_TIMEOUT = 60 * 60 * 24
+
+
+class CacheStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        record_cache_lookup(hit)
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def as_dict(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def reset(self):
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+
+
+stats = CacheStats()
+
+
+def get_cache():
+    return caches[getattr(settings, "POKEPEDIA_CACHE_ALIAS", "default")]
+
+
+def get_generation(cache):
+    # bumped to drop every cached pokemon at once, e.g., when a type changes
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, 1, timeout=None)
+        generation = cache.get(GENERATION_KEY, 1)
+
+    return generation
+
+
+def get_pokemon_key(generation, pk):
+    return f"pokepedia:pokemon:{generation}:{pk}"
+
+
+def load_pokemon(pk):
+    """
+    Returns pokemon `pk` with everything `pokemon-details.html` reads from the
+    database prefetched, or None if there is no such pokemon.
+    """
+    pokemon = Pokemon.objects.filter(pk=pk).first()
+    if pokemon is not None:
+        # cached along with the pokemon
+        pokemon.evolution_tree
+
+    return pokemon
+
+
+def get_cached_pokemon(pk, version, updated_at):
+    """
+    Returns pokemon `pk` from the cache, loading and caching it on a miss.
+
+    Cached pokemon are rendered without any query: types and their damage
+    relations come from the summary fields and the process's type chart.
+
+    Entries keep the `version` and `updated_at` they were loaded at, and only
+    hit when those are the pokemon's current ones, as other processes change
+    pokemon without dropping this process's entries, and reloading a pokedex
+    starts its versions over.
+    """
+    cache = get_cache()
+    key = get_pokemon_key(get_generation(cache), pk)
+
+    entry = cache.get(key)
+    pokemon = entry[1] if entry and entry[0] == (version, updated_at) else None
+    stats.record(pokemon is not None)
+    if pokemon is None:
+        pokemon = load_pokemon(pk)
+        if pokemon is not None:
+            cache.set(
+                key,
+                ((pokemon.version, pokemon.updated_at), pokemon),
+                getattr(settings, "POKEPEDIA_CACHE_TIMEOUT", DEFAULT_TIMEOUT),
+            )
+
+    return pokemon
+
+
+async def aget_generation(cache):
+    generation = await cache.aget(GENERATION_KEY)
+    if generation is None:
+        await cache.aadd(GENERATION_KEY, 1, timeout=None)
+        generation = await cache.aget(GENERATION_KEY, 1)
+
+    return generation
+
+
+async def aload_pokemon(pk):
+    pokemon = await Pokemon.objects.filter(pk=pk).afirst()
+    if pokemon is not None:
+        await pokemon.aload_evolution_tree()
+
+    return pokemon
+
+
+async def aget_cached_pokemon(pk, version, updated_at):
+    """Async counterpart of `get_cached_pokemon()`."""
+    cache = get_cache()
+    key = get_pokemon_key(await aget_generation(cache), pk)
+
+    entry = await cache.aget(key)
+    pokemon = entry[1] if entry and entry[0] == (version, updated_at) else None
+    stats.record(pokemon is not None)
+    if pokemon is None:
+        pokemon = await aload_pokemon(pk)
+        if pokemon is not None:
+            await cache.aset(
+                key,
+                ((pokemon.version, pokemon.updated_at), pokemon),
+                getattr(settings, "POKEPEDIA_CACHE_TIMEOUT", DEFAULT_TIMEOUT),
+            )
+
+    return pokemon
+
+
+def _delete_pokemon(pokemon_ids):
+    cache = get_cache()
+    generation = get_generation(cache)
+    cache.delete_many([get_pokemon_key(generation, pk) for pk in pokemon_ids])
+
+
+def _clear_pokemon():
+    cache = get_cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        # expired or evicted, so anything cached under it is unreachable anyway
+        cache.add(GENERATION_KEY, 1, timeout=None)
+
+
+def invalidate_pokemon(pokemon_ids):
+    """
+    Drops the cached `pokemon_ids`, right away and again once the current
+    transaction commits, so a request that read the old rows in between
+    cannot leave them cached.
+    """
+    pokemon_ids = list(pokemon_ids)
+    if pokemon_ids:
+        _delete_pokemon(pokemon_ids)
+        transaction.on_commit(partial(_delete_pokemon, pokemon_ids))
+
+
+def clear_pokemon_cache(**kwargs):
+    """Drops every cached pokemon; doubles as a signal receiver."""
+    _clear_pokemon()
+    transaction.on_commit(_clear_pokemon)
@@ -0,0 +1,265 @@
+import gzip
+import json
+from itertools import batched
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+
+from pokepedia.ingest import (
+    DAMAGE_RELATIONS,
+    POKEMON_FIELDS,
+    PokedexData,
+    delete_pokedex,
+    store_pokedex,
+    sync_pokedex,
+)
+from pokepedia.models import Pokemon, Type
+from pokepedia.sprites import SpriteStore
+
+FORMAT = "pokepedia-dex"
+VERSION = 1
+# pokemon per query when exporting, and per transaction when importing
+DEFAULT_BATCH_SIZE = 1000
+# columns of the pokemon rows; types are listed in slot order
+POKEMON_COLUMNS = ["name", *POKEMON_FIELDS, "sprite", "type_slots"]
+# items of each kind of record, its kind included
+RECORD_LENGTHS = {"type": 3, "pokemon": 2, "chain": 3}
+
+
+class DexFormatError(ValueError):
+    pass
+
+
+def write_record(dex_file, record):
+    dex_file.write(json.dumps(record, separators=(",", ":")))
+    dex_file.write("\n")
+
+
+def get_chain_nodes(chain_ids):
+    """Returns `(api id, [(name, evolves from, stage), ...])` of each chain."""
+    nodes = {}
+    for chain_id, api_id, name, evolves_from, stage in (
+        Pokemon.objects.filter(evolution_chain__in=chain_ids)
+        .order_by("evolution_chain", "evolution_position")
+        .values_list(
+            "evolution_chain",
+            "evolution_chain__api_id",
+            "name",
+            "evolves_from__name",
+            "evolution_stage",
+        )
+    ):
+        nodes.setdefault(chain_id, (api_id, []))[1].append([name, evolves_from, stage])
+
+    return nodes.values()
+
+
+def export_pokedex(path, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Writes the types, pokemon and evolution chains to a gzipped JSON Lines
+    file at `path`, and returns the number of pokemon written.
+
+    The first line describes the format and the pokemon columns; the other
+    lines are `["type", name, {relation: [type names]}]`, `["pokemon",
+    [values]]` and `["chain", api id, [[name, evolves from, stage], ...]]`
+    records. Pokemon are read `batch_size` at a time, and each chain is
+    written right after its last pokemon, so neither side holds the whole
+    pokedex in memory.
+    """
+    # the pokemon each chain is complete after
+    last_pokemon_ids = dict(
+        Pokemon.objects.filter(evolution_chain__isnull=False)
+        .values("evolution_chain")
+        .annotate(last_pokemon_id=Max("pk"))
+        .values_list("last_pokemon_id", "evolution_chain")
+    )
+
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8") as dex_file:
+        write_record(
+            dex_file,
+            {"format": FORMAT, "version": VERSION, "pokemon_columns": POKEMON_COLUMNS},
+        )
+
+        # related type names of each type, per damage relation
+        relations = {field: {} for field in DAMAGE_RELATIONS}
+        for field in DAMAGE_RELATIONS:
+            through = getattr(Type, field).through
+            for type_name, related_name in through.objects.values_list(
+                "from_type__name", "to_type__name"
+            ).order_by("pk"):
+                relations[field].setdefault(type_name, []).append(related_name)
+        for type_name in Type.objects.order_by("pk").values_list("name", flat=True):
+            write_record(
+                dex_file,
+                [
+                    "type",
+                    type_name,
+                    {
+                        field: relations[field].get(type_name, [])
+                        for field in DAMAGE_RELATIONS
+                    },
+                ],
+            )
+
+        rows = (
+            Pokemon.objects.order_by("pk")
+            .values_list("pk", *POKEMON_COLUMNS)
+            .iterator(chunk_size=batch_size)
+        )
+        for batch in batched(rows, batch_size):
+            chain_ids = []
+            for pokemon_id, *values in batch:
+                write_record(dex_file, ["pokemon", values])
+                if pokemon_id in last_pokemon_ids:
+                    chain_ids.append(last_pokemon_ids[pokemon_id])
+            for api_id, nodes in get_chain_nodes(chain_ids):
+                write_record(dex_file, ["chain", api_id, nodes])
+            count += len(batch)
+
+    return count
+
+
+def read_records(path):
+    with gzip.open(path, "rt", encoding="utf-8") as dex_file:
+        try:
+            header = json.loads(next(dex_file, "null"))
+        except (OSError, ValueError) as error:
+            raise DexFormatError(f"not a pokedex file: {error}")
+        if not isinstance(header, dict) or header.get("format") != FORMAT:
+            raise DexFormatError("not a pokedex file")
+        if header.get("version") != VERSION:
+            raise DexFormatError(f"unsupported version {header.get('version')}")
+
+        yield header
+        for line_number, line in enumerate(dex_file, 2):
+            try:
+                yield line_number, json.loads(line)
+            except ValueError as error:
+                raise DexFormatError(f"line {line_number}: {error}")
+
+
+def parse_record(record, columns, sprite_store):
+    """
+    Returns the kind of a record of a pokedex file and its values: `(type
+    name, relations)`, `(pokemon, type names)` or `(api id, nodes)`. Raises
+    `ValueError`, `KeyError` or `TypeError` when the record is not one.
+    """
+    if not isinstance(record, list) or not record:
+        raise ValueError("not a record")
+    kind = record[0]
+    if kind not in RECORD_LENGTHS:
+        raise ValueError(f"unknown record {kind!r}")
+    if len(record) != RECORD_LENGTHS[kind]:
+        raise ValueError(f"{kind} record with {len(record)} items")
+
+    if kind == "type":
+        type_name, relations = record[1:]
+        if not isinstance(relations, dict):
+            raise ValueError("type relations are not an object")
+        return kind, (type_name, relations)
+    if kind == "pokemon":
+        values = record[1]
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(f"pokemon without its {len(columns)} columns")
+        fields = dict(zip(columns, values))
+        type_names = fields.pop("type_slots")
+        if not isinstance(type_names, list):
+            raise ValueError("pokemon types are not a list")
+        if fields["sprite"] and sprite_store.get_path(fields["sprite"]) is None:
+            fields["sprite"] = ""
+        return kind, (Pokemon(**fields), type_names)
+
+    api_id, nodes = record[1:]
+    nodes = [tuple(node) for node in nodes]
+    if any(len(node) != 3 for node in nodes):
+        raise ValueError("chain node without a name, evolves from and stage")
+    return kind, (api_id, nodes)
+
+
+def iter_pokedex_batches(path, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Yields `(data, hand-made chains)` batches of at most `batch_size`
+    pokemon read from a file written by `export_pokedex()`, the first of
+    them with all the types.
+
+    Chains created by hand have no PokeAPI id for `PokedexData`, and are
+    yielded as lists of nodes instead. Sprites are not in the file, so those
+    missing from this host's `SpriteStore` are dropped, and their pokemon
+    show their remote `image` instead.
+    """
+    sprite_store = SpriteStore(settings.POKEPEDIA_SPRITE_DIR)
+    records = read_records(path)
+    columns = next(records).get("pokemon_columns")
+    if not isinstance(columns, list) or sorted(columns) != sorted(POKEMON_COLUMNS):
+        raise DexFormatError(f"line 1: unexpected pokemon columns {columns!r}")
+
+    data, hand_made_chains = PokedexData(), []
+    for line_number, record in records:
+        try:
+            kind, values = parse_record(record, columns, sprite_store)
+        except (KeyError, TypeError, ValueError) as error:
+            raise DexFormatError(f"line {line_number}: {error}")
+
+        if kind == "type":
+            data.add_type_relations(*values)
+        elif kind == "pokemon":
+            if len(data.pokemon) == batch_size:
+                yield data, hand_made_chains
+                data, hand_made_chains = PokedexData(), []
+            data.add_pokemon_instance(*values)
+        else:
+            # chains follow their last pokemon, so all of them are stored by
+            # the end of this batch
+            api_id, nodes = values
+            if api_id is None:
+                hand_made_chains.append(nodes)
+            else:
+                data.evolution_chains[api_id] = nodes
+
+    yield data, hand_made_chains
+
+
+def store_hand_made_chain(nodes):
+    # chains created by hand are rare, so their pokemon are moved one at a
+    # time, like when `evolves_from` is edited
+    pokemon = Pokemon.objects.in_bulk([name for name, _, _ in nodes], field_name="name")
+    for name, evolves_from, _ in nodes:
+        if evolves_from is not None and name in pokemon and evolves_from in pokemon:
+            pokemon[name].evolves_from = pokemon[evolves_from]
+            pokemon[name].save(update_fields=["evolves_from"])
+
+
+def import_pokedex(path, batch_size=DEFAULT_BATCH_SIZE, sync=False):
+    """
+    Replaces the pokedex with the one written by `export_pokedex()` at
+    `path`, or with `sync`, updates it to match like `sync_pokedex()`;
+    returns the number of pokemon read.
+
+    Each batch of `batch_size` pokemon is stored in its own transaction; the
+    existing pokemon and types are only deleted along with the first one,
+    after the whole file was read once to check it, so an invalid file never
+    leaves a partial pokedex. A database error in a later batch still does;
+    importing the file again starts over.
+    """
+    if not sync:
+        for _ in iter_pokedex_batches(path, batch_size):
+            pass
+
+    count = 0
+    for position, (data, hand_made_chains) in enumerate(
+        iter_pokedex_batches(path, batch_size)
+    ):
+        with transaction.atomic():
+            if sync:
+                sync_pokedex(data)
+            else:
+                if position == 0:
+                    delete_pokedex()
+                store_pokedex(data)
+            for nodes in hand_made_chains:
+                store_hand_made_chain(nodes)
+        count += len(data.pokemon)
+
+    return count
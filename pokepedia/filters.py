@@ -0,0 +1,147 @@
+from django.db.models import F
+
+from pokepedia.models import Pokemon
+from pokepedia.snapshot import RANGE_FIELDS, RecordSet
+from pokepedia.typechart import get_type_chart
+
+MATCH_ANY = "any"
+MATCH_ALL = "all"
+
+
+class PokemonFilter:
+    """
+    What pokemon are filtered on, besides their name: their types (any or
+    all of `type_ids`), a type they are weak to or resist, and inclusive
+    ranges of `RANGE_FIELDS`, e.g., `{"height": (1.0, None)}`. Every
+    condition has to hold.
+
+    The same filter applies to a `Pokemon` queryset, as one query, and to a
+    `PokedexSnapshot`, by combining the bitsets it precomputes.
+    """
+
+    def __init__(
+        self, type_ids=(), match=MATCH_ANY, weak_to=None, resists=None, ranges=None
+    ):
+        self.type_ids = list(type_ids)
+        self.match = match
+        self.weak_to = weak_to
+        self.resists = resists
+        self.ranges = {
+            field: (minimum, maximum)
+            for field, (minimum, maximum) in (ranges or {}).items()
+            if minimum is not None or maximum is not None
+        }
+
+    @classmethod
+    def from_form(cls, form):
+        """Returns the filter of a valid `PokemonSearchForm`."""
+        data = form.cleaned_data
+
+        return cls(
+            type_ids=data["pokemon_type"],
+            match=data["type_match"] or MATCH_ANY,
+            weak_to=data["weak_to"],
+            resists=data["resists"],
+            ranges={
+                field: (data[f"min_{field}"], data[f"max_{field}"])
+                for field in RANGE_FIELDS
+            },
+        )
+
+    def __bool__(self):
+        return bool(
+            self.type_ids
+            or self.weak_to is not None
+            or self.resists is not None
+            or self.ranges
+        )
+
+    def filter_queryset(self, queryset):
+        """
+        Filters a `Pokemon` queryset: types through the indexed pokemon-type
+        table, weaknesses and resistances on the summary masks, and ranges
+        on the height and weight indexes.
+        """
+        if self.match == MATCH_ALL:
+            # a join per type
+            for type_id in self.type_ids:
+                queryset = queryset.filter(types=type_id)
+        elif len(self.type_ids) == 1:
+            queryset = queryset.filter(types=self.type_ids[0])
+        elif self.type_ids:
+            queryset = queryset.filter(
+                pk__in=Pokemon.types.through.objects.filter(
+                    type_id__in=self.type_ids
+                ).values("pokemon_id")
+            )
+
+        type_chart = get_type_chart()
+        for field, type_id in [
+            ("weakness_mask", self.weak_to),
+            ("resistance_mask", self.resists),
+        ]:
+            if type_id is None:
+                continue
+            # like a snapshot, a type the chart no longer has, e.g., deleted
+            # since the form was validated, matches nothing
+            if type_id not in type_chart.type_id_indices:
+                return queryset.none()
+            bit = 1 << type_chart.type_id_indices[type_id]
+            queryset = queryset.alias(**{f"{field}_bit": F(field).bitand(bit)}).filter(
+                **{f"{field}_bit": bit}
+            )
+
+        for field, (minimum, maximum) in self.ranges.items():
+            if minimum is not None:
+                queryset = queryset.filter(**{f"{field}__gte": minimum})
+            if maximum is not None:
+                queryset = queryset.filter(**{f"{field}__lte": maximum})
+
+        return queryset
+
+    def get_type_bits(self, snapshot):
+        # the bitset of the type, weakness and resistance conditions, or None
+        # when there are none
+        bits = None
+        if self.type_ids:
+            type_bits = [snapshot.type_bits.get(pk, 0) for pk in self.type_ids]
+            bits = type_bits[0]
+            for other_bits in type_bits[1:]:
+                if self.match == MATCH_ALL:
+                    bits &= other_bits
+                else:
+                    bits |= other_bits
+
+        for bits_by_type, type_id in [
+            (snapshot.weakness_bits, self.weak_to),
+            (snapshot.resistance_bits, self.resists),
+        ]:
+            if type_id is not None:
+                other_bits = bits_by_type.get(type_id, 0)
+                bits = other_bits if bits is None else bits & other_bits
+
+        return bits
+
+    def get_bits(self, snapshot):
+        """Returns the bitset of the pokemon of `snapshot` matching the filter."""
+        bits = self.get_type_bits(snapshot)
+        for field, (minimum, maximum) in self.ranges.items():
+            range_bits = snapshot.get_range_bits(field, minimum, maximum)
+            bits = range_bits if bits is None else bits & range_bits
+
+        return snapshot.all_bits if bits is None else bits
+
+    def filter_records(self, snapshot, records=None):
+        """
+        Returns the `PokemonRecord`s of `snapshot` matching the filter, as a
+        `RecordSet` in pk order, or those of `records` as a list in their own
+        order.
+        """
+        if records is None:
+            return RecordSet(snapshot, self.get_bits(snapshot))
+        if not self:
+            return records
+
+        bits = self.get_bits(snapshot)
+
+        return [record for record in records if bits >> record.position & 1]
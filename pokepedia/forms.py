@@ -1,34 +1,195 @@
 from django import forms
+from django.forms.models import ModelChoiceIterator
+from django.urls import reverse
 
+from pokepedia.filters import MATCH_ALL, MATCH_ANY
 from pokepedia.models import Pokemon, Type
+from pokepedia.snapshot import RANGE_FIELDS
+from pokepedia.typechart import get_type_chart
 
 
-class PokemonSearchForm(forms.Form):
-    # POKEMON_TYPES = [
-    #     [pokemon_type.pk, pokemon_type.name] for pokemon_type in Type.objects.all()
-    # ]
+def get_type_choices():
+    # `(id, name)` of every type, from the process's type chart, which is
+    # reloaded whenever a type changes
+    type_chart = get_type_chart()
+
+    return list(zip(type_chart.type_ids, type_chart.type_names))
+
+
+def get_search_type_choices():
+    return [("", "---------"), *get_type_choices()]
+
+
+class TypeChoiceIterator(ModelChoiceIterator):
+    # lists the types without querying them, unlike `ModelChoiceIterator`
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        yield from get_type_choices()
+
+    def __len__(self):
+        return len(get_type_choices()) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(get_type_choices())
+
+
+class TypeMultipleChoiceField(forms.ModelMultipleChoiceField):
+    iterator = TypeChoiceIterator
+
+
+class TypeFilterField(forms.TypedMultipleChoiceField):
+    # also takes a single type, as the search form's links used to have, and
+    # ignores empty values, as sent by the empty option they had
+    def to_python(self, value):
+        if value is not None and not isinstance(value, (list, tuple)):
+            value = [value]
+
+        return super().to_python([item for item in value or [] if item != ""])
+
+
+class PokemonAutocompleteSelect(forms.Select):
+    """
+    A select with only the chosen pokemon as an option; `autocomplete.js`
+    adds the pokemon searched for, from `PokemonAutocompleteView`, so the
+    page does not grow with the number of pokemon.
+    """
+
+    class Media:
+        js = ["pokepedia/autocomplete.js"]
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs["data-autocomplete-url"] = reverse("pokemon-autocomplete")
+
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        selected_ids = {str(pk) for pk in value if pk}
+        options = [self.create_option(name, "", "---------", not selected_ids, 0)]
+        if selected_ids:
+            for index, pokemon in enumerate(
+                self.choices.queryset.filter(pk__in=selected_ids).only("name"),
+                start=1,
+            ):
+                options.append(
+                    self.create_option(name, pokemon.pk, pokemon.name, True, index)
+                )
+
+        return [(None, options, 0)]
+
 
+class PokemonSearchForm(forms.Form):
     pokemon_name = forms.CharField(
         max_length=100,
         required=False,
     )
-    pokemon_type = forms.ModelChoiceField(
-        queryset=Type.objects.all(),
+    pokemon_type = TypeFilterField(
+        choices=get_type_choices,
+        coerce=int,
+        label="Types",
+        required=False,
+    )
+    type_match = forms.ChoiceField(
+        choices=[(MATCH_ANY, "Any of the types"), (MATCH_ALL, "All of the types")],
+        widget=forms.RadioSelect,
         required=False,
     )
+    weak_to = forms.TypedChoiceField(
+        choices=get_search_type_choices,
+        coerce=int,
+        empty_value=None,
+        required=False,
+    )
+    resists = forms.TypedChoiceField(
+        choices=get_search_type_choices,
+        coerce=int,
+        empty_value=None,
+        required=False,
+    )
+    min_height = forms.FloatField(min_value=0, required=False)
+    max_height = forms.FloatField(min_value=0, required=False)
+    min_weight = forms.FloatField(min_value=0, required=False)
+    max_weight = forms.FloatField(min_value=0, required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field in RANGE_FIELDS:
+            minimum = cleaned_data.get(f"min_{field}")
+            maximum = cleaned_data.get(f"max_{field}")
+            if minimum is not None and maximum is not None and minimum > maximum:
+                self.add_error(
+                    f"max_{field}", f"The maximum {field} is below the minimum."
+                )
+
+        return cleaned_data
+
+    def get_fragment_key(self):
+        # what the rendered form depends on: the submitted values, which also
+        # decide its errors, and the types listed
+        get_values = getattr(self.data, "getlist", self.data.get)
+
+        return repr(
+            (
+                [get_values(name) for name in self.fields],
+                get_type_choices(),
+            )
+        )
+
+    def get_field_fragments(self):
+        """
+        Returns `(fragment key, bound field)` for every field, the key being
+        what the rendered field depends on: its submitted values and errors,
+        and the types listed.
+
+        When a new search misses the cached form, only the fields whose
+        values changed are rendered again.
+        """
+        get_values = getattr(self.data, "getlist", self.data.get)
+        type_choices = get_type_choices()
+
+        return [
+            (
+                repr(
+                    (
+                        name,
+                        get_values(name),
+                        list(self.errors.get(name, [])),
+                        type_choices,
+                    )
+                ),
+                self[name],
+            )
+            for name in self.fields
+        ]
 
 
 class PokemonForm(forms.ModelForm):
+    types = TypeMultipleChoiceField(queryset=Type.objects.all())
+
     class Meta:
         model = Pokemon
         fields = "__all__"
+        widgets = {"evolves_from": PokemonAutocompleteSelect}
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        self.fields["evolutions"].required = False
-
         if self.instance and self.instance.pk:
-            self.fields["evolutions"].queryset = Pokemon.objects.exclude(
+            self.fields["evolves_from"].queryset = Pokemon.objects.exclude(
                 id=self.instance.id,
             )
+
+    def clean_evolves_from(self):
+        evolves_from = self.cleaned_data["evolves_from"]
+
+        # a pokemon cannot evolve from one of its own evolutions
+        ancestor = evolves_from
+        while ancestor is not None and self.instance.pk:
+            if ancestor.pk == self.instance.pk:
+                raise forms.ValidationError(
+                    "A pokemon cannot evolve from its own evolution."
+                )
+            ancestor = ancestor.evolves_from
+
+        return evolves_from
@@ -0,0 +1,482 @@
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from pokepedia.cache import clear_pokemon_cache
+from pokepedia.models import EvolutionChain, Pokemon, Type
+from pokepedia.summaries import get_summary, refresh_pokemon_summaries, touch_pokemon
+from pokepedia.typechart import (
+    bump_type_chart_revision,
+    clear_type_chart,
+    get_type_chart,
+)
+
+POKEMON_FIELDS = ["pokedex_number", "image", "genus", "height", "weight", "flavor_text"]
+EVOLUTION_FIELDS = [
+    "evolution_chain_id",
+    "evolves_from_id",
+    "evolution_stage",
+    "evolution_position",
+]
+
+DEFAULT_BATCH_SIZE = 50
+
+# `Type` damage relation fields, and the PokeAPI lists they are read from
+DAMAGE_RELATIONS = {
+    "weaknesses": "double_damage_from",
+    "resistances": "half_damage_from",
+    "immunities": "no_damage_from",
+}
+
+# national pokedex numbers of the pokemon introduced in each generation
+GENERATIONS = {
+    1: range(1, 152),
+    2: range(152, 252),
+    3: range(252, 387),
+    4: range(387, 494),
+    5: range(494, 650),
+    6: range(650, 722),
+    7: range(722, 810),
+    8: range(810, 906),
+    9: range(906, 1026),
+}
+
+
+def get_english_text(entry_list, key):
+    for entry in entry_list:
+        if entry["language"]["name"] == "en":
+            return entry[key]
+
+    return entry_list[0][key]
+
+
+def get_chain_nodes(chain, evolves_from=None, stage=0):
+    # flattens an evolution chain depth-first, into `(name, evolves from,
+    # stage)` of its pokemon
+    name = chain["species"]["name"]
+    nodes = [(name, evolves_from, stage)]
+    for evolution in chain["evolves_to"]:
+        nodes.extend(get_chain_nodes(evolution, name, stage + 1))
+
+    return nodes
+
+
+def format_selection(pokedex_numbers):
+    # compacts sorted pokedex numbers into ranges, e.g., `1-151,200`
+    ranges = []
+    for number in pokedex_numbers:
+        if ranges and ranges[-1][1] + 1 == number:
+            ranges[-1][1] = number
+        else:
+            ranges.append([number, number])
+
+    return ",".join(
+        str(first) if first == last else f"{first}-{last}" for first, last in ranges
+    )
+
+
+class PokedexData:
+    """
+    In-memory collection of PokeAPI data, written to the database in one go
+    by `store_pokedex()` or `sync_pokedex()`.
+
+    `pokedex_numbers` are the pokedex entries this data covers; it may hold
+    only a batch of the selected pokemon, and only includes type data when
+    `add_type()` was called.
+    """
+
+    def __init__(self):
+        self.damage_relations = {field: {} for field in DAMAGE_RELATIONS}
+        self.pokedex_numbers = []
+        self.pokemon = []
+        self.pokemon_types = {}
+        self.evolution_chains = {}
+
+    @property
+    def weaknesses(self):
+        return self.damage_relations["weaknesses"]
+
+    def add_type(self, type_resource):
+        self.add_type_relations(
+            type_resource["name"],
+            {
+                field: [
+                    related_type["name"]
+                    for related_type in type_resource["damage_relations"][relation]
+                ]
+                for field, relation in DAMAGE_RELATIONS.items()
+            },
+        )
+
+    def add_type_relations(self, type_name, relations):
+        # `relations` maps each `Type` damage relation field to type names
+        for field in DAMAGE_RELATIONS:
+            self.damage_relations[field][type_name] = relations.get(field, [])
+
+    def add_pokemon(self, pokemon_resource, species_resource):
+        pokemon = Pokemon(
+            pokedex_number=pokemon_resource["id"],
+            image=pokemon_resource["sprites"]["front_default"],
+            name=pokemon_resource["name"],
+            genus=get_english_text(species_resource["genera"], "genus"),
+            height=pokemon_resource["height"],
+            weight=pokemon_resource["weight"],
+            flavor_text=get_english_text(
+                species_resource["flavor_text_entries"], "flavor_text"
+            ),
+        )
+
+        return self.add_pokemon_instance(
+            pokemon,
+            [
+                pokemon_type["type"]["name"]
+                for pokemon_type in pokemon_resource["types"]
+            ],
+        )
+
+    def add_pokemon_instance(self, pokemon, type_names):
+        self.pokedex_numbers.append(pokemon.pokedex_number)
+        self.pokemon.append(pokemon)
+        self.pokemon_types[pokemon.name] = type_names
+
+        return pokemon
+
+    def add_evolution_chain(self, chain_resource):
+        self.evolution_chains[chain_resource["id"]] = get_chain_nodes(
+            chain_resource["chain"]
+        )
+
+    def get_type_names(self):
+        # ordered like the API lists them, so type ids stay stable between runs
+        type_names = dict.fromkeys(self.weaknesses)
+        for relations in self.damage_relations.values():
+            for names in relations.values():
+                type_names.update(dict.fromkeys(names))
+        for names in self.pokemon_types.values():
+            type_names.update(dict.fromkeys(names))
+
+        return list(type_names)
+
+
+def delete_pokedex():
+    """
+    Deletes every pokemon, evolution chain and type with one query per
+    table, where `QuerySet.delete()` would send signals for every row.
+    """
+    models = [
+        Pokemon.types.through,
+        *(getattr(Type, field).through for field in DAMAGE_RELATIONS),
+        Pokemon,
+        EvolutionChain,
+        Type,
+    ]
+    with transaction.atomic():
+        transaction.on_commit(clear_type_chart)
+        clear_type_chart()
+        bump_type_chart_revision()
+        clear_pokemon_cache()
+
+        with connection.cursor() as cursor:
+            for model in models:
+                cursor.execute(
+                    f"DELETE FROM {connection.ops.quote_name(model._meta.db_table)}"
+                )
+
+
+def store_pokedex(data):
+    """
+    Writes `data` with one bulk insert per table, inside a single transaction.
+
+    Types and evolution chains that already exist are reused, and every
+    pokemon of a chain that is present in the database gets its place in the
+    chain. Apart from the batching done by the database backend, the number
+    of queries does not grow with the amount of data.
+    """
+    with transaction.atomic():
+        # bulk writes do not send the signals that keep the type chart and the
+        # pokemon cache current
+        transaction.on_commit(clear_type_chart)
+        clear_type_chart()
+        clear_pokemon_cache()
+
+        type_ids, new_type_ids = _get_or_create_types(data.get_type_names())
+        if new_type_ids or any(data.damage_relations.values()):
+            bump_type_chart_revision()
+
+        for field, relations in data.damage_relations.items():
+            through = getattr(Type, field).through
+            through.objects.bulk_create(
+                [
+                    through(
+                        from_type_id=type_ids[type_name],
+                        to_type_id=type_ids[related_name],
+                    )
+                    for type_name, related_names in relations.items()
+                    for related_name in related_names
+                ],
+                ignore_conflicts=True,
+            )
+
+        # new pokemon are inserted with their summaries and their place in
+        # their chain, rather than updated right after
+        type_chart = get_type_chart()
+        places = _get_chain_places(data, _get_or_create_chains(data))
+        for pokemon in data.pokemon:
+            summary = get_summary(type_chart, data.pokemon_types[pokemon.name])
+            for field, value in [*summary.items(), *places.get(pokemon.name, [])]:
+                setattr(pokemon, field, value)
+
+        Pokemon.objects.bulk_create(data.pokemon)
+
+        Pokemon.types.through.objects.bulk_create(
+            [
+                Pokemon.types.through(
+                    pokemon_id=pokemon.pk,
+                    type_id=type_ids[type_name],
+                )
+                for pokemon in data.pokemon
+                for type_name in data.pokemon_types[pokemon.name]
+            ],
+            ignore_conflicts=True,
+        )
+
+        _store_evolution_chains(data, {pokemon.name for pokemon in data.pokemon})
+
+        _refresh_summaries(data)
+
+
+def sync_pokedex(data):
+    """
+    Makes the database match `data` by changing only what differs, instead of
+    deleting and recreating everything like a flush and `store_pokedex()`.
+
+    Rows are matched by name: new pokemon are upserted, changed ones are
+    updated with `bulk_update()`, and pokemon within `data.pokedex_numbers`
+    that are no longer in `data` are deleted, as are any type links that were
+    removed and evolution chains left without pokemon. When `data` includes
+    types, types and weaknesses that are no longer listed are deleted too.
+    Returns the number of pokemon created, updated and deleted.
+    """
+    with transaction.atomic():
+        transaction.on_commit(clear_type_chart)
+        clear_type_chart()
+        clear_pokemon_cache()
+
+        type_names = data.get_type_names()
+        type_ids, new_type_ids = _get_or_create_types(type_names)
+
+        types_changed = bool(new_type_ids)
+        if data.weaknesses:
+            deleted_types, _ = Type.objects.exclude(name__in=type_names).delete()
+            types_changed = types_changed or bool(deleted_types)
+            for field, relations in data.damage_relations.items():
+                types_changed |= _sync_links(
+                    getattr(Type, field).through,
+                    "from_type_id",
+                    "to_type_id",
+                    {
+                        (type_ids[type_name], type_ids[related_name])
+                        for type_name, related_names in relations.items()
+                        for related_name in related_names
+                    },
+                    [type_ids[type_name] for type_name in relations],
+                )
+        if types_changed:
+            bump_type_chart_revision()
+
+        # removed first, so that renamed pokemon can take over their number
+        _, deleted_per_model = (
+            Pokemon.objects.filter(pokedex_number__in=data.pokedex_numbers)
+            .exclude(name__in=[pokemon.name for pokemon in data.pokemon])
+            .delete()
+        )
+
+        existing_pokemon = Pokemon.objects.only(
+            "name", "sprite", *POKEMON_FIELDS
+        ).in_bulk([pokemon.name for pokemon in data.pokemon], field_name="name")
+        new_pokemon = []
+        changed_pokemon = []
+        for pokemon in data.pokemon:
+            existing = existing_pokemon.get(pokemon.name)
+            if existing is None:
+                new_pokemon.append(pokemon)
+                continue
+
+            pokemon.pk = existing.pk
+            if any(
+                getattr(pokemon, field) != getattr(existing, field)
+                for field in POKEMON_FIELDS
+            ):
+                # a new image makes the stored sprite outdated
+                pokemon.sprite = (
+                    existing.sprite if pokemon.image == existing.image else ""
+                )
+                pokemon.updated_at = timezone.now()
+                pokemon.version = F("version") + 1
+                changed_pokemon.append(pokemon)
+
+        Pokemon.objects.bulk_update(
+            changed_pokemon, [*POKEMON_FIELDS, "sprite", "updated_at", "version"]
+        )
+        Pokemon.objects.bulk_create(
+            new_pokemon,
+            update_conflicts=True,
+            unique_fields=["name"],
+            update_fields=POKEMON_FIELDS,
+        )
+        pokemon_ids = {pokemon.name: pokemon.pk for pokemon in data.pokemon}
+        _sync_links(
+            Pokemon.types.through,
+            "pokemon_id",
+            "type_id",
+            {
+                (pokemon_ids[name], type_ids[type_name])
+                for name, pokemon_type_names in data.pokemon_types.items()
+                for type_name in pokemon_type_names
+            },
+            pokemon_ids.values(),
+        )
+        _store_evolution_chains(data, {pokemon.name for pokemon in new_pokemon})
+        EvolutionChain.objects.filter(pokemon__isnull=True).delete()
+
+        _refresh_summaries(data)
+
+    return {
+        "created": len(new_pokemon),
+        "updated": len(changed_pokemon),
+        "deleted": deleted_per_model.get(Pokemon._meta.label, 0),
+    }
+
+
+def _refresh_summaries(data):
+    # changed types can change the summary of any pokemon
+    if data.weaknesses:
+        refresh_pokemon_summaries()
+    else:
+        refresh_pokemon_summaries([pokemon.pk for pokemon in data.pokemon])
+
+
+def _get_or_create_chains(data):
+    # `EvolutionChain` ids of `data.evolution_chains`, by PokeAPI id
+    chain_ids = dict(
+        EvolutionChain.objects.filter(api_id__in=data.evolution_chains).values_list(
+            "api_id", "pk"
+        )
+    )
+    new_chains = EvolutionChain.objects.bulk_create(
+        [
+            EvolutionChain(api_id=api_id)
+            for api_id in data.evolution_chains
+            if api_id not in chain_ids
+        ]
+    )
+    chain_ids.update((chain.api_id, chain.pk) for chain in new_chains)
+
+    return chain_ids
+
+
+def _get_chain_places(data, chain_ids):
+    # `(field, value)` pairs placing each pokemon of `data.evolution_chains`
+    # in its chain, apart from `evolves_from`, which needs stored pokemon
+    return {
+        name: [
+            ("evolution_chain_id", chain_ids[api_id]),
+            ("evolution_stage", stage),
+            ("evolution_position", position),
+        ]
+        for api_id, nodes in data.evolution_chains.items()
+        for position, (name, _, stage) in enumerate(nodes)
+    }
+
+
+def _store_evolution_chains(data, inserted_names=()):
+    # places every stored pokemon of `data.evolution_chains` in its chain,
+    # including pokemon stored by an earlier batch; all pokemon of a chain
+    # that changed or gained `inserted_names` get a new version, as their
+    # evolution trees all show it
+    if not data.evolution_chains:
+        return
+
+    chain_ids = _get_or_create_chains(data)
+    chain_pokemon = Pokemon.objects.only("name", *EVOLUTION_FIELDS).in_bulk(
+        [name for nodes in data.evolution_chains.values() for name, _, _ in nodes],
+        field_name="name",
+    )
+
+    # only the fields that changed are written, as `bulk_update()` builds an
+    # expression per row and field
+    changed_pokemon = []
+    changed_fields = set()
+    touched_ids = []
+    for api_id, nodes in data.evolution_chains.items():
+        family = []
+        is_changed = False
+        for position, (name, evolves_from, stage) in enumerate(nodes):
+            pokemon = chain_pokemon.get(name)
+            if pokemon is None:
+                continue
+
+            parent = chain_pokemon.get(evolves_from)
+            place = {
+                "evolution_chain": chain_ids[api_id],
+                "evolves_from": parent.pk if parent else None,
+                "evolution_stage": stage,
+                "evolution_position": position,
+            }
+            fields = [
+                field
+                for field, value in place.items()
+                if getattr(pokemon, pokemon._meta.get_field(field).attname) != value
+            ]
+            for field in fields:
+                setattr(pokemon, pokemon._meta.get_field(field).attname, place[field])
+            if fields:
+                changed_pokemon.append(pokemon)
+                changed_fields.update(fields)
+            is_changed = is_changed or bool(fields) or name in inserted_names
+            family.append(pokemon.pk)
+
+        if is_changed:
+            touched_ids.extend(family)
+
+    if changed_pokemon:
+        Pokemon.objects.bulk_update(changed_pokemon, sorted(changed_fields))
+    touch_pokemon(touched_ids)
+
+
+def _sync_links(through, source_field, target_field, links, source_ids):
+    # replaces the through table rows of `source_ids` with the `links` that
+    # start from them, touching only the rows that were added or removed;
+    # returns whether any were
+    source_ids = set(source_ids)
+    links = {link for link in links if link[0] in source_ids}
+    existing_links = {
+        (source_id, target_id): link_id
+        for link_id, source_id, target_id in through.objects.filter(
+            **{f"{source_field}__in": source_ids}
+        ).values_list("pk", source_field, target_field)
+    }
+
+    removed_ids = [
+        link_id for link, link_id in existing_links.items() if link not in links
+    ]
+    added_links = [
+        through(**{source_field: source_id, target_field: target_id})
+        for source_id, target_id in links
+        if (source_id, target_id) not in existing_links
+    ]
+    through.objects.filter(pk__in=removed_ids).delete()
+    through.objects.bulk_create(added_links, ignore_conflicts=True)
+
+    return bool(removed_ids or added_links)
+
+
+def _get_or_create_types(type_names):
+    # returns the ids of every type, and those of the types created
+    type_ids = dict(Type.objects.filter(name__in=type_names).values_list("name", "pk"))
+    new_types = Type.objects.bulk_create(
+        [Type(name=name) for name in type_names if name not in type_ids]
+    )
+    type_ids.update((new_type.name, new_type.pk) for new_type in new_types)
+
+    return type_ids, [new_type.pk for new_type in new_types]
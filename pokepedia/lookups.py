@@ -0,0 +1,16 @@
+from django.db.models import Lookup, TextField
+
+
+class SearchDocumentField(TextField):
+    """The hidden column of an SQLite FTS5 table, named like the table itself."""
+
+
+@SearchDocumentField.register_lookup
+class Match(Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
@@ -1,180 +1,303 @@
+import zipfile
+
+from django.conf import settings
 from django.core.management import call_command
 from django.core.management.base import BaseCommand, CommandError
-from requests import HTTPError, get
+from django.db import transaction
+from requests import HTTPError
 
-from pokepedia.models import Pokemon, Type
+from pokepedia.ingest import (
+    DEFAULT_BATCH_SIZE,
+    GENERATIONS,
+    PokedexData,
+    format_selection,
+    store_pokedex,
+    sync_pokedex,
+)
+from pokepedia.models import IngestionCheckpoint, Pokemon
+from pokepedia.pokeapi import (
+    BASE_API_URL,
+    DEFAULT_CACHE_TTL,
+    DEFAULT_CONCURRENCY,
+    CacheMiss,
+    PokeAPIClient,
+    ResponseCache,
+)
+from pokepedia.sprites import SpriteStore, download_sprites
 
 
 class Command(BaseCommand):
-    help = "Retrieves data from PokeAPI (https://pokeapi.co/api/v2/) for generation 1 pokemon, and stores it to the database"
-
-    # TODO: add option to select which generation to retrieve and store
-    # def add_arguments(self, parser):
-    #     parser.add_argument(
-    #         "--clear",
-    #         action="store_true",
-    #         help="clears existing data in the database",
-    #     )
-
-    # newest_generation = 9  # Update this when a new generation comes out
-    # generations = [gen for gen in range(1, newest_generation + 1)]
-    # parser.add_argument(
-    #     "generation",
-    #     type=int,
-    #     choices=generations,
-    #     help="[integer] Pokemon generation to retrieve from",
-    # )
+    help = "Retrieves data from PokeAPI (https://pokeapi.co/api/v2/) for the selected pokemon (generation 1 by default), and stores it to the database"
 
-    def handle(self, *args, **options):
-        base_api_url = "https://pokeapi.co/api/v2"
+    def add_arguments(self, parser):
+        selection = parser.add_mutually_exclusive_group()
+        selection.add_argument(
+            "--generation",
+            type=int,
+            nargs="+",
+            choices=list(GENERATIONS),
+            help="[integer] pokemon generation(s) to retrieve (default: 1)",
+        )
+        selection.add_argument(
+            "--range",
+            help="national pokedex numbers to retrieve, e.g., `1-151`",
+        )
+        selection.add_argument(
+            "--all",
+            action="store_true",
+            help="retrieve the pokemon of every generation",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"[integer] number of pokemon stored per transaction (default: {DEFAULT_BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="continue an interrupted run with the same selection from its last stored batch",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=DEFAULT_CONCURRENCY,
+            help=f"[integer] maximum number of parallel API requests (default: {DEFAULT_CONCURRENCY})",
+        )
+        parser.add_argument(
+            "--api-url",
+            default=BASE_API_URL,
+            help=f"base url of the PokeAPI instance to retrieve from (default: {BASE_API_URL})",
+        )
+        parser.add_argument(
+            "--sync",
+            action="store_true",
+            help="update existing data in place instead of deleting it all first",
+        )
+        parser.add_argument(
+            "--cache-dir",
+            default=settings.POKEAPI_CACHE_DIR,
+            help="directory where API responses are cached (default: POKEAPI_CACHE_DIR setting)",
+        )
+        parser.add_argument(
+            "--cache-ttl",
+            type=int,
+            default=DEFAULT_CACHE_TTL,
+            help=f"[integer] seconds before a cached response is revalidated (default: {DEFAULT_CACHE_TTL})",
+        )
+        parser.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="always retrieve from the API, without reading or writing the cache",
+        )
+        parser.add_argument(
+            "--offline",
+            action="store_true",
+            help="only use cached responses (and the snapshot archive), never the API",
+        )
+        parser.add_argument(
+            "--snapshot",
+            help="snapshot archive to read cached responses from",
+        )
+        parser.add_argument(
+            "--download-sprites",
+            action="store_true",
+            help="store the sprites of the selected pokemon in POKEPEDIA_SPRITE_DIR, so pages do not load them from GitHub",
+        )
+        parser.add_argument(
+            "--export-snapshot",
+            help="after a successful run, write all cached responses to this snapshot archive",
+        )
 
-        try:
-            self.stdout.write(
-                self.style.WARNING("WARNING: Deleting all existing data.")
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1:
+            raise CommandError("ERROR: --concurrency must be at least 1.")
+        if options["batch_size"] < 1:
+            raise CommandError("ERROR: --batch-size must be at least 1.")
+        if options["no_cache"] and (options["offline"] or options["snapshot"]):
+            raise CommandError(
+                "ERROR: --no-cache cannot be combined with --offline or --snapshot."
             )
-            call_command("flush", interactive=False)
-
-            # create types
-            # assign weaknesses
-            # create pokemon
-            # assign types
-            types_response = get(f"{base_api_url}/type/")
-            types_response.raise_for_status()
-            type_results = types_response.json()["results"]
-
-            for type in type_results:
-                type_name = type["name"]
-                type_resource, type_created = Type.objects.get_or_create(name=type_name)
 
-                if type_created:
-                    self.stdout.write(
-                        self.style.SUCCESS(f"SUCCESS: created type `{type_name}`")
-                    )
+        pokedex_numbers = self._get_pokedex_numbers(options)
+        selection = format_selection(pokedex_numbers)
 
-                response = get(f"{base_api_url}/type/{type_name}")
-                response.raise_for_status()
-                results = response.json()
-                weaknesses = results["damage_relations"]["double_damage_from"]
-
-                for weakness in weaknesses:
-                    weakness_name = weakness["name"]
-                    weakness_resource, weakness_created = Type.objects.get_or_create(
-                        name=weakness_name
-                    )
-                    type_resource.weaknesses.add(weakness_resource)
+        remaining_numbers = pokedex_numbers
+        checkpoint = None
+        if options["resume"]:
+            checkpoint = IngestionCheckpoint.objects.filter(selection=selection).first()
 
-                    if weakness_created:
-                        self.stdout.write(
-                            self.style.SUCCESS(
-                                f"SUCCESS: created type `{weakness_name}`"
-                            )
-                        )
-
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f"SUCCESS: added `{weakness_name}` weakness to type `{type_name}`"
-                        )
+            if checkpoint:
+                remaining_numbers = [
+                    number
+                    for number in pokedex_numbers
+                    if number > checkpoint.completed_through
+                ]
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"WARNING: Resuming `{selection}` after #{checkpoint.completed_through}."
                     )
+                )
 
-            evolution_chains = {}
-            for pokemon_index in range(1, 152):
-                response = get(f"{base_api_url}/pokemon/{pokemon_index}")
-                response.raise_for_status()
-                json_response = response.json()
-
-                pokemon_sprite = json_response["sprites"]["front_default"]
-                pokemon_name = json_response["name"]
-                pokemon_height = json_response["height"]
-                pokemon_weight = json_response["weight"]
-
-                species_url = json_response["species"]["url"]
-                species_response = get(species_url)
-                species_response.raise_for_status()
-                json_species_response = species_response.json()
-                pokemon_flavor_text = self._get_english_text(
-                    json_species_response["flavor_text_entries"],
-                    "flavor_text",
+        cache = None
+        if not options["no_cache"]:
+            try:
+                cache = ResponseCache(
+                    directory=options["cache_dir"],
+                    ttl=options["cache_ttl"],
+                    archive=options["snapshot"],
                 )
-                pokemon_genus = self._get_english_text(
-                    json_species_response["genera"],
-                    "genus",
+            except (OSError, zipfile.BadZipFile) as error:
+                raise CommandError(
+                    f"ERROR: Cannot read snapshot `{options['snapshot']}`: {error}"
                 )
 
-                evolution_chain_url = json_species_response["evolution_chain"]["url"]
-                evolution_chains[pokemon_name] = evolution_chain_url
+        try:
+            with PokeAPIClient(
+                base_url=options["api_url"],
+                concurrency=options["concurrency"],
+                cache=cache,
+                offline=options["offline"],
+            ) as client:
+                type_data = PokedexData()
+                for type_resource in client.fetch_types():
+                    type_data.add_type(type_resource)
 
-                pokemon_resource = Pokemon(
-                    image=pokemon_sprite,
-                    name=pokemon_name,
-                    genus=pokemon_genus,
-                    height=pokemon_height,
-                    weight=pokemon_weight,
-                    flavor_text=pokemon_flavor_text,
+                batches = client.iter_pokemon_batches(
+                    remaining_numbers, options["batch_size"]
                 )
-                pokemon_resource.save()
-
-                for pokemon_type in json_response["types"]:
-                    type_name = pokemon_type["type"]["name"]
-                    type_resource, type_created = Type.objects.get_or_create(
-                        name=type_name,
-                    )
-                    pokemon_resource.types.add(type_resource)
-
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f"SUCCESS: created pokemon `{pokemon_resource}` - {pokemon_resource.types.all()}"
-                    )
+                self._store_batches(
+                    type_data,
+                    batches,
+                    selection,
+                    len(pokedex_numbers) - len(remaining_numbers),
+                    len(pokedex_numbers),
+                    flush=not options["sync"] and checkpoint is None,
+                    sync=options["sync"],
+                    verbosity=options["verbosity"],
                 )
 
-            processed_chains = set()
-            for pokemon_name, evolution_chain_url in evolution_chains.items():
-                if evolution_chain_url in processed_chains:
-                    continue
-
-                response = get(evolution_chain_url)
-                response.raise_for_status()
-                chain_data = response.json()
-
-                # Process the evolution chain
-                self._process_evolution_chain(chain_data["chain"])
-                processed_chains.add(evolution_chain_url)
+                if options["download_sprites"]:
+                    self._download_sprites(client, pokedex_numbers)
         except HTTPError as http_err:
-            self.stderr.write(self.style.ERROR(http_err))
+            self.stderr.write(self.style.ERROR(str(http_err)))
             raise CommandError("ERROR: Failed to retrieve data from API.")
+        except CacheMiss as cache_miss:
+            self.stderr.write(self.style.ERROR(str(cache_miss)))
+            raise CommandError("ERROR: Data is not available offline.")
         except Exception as err:
-            call_command("flush", interactive=False)
-
-            self.stderr.write(self.style.ERROR(err))
+            self.stderr.write(self.style.ERROR(str(err)))
             raise CommandError("ERROR: Failed to store Pokemon data.")
         else:
             self.stdout.write(self.style.SUCCESS("SUCCESS: Stored Pokemon data :D"))
 
-    def _get_english_text(self, entry_list, key):
-        for entry in entry_list:
-            if entry["language"]["name"] == "en":
-                return entry[key]
+        if options["export_snapshot"] and cache:
+            cache.export(options["export_snapshot"])
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"SUCCESS: exported cached responses to `{options['export_snapshot']}`"
+                )
+            )
+
+    def _get_pokedex_numbers(self, options):
+        if options["all"]:
+            generations = list(GENERATIONS)
+        elif options["range"]:
+            try:
+                first, _, last = options["range"].partition("-")
+                numbers = range(int(first), int(last or first) + 1)
+            except ValueError:
+                raise CommandError("ERROR: --range must look like `1-151`.")
+
+            if not numbers or numbers.start < 1:
+                raise CommandError("ERROR: --range must be a non-empty range from 1.")
+
+            return list(numbers)
+        else:
+            generations = options["generation"] or [1]
+
+        return sorted(
+            {number for generation in generations for number in GENERATIONS[generation]}
+        )
 
-        return entry_list[0][key]
+    def _download_sprites(self, client, pokedex_numbers):
+        downloaded, failed = download_sprites(
+            client,
+            SpriteStore(settings.POKEPEDIA_SPRITE_DIR),
+            Pokemon.objects.filter(pokedex_number__in=pokedex_numbers).only(
+                "image", "sprite"
+            ),
+        )
+        if failed:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"WARNING: {failed} sprite(s) could not be retrieved, their pages keep the remote image."
+                )
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"SUCCESS: downloaded {downloaded} new sprite(s)")
+        )
 
-    def _process_evolution_chain(self, chain_data):
-        # helper function to extract pokemon names from evolution chain
-        def extract_chain_names(chain):
-            names = []
-            names.append(chain["species"]["name"])
-            for evolution in chain["evolves_to"]:
-                names.extend(extract_chain_names(evolution))
-            return names
+    def _store_batches(
+        self, type_data, batches, selection, stored, total, flush, sync, verbosity
+    ):
+        # each batch is committed together with the checkpoint of the run, so an
+        # interrupted run can be resumed from the last committed batch
+        changes = {"created": 0, "updated": 0, "deleted": 0}
 
-        pokemon_names = extract_chain_names(chain_data)
+        for position, (batch, entries, evolution_chains) in enumerate(batches):
+            pokedex = type_data if position == 0 else PokedexData()
+            for pokemon_resource, species_resource in entries:
+                pokedex.add_pokemon(pokemon_resource, species_resource)
+            for chain_resource in evolution_chains.values():
+                pokedex.add_evolution_chain(chain_resource)
 
-        pokemon_in_chain = list(Pokemon.objects.filter(name__in=pokemon_names))
+            if flush:
+                # only delete existing data once the first batch has been retrieved
+                self.stdout.write(
+                    self.style.WARNING("WARNING: Deleting all existing data.")
+                )
+                call_command("flush", interactive=False)
+                flush = False
+
+            with transaction.atomic():
+                if sync:
+                    for change, count in sync_pokedex(pokedex).items():
+                        changes[change] += count
+                else:
+                    store_pokedex(pokedex)
+                    changes["created"] += len(pokedex.pokemon)
 
-        for pokemon in pokemon_in_chain:
-            for evolution in pokemon_in_chain:
-                if pokemon != evolution:
-                    pokemon.evolutions.add(evolution)
+                IngestionCheckpoint.objects.update_or_create(
+                    selection=selection,
+                    defaults={"completed_through": batch[-1]},
+                )
+
+            stored += len(batch)
+            if verbosity > 1:
+                for pokemon in pokedex.pokemon:
                     self.stdout.write(
                         self.style.SUCCESS(
-                            f"SUCCESS: added evolution relationship {pokemon.name} <-> {evolution.name}"
+                            f"SUCCESS: stored pokemon `{pokemon}` - {pokedex.pokemon_types[pokemon.name]}"
                         )
                     )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"SUCCESS: stored pokemon #{batch[0]}-#{batch[-1]} ({stored}/{total})"
+                )
+            )
+
+        IngestionCheckpoint.objects.filter(selection=selection).delete()
+
+        if sync:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"SUCCESS: synced pokemon ({changes['created']} created, {changes['updated']} updated, {changes['deleted']} deleted)"
+                )
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"SUCCESS: created {len(type_data.weaknesses)} types and {changes['created']} pokemon"
+                )
+            )
@@ -0,0 +1,166 @@
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from pokepedia.benchmark import compare_results, run_benchmark
+from pokepedia.ingest import DEFAULT_BATCH_SIZE
+
+DEFAULT_SIZES = [150, 1000, 10000]
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            cwd=settings.BASE_DIR,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = "Times ingestion and the pokemon pages against synthetic pokedexes of the given sizes, in a throwaway test database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=DEFAULT_SIZES,
+            help=f"[integer] number of pokemon of each pokedex (default: {' '.join(map(str, DEFAULT_SIZES))}, up to 100000)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="[integer] number of timed requests per page (default: 20)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"[integer] number of pokemon stored per transaction (default: {DEFAULT_BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="[integer] seed of the generated pokedexes (default: 0)",
+        )
+        parser.add_argument(
+            "--output",
+            help="path of a JSON file to write the results to",
+        )
+        parser.add_argument(
+            "--compare",
+            help="path of earlier JSON results to compare with",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=1.2,
+            help="[float] slowdown over the compared results reported as a regression (default: 1.2)",
+        )
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1 or min(options["sizes"]) < 1:
+            raise CommandError("sizes and --repeat must be at least 1")
+
+        baseline = None
+        if options["compare"]:
+            try:
+                with open(options["compare"]) as baseline_file:
+                    baseline = json.load(baseline_file)
+            except (OSError, ValueError) as error:
+                raise CommandError(f"cannot read {options['compare']}: {error}")
+
+        # never touches the configured database, only a test database that
+        # is created for the run
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            results = self.run(options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            "commit": get_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "repeat": options["repeat"],
+            "seed": options["seed"],
+            "results": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as output_file:
+                json.dump(report, output_file, indent=2)
+
+        if baseline:
+            self.write_comparison(results, baseline, options["threshold"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"SUCCESS: benchmarked {len(options['sizes'])} pokedex size(s)"
+                + (
+                    f", results written to {options['output']}"
+                    if options["output"]
+                    else ""
+                )
+            )
+        )
+
+    def run(self, options):
+        results = []
+        for size in options["sizes"]:
+            size_results = run_benchmark(
+                size, options["repeat"], options["seed"], options["batch_size"]
+            )
+            for result in size_results:
+                if "seconds" in result:
+                    self.stdout.write(
+                        f"{size:>7} {result['scenario']:<18} "
+                        f"{result['seconds']:9.2f} s  "
+                        f"{result['pokemon_per_second']:9.0f} pokemon/s"
+                    )
+                else:
+                    self.stdout.write(
+                        f"{size:>7} {result['scenario']:<18} "
+                        f"p50 {result['p50_ms']:8.1f} ms  "
+                        f"p95 {result['p95_ms']:8.1f} ms  "
+                        f"{result['queries']:5.0f} queries"
+                    )
+            results.extend(size_results)
+
+        return results
+
+    def write_comparison(self, results, baseline, threshold):
+        self.stdout.write(f"compared with {baseline.get('commit') or 'baseline'}:")
+        for result, previous, ratio in compare_results(results, baseline["results"]):
+            line = f"{result['size']:>7} {result['scenario']:<18} {ratio:6.2f}x"
+            if result.get("queries", 0) != previous.get("queries", 0):
+                line += (
+                    f"  queries {previous['queries']:.0f} -> {result['queries']:.0f}"
+                )
+
+            if ratio > threshold:
+                self.stdout.write(self.style.WARNING(f"{line}  regression"))
+            else:
+                self.stdout.write(line)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pokepedia.dexfile import DEFAULT_BATCH_SIZE, export_pokedex
+
+
+class Command(BaseCommand):
+    help = "Writes the types, pokemon and evolution chains to a compact gzipped file, which `importdex` loads"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="file to write, e.g., `pokedex.jsonl.gz`")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"[integer] number of pokemon read per query (default: {DEFAULT_BATCH_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("ERROR: --batch-size must be at least 1.")
+
+        count = export_pokedex(options["path"], options["batch_size"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"SUCCESS: exported {count} pokemon to `{options['path']}`"
+            )
+        )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pokepedia.dexfile import DEFAULT_BATCH_SIZE, DexFormatError, import_pokedex
+
+
+class Command(BaseCommand):
+    help = "Replaces the pokemon and types with the ones of a file written by `exportdex`, after checking the whole file, or updates them to match with --sync; each batch is committed on its own"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="file written by `exportdex`")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"[integer] number of pokemon stored per transaction (default: {DEFAULT_BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--sync",
+            action="store_true",
+            help="update existing data in place instead of deleting it all first",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("ERROR: --batch-size must be at least 1.")
+
+        try:
+            count = import_pokedex(
+                options["path"], options["batch_size"], sync=options["sync"]
+            )
+        except OSError as error:
+            raise CommandError(f"ERROR: Cannot read `{options['path']}`: {error}")
+        except DexFormatError as error:
+            raise CommandError(f"ERROR: Invalid pokedex file: {error}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"SUCCESS: imported {count} pokemon from `{options['path']}`"
+            )
+        )
@@ -0,0 +1,163 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from pokepedia.models import Pokemon
+
+PAGES = ["list", "details", "search"]
+
+
+def get_latency_summary(latencies, elapsed):
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+
+    return {
+        "requests_per_second": len(latencies) / elapsed,
+        "p50": percentiles[49] * 1000,
+        "p95": percentiles[94] * 1000,
+        "p99": percentiles[98] * 1000,
+    }
+
+
+def get_sync(client, url):
+    started_at = time.perf_counter()
+    response = client.get(url)
+    if response.streaming:
+        b"".join(response.streaming_content)
+    else:
+        response.content
+
+    return time.perf_counter() - started_at, response.status_code
+
+
+async def get_async(client, url, semaphore):
+    async with semaphore:
+        started_at = time.perf_counter()
+        response = await client.get(url)
+        if response.streaming:
+            [chunk async for chunk in response.streaming_content]
+        else:
+            response.content
+
+        return time.perf_counter() - started_at, response.status_code
+
+
+class Command(BaseCommand):
+    help = "Compares the throughput and latency of the sync (WSGI) and async (ASGI) pokemon pages under concurrent requests"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="[integer] number of requests per page and path (default: 200)",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=16,
+            help="[integer] number of requests in flight at once (default: 16)",
+        )
+        parser.add_argument(
+            "--page",
+            nargs="+",
+            choices=PAGES,
+            default=PAGES,
+            help="pages to request (default: all of them)",
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 2 or options["concurrency"] < 1:
+            raise CommandError(
+                "at least 2 requests and a concurrency of 1 are required"
+            )
+        if settings.POKEPEDIA_SERVER_PROFILE == "asgi":
+            raise CommandError(
+                "the asgi profile serves the async views at both paths; "
+                "run with POKEPEDIA_SERVER_PROFILE=wsgi"
+            )
+
+        pokemon = Pokemon.objects.order_by("pk").first()
+        if pokemon is None:
+            raise CommandError("no pokemon to request, run `addpokemon` first")
+
+        # the same pages, served by the sync and the async views
+        urls = {
+            "list": (reverse("pokemon-list"), reverse("async-pokemon-list")),
+            "details": (
+                reverse("pokemon-details", kwargs={"pk": pokemon.pk}),
+                reverse("async-pokemon-details", kwargs={"pk": pokemon.pk}),
+            ),
+            "search": (
+                f"{reverse('pokemon-list')}?pokemon_name={pokemon.name[:3]}",
+                f"{reverse('async-pokemon-list')}?pokemon_name={pokemon.name[:3]}",
+            ),
+        }
+
+        # the test clients send requests to the `testserver` host
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            for page in options["page"]:
+                sync_url, async_url = urls[page]
+                for path, run, url in [
+                    ("sync", self.run_sync, sync_url),
+                    ("async", self.run_async, async_url),
+                ]:
+                    summary = run(url, options["requests"], options["concurrency"])
+                    self.stdout.write(
+                        f"{page:<8} {path:<6} "
+                        f"{summary['requests_per_second']:8.1f} req/s  "
+                        f"p50 {summary['p50']:7.1f} ms  "
+                        f"p95 {summary['p95']:7.1f} ms  "
+                        f"p99 {summary['p99']:7.1f} ms"
+                    )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"SUCCESS: sent {options['requests']} requests per page and path, "
+                f"{options['concurrency']} at a time"
+            )
+        )
+
+    def run_sync(self, url, request_count, concurrency):
+        # one test client (and database connection) per worker thread
+        clients = {}
+
+        def get(_):
+            client = clients.setdefault(threading.get_ident(), Client())
+            return get_sync(client, url)
+
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(get, range(request_count)))
+
+        return self.summarize(results, time.perf_counter() - started_at, url)
+
+    def run_async(self, url, request_count, concurrency):
+        async def run():
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(concurrency)
+
+            return await asyncio.gather(
+                *(get_async(client, url, semaphore) for _ in range(request_count))
+            )
+
+        started_at = time.perf_counter()
+        results = asyncio.run(run())
+
+        return self.summarize(results, time.perf_counter() - started_at, url)
+
+    def summarize(self, results, elapsed, url):
+        failed_statuses = {status for _, status in results if status != 200}
+        if failed_statuses:
+            raise CommandError(
+                f"{url} answered with status {', '.join(map(str, failed_statuses))}"
+            )
+
+        return get_latency_summary([latency for latency, _ in results], elapsed)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from pokepedia.summaries import refresh_pokemon_summaries
+from pokepedia.typechart import clear_type_chart
+
+
+class Command(BaseCommand):
+    help = "Recomputes the denormalized type and weakness summaries of every pokemon"
+
+    def handle(self, *args, **options):
+        clear_type_chart()
+        changed_pokemon = refresh_pokemon_summaries()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"SUCCESS: updated the summaries of {len(changed_pokemon)} pokemon"
+            )
+        )
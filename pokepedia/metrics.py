@@ -0,0 +1,230 @@
+import statistics
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.backends import django as django_backend
+
+DEFAULT_WINDOW = 1000
+
+# metrics of the request being handled; copied into the worker threads of
+# `sync_to_async()`, so async views record their queries too
+_current_metrics = ContextVar("pokepedia_request_metrics", default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.duration = 0.0
+        self.query_count = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started_at
+
+    def get_server_timing(self):
+        return ", ".join(
+            [
+                f"total;dur={self.duration * 1000:.1f}",
+                f'db;dur={self.query_time * 1000:.1f};desc="{self.query_count} queries"',
+                f"template;dur={self.template_time * 1000:.1f}",
+                f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            ]
+        )
+
+
+class RollingStats:
+    """
+    The last `window` requests to one url name, summarized as percentiles.
+
+    Samples are only appended while requests are served; percentiles are
+    computed when the stats are read.
+    """
+
+    fields = ["duration", "query_count", "query_time", "template_time"]
+
+    def __init__(self, window):
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.samples = {field: deque(maxlen=window) for field in self.fields}
+
+    def record(self, metrics):
+        with self.lock:
+            self.request_count += 1
+            self.cache_hits += metrics.cache_hits
+            self.cache_misses += metrics.cache_misses
+            for field, samples in self.samples.items():
+                samples.append(getattr(metrics, field))
+
+    def as_dict(self):
+        with self.lock:
+            samples = {field: list(values) for field, values in self.samples.items()}
+            summary = {
+                "requests": self.request_count,
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+            }
+
+        for field, values in samples.items():
+            # times are reported in milliseconds
+            scale = 1 if field == "query_count" else 1000
+            percentiles = get_percentiles(values)
+            for name, value in percentiles.items():
+                summary[f"{field}_{name}"] = value * scale
+
+        return summary
+
+
+def get_percentiles(values):
+    if len(values) < 2:
+        value = values[0] if values else 0.0
+        return {"p50": value, "p95": value, "p99": value}
+
+    percentiles = statistics.quantiles(values, n=100, method="inclusive")
+
+    return {"p50": percentiles[49], "p95": percentiles[94], "p99": percentiles[98]}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {}
+
+    def record(self, url_name, metrics):
+        stats = self.stats.get(url_name)
+        if stats is None:
+            with self.lock:
+                stats = self.stats.setdefault(
+                    url_name,
+                    RollingStats(
+                        getattr(settings, "POKEPEDIA_METRICS_WINDOW", DEFAULT_WINDOW)
+                    ),
+                )
+        stats.record(metrics)
+
+    def as_dict(self):
+        with self.lock:
+            stats = dict(self.stats)
+
+        return {url_name: stats[url_name].as_dict() for url_name in sorted(stats)}
+
+    def reset(self):
+        with self.lock:
+            self.stats = {}
+
+
+registry = MetricsRegistry()
+
+
+def record_query(execute, sql, params, many, context):
+    # an execute wrapper, installed on every database connection
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    started_at = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.query_time += time.perf_counter() - started_at
+        metrics.query_count += 1
+
+
+def install_query_recorder(connection, **kwargs):
+    """Adds `record_query()` to a new database connection; a signal receiver."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def record_cache_lookup(hit):
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        metrics = _current_metrics.get()
+        if metrics is None:
+            return super().render(context, request)
+
+        started_at = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started_at
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """
+    The Django template backend, timing how long rendering takes.
+
+    Only templates rendered through the backend are timed, so templates they
+    include are counted as part of their parent.
+    """
+
+    def from_string(self, template_code):
+        return Template(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name).template, self)
+
+
+class RequestMetricsMiddleware:
+    """
+    Records the time, queries, template rendering and pokemon cache lookups
+    of every request, per url name, and reports them in a `Server-Timing`
+    header.
+
+    Streamed responses are measured up to their first byte.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+
+        return self.process_response(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+
+        return self.process_response(request, response, metrics)
+
+    def process_response(self, request, response, metrics):
+        metrics.finish()
+        match = request.resolver_match
+        registry.record(match.view_name if match else "<unresolved>", metrics)
+        response.headers["Server-Timing"] = metrics.get_server_timing()
+
+        return response
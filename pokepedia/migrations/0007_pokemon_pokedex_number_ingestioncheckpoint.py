@@ -0,0 +1,40 @@
+# Generated by Django 5.1.15 on 2026-10-18 06:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pokepedia", "0006_alter_pokemon_evolutions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IngestionCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("selection", models.CharField(max_length=255, unique=True)),
+                ("completed_through", models.PositiveIntegerField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="pokemon",
+            name="pokedex_number",
+            field=models.PositiveIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name="pokemon",
+            name="evolutions",
+            field=models.ManyToManyField(to="pokepedia.pokemon"),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-18 06:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pokepedia", "0007_pokemon_pokedex_number_ingestioncheckpoint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="type",
+            name="immunities",
+            field=models.ManyToManyField(
+                blank=True, related_name="+", to="pokepedia.type"
+            ),
+        ),
+        migrations.AddField(
+            model_name="type",
+            name="resistances",
+            field=models.ManyToManyField(
+                blank=True, related_name="+", to="pokepedia.type"
+            ),
+        ),
+    ]
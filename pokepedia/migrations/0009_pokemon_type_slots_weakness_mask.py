@@ -0,0 +1,82 @@
+# Generated by Django 5.1.15 on 2026-10-18 06:47
+
+from django.db import migrations, models
+
+# damage multiplier of each `Type` damage relation, from the defending type's
+# side; the chart and masks are computed here rather than with
+# `pokepedia.typechart`, which may change after this migration
+DAMAGE_RELATIONS = {
+    "weaknesses": 2.0,
+    "resistances": 0.5,
+    "immunities": 0.0,
+}
+
+
+def get_type_chart(Type):
+    # the type names in mask bit order, and the multiplier of each attacking
+    # type against each defending type, when it is not 1x
+    type_names = dict(Type.objects.order_by("pk").values_list("pk", "name"))
+    multipliers = {}
+    for field, multiplier in DAMAGE_RELATIONS.items():
+        for defending_id, attacking_id in getattr(
+            Type, field
+        ).through.objects.values_list("from_type_id", "to_type_id"):
+            multipliers[type_names[defending_id], type_names[attacking_id]] = multiplier
+
+    return list(type_names.values()), multipliers
+
+
+def get_mask(type_chart, defending_names, is_set):
+    # the bits of the attacking types whose combined multiplier `is_set`
+    type_names, multipliers = type_chart
+    mask = 0
+    for index, attacking_name in enumerate(type_names):
+        multiplier = 1.0
+        for defending_name in defending_names:
+            multiplier *= multipliers.get((defending_name, attacking_name), 1.0)
+        if is_set(multiplier):
+            mask |= 1 << index
+
+    return mask
+
+
+def populate_summaries(apps, schema_editor):
+    Pokemon = apps.get_model("pokepedia", "Pokemon")
+    Type = apps.get_model("pokepedia", "Type")
+
+    type_chart = get_type_chart(Type)
+
+    type_slots = {}
+    for pokemon_id, type_name in Pokemon.types.through.objects.order_by(
+        "pk"
+    ).values_list("pokemon_id", "type__name"):
+        type_slots.setdefault(pokemon_id, []).append(type_name)
+
+    pokemon_list = list(Pokemon.objects.filter(pk__in=type_slots))
+    for pokemon in pokemon_list:
+        pokemon.type_slots = type_slots[pokemon.pk]
+        pokemon.weakness_mask = get_mask(
+            type_chart, pokemon.type_slots, lambda multiplier: multiplier > 1.0
+        )
+    Pokemon.objects.bulk_update(pokemon_list, ["type_slots", "weakness_mask"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pokepedia", "0008_type_resistances_immunities"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pokemon",
+            name="type_slots",
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name="pokemon",
+            name="weakness_mask",
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.15 on 2026-10-18 06:56
+
+import django.db.models.deletion
+import pokepedia.lookups
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pokepedia", "0009_pokemon_type_slots_weakness_mask"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PokemonSearchIndex",
+            fields=[
+                (
+                    "pokemon",
+                    models.OneToOneField(
+                        db_column="rowid",
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="search_index",
+                        serialize=False,
+                        to="pokepedia.pokemon",
+                    ),
+                ),
+                (
+                    "document",
+                    pokepedia.lookups.SearchDocumentField(
+                        db_column="pokepedia_pokemon_fts"
+                    ),
+                ),
+                ("rank", models.FloatField()),
+            ],
+            options={
+                "db_table": "pokepedia_pokemon_fts",
+                "managed": False,
+            },
+        ),
+    ]
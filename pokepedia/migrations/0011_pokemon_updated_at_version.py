@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-18 07:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pokepedia", "0010_pokemonsearchindex"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pokemon",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="pokemon",
+            name="version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,136 @@
+# Generated by Django 5.1.15 on 2026-10-18 07:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_chains(apps, schema_editor):
+    # the evolution links are unordered, so the stages of each family follow
+    # pokedex order; `addpokemon --sync` stores the actual trees
+    Pokemon = apps.get_model("pokepedia", "Pokemon")
+    EvolutionChain = apps.get_model("pokepedia", "EvolutionChain")
+
+    links = {}
+    for from_id, to_id in Pokemon.evolutions.through.objects.values_list(
+        "from_pokemon_id", "to_pokemon_id"
+    ):
+        links.setdefault(from_id, set()).add(to_id)
+        links.setdefault(to_id, set()).add(from_id)
+
+    pokemon_list = Pokemon.objects.in_bulk(links)
+    seen_ids = set()
+    changed_pokemon = []
+    for pokemon_id in sorted(links):
+        if pokemon_id in seen_ids:
+            continue
+
+        family_ids = {pokemon_id}
+        pending_ids = [pokemon_id]
+        while pending_ids:
+            for linked_id in links[pending_ids.pop()] - family_ids:
+                family_ids.add(linked_id)
+                pending_ids.append(linked_id)
+        seen_ids |= family_ids
+
+        family = sorted(
+            (pokemon_list[family_id] for family_id in family_ids),
+            key=lambda pokemon: (pokemon.pokedex_number or 0, pokemon.pk),
+        )
+        chain = EvolutionChain.objects.create()
+        for stage, pokemon in enumerate(family):
+            pokemon.evolution_chain = chain
+            pokemon.evolves_from = family[stage - 1] if stage else None
+            pokemon.evolution_stage = stage
+            pokemon.evolution_position = stage
+            changed_pokemon.append(pokemon)
+
+    Pokemon.objects.bulk_update(
+        changed_pokemon,
+        ["evolution_chain", "evolves_from", "evolution_stage", "evolution_position"],
+    )
+
+
+def create_evolution_links(apps, schema_editor):
+    Pokemon = apps.get_model("pokepedia", "Pokemon")
+
+    families = {}
+    for pokemon_id, chain_id in Pokemon.objects.filter(
+        evolution_chain__isnull=False
+    ).values_list("pk", "evolution_chain_id"):
+        families.setdefault(chain_id, []).append(pokemon_id)
+
+    Pokemon.evolutions.through.objects.bulk_create(
+        [
+            Pokemon.evolutions.through(from_pokemon_id=from_id, to_pokemon_id=to_id)
+            for family in families.values()
+            for from_id in family
+            for to_id in family
+            if from_id != to_id
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pokepedia", "0011_pokemon_updated_at_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EvolutionChain",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "api_id",
+                    models.PositiveIntegerField(blank=True, null=True, unique=True),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="pokemon",
+            name="evolution_position",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="pokemon",
+            name="evolution_stage",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="pokemon",
+            name="evolves_from",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="evolves_to",
+                to="pokepedia.pokemon",
+            ),
+        ),
+        migrations.AddField(
+            model_name="pokemon",
+            name="evolution_chain",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="pokemon",
+                to="pokepedia.evolutionchain",
+            ),
+        ),
+        migrations.RunPython(create_chains, create_evolution_links),
+        migrations.RemoveField(
+            model_name="pokemon",
+            name="evolutions",
+        ),
+    ]
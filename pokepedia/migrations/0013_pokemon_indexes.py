@@ -0,0 +1,51 @@
+# Generated by Django 5.1.15 on 2026-10-18 07:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pokepedia", "0012_evolutionchain"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="pokemon",
+            name="evolution_chain",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="pokemon",
+                to="pokepedia.evolutionchain",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pokemon",
+            index=models.Index(fields=["genus"], name="pokemon_genus_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="pokemon",
+            index=models.Index(
+                fields=["evolution_chain", "evolution_position"],
+                name="pokemon_evolution_tree_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pokemon",
+            index=models.Index(
+                fields=["updated_at", "version"], name="pokemon_list_state_idx"
+            ),
+        ),
+        # the list's type filter reads pokemon ids straight from this index;
+        # the through table of `Pokemon.types` has no model to declare it on
+        migrations.RunSQL(
+            "CREATE INDEX pokemon_types_type_idx "
+            "ON pokepedia_pokemon_types (type_id, pokemon_id)",
+            "DROP INDEX pokemon_types_type_idx",
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 07:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pokepedia", "0013_pokemon_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pokemon",
+            name="sprite",
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+    ]
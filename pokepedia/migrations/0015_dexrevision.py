@@ -0,0 +1,46 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:00
+
+from django.db import migrations, models
+
+
+def drop_revision_triggers(apps, schema_editor):
+    # the triggers `pokepedia.snapshot` creates after `migrate`, which would
+    # fail every write to the pokemon and type tables once the revision table
+    # is dropped
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE type = 'trigger' AND name LIKE 'pokepedia\\_dexrevision\\_%' "
+            "ESCAPE '\\'"
+        )
+        for (name,) in cursor.fetchall():
+            cursor.execute(f'DROP TRIGGER "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pokepedia", "0014_pokemon_sprite"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DexRevision",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("revision", models.BigIntegerField()),
+            ],
+        ),
+        migrations.RunPython(migrations.RunPython.noop, drop_revision_triggers),
+    ]
@@ -1,37 +1,252 @@
+from functools import cached_property
+
 from django.db import models
+from django.db.models import Max
+from django.urls import reverse
+
+from pokepedia.lookups import SearchDocumentField
+from pokepedia.typechart import get_type_chart
 
 
 # Create your models here.
 class Pokemon(models.Model):
+    pokedex_number = models.PositiveIntegerField(unique=True, null=True, blank=True)
     image = models.URLField()
+    # name of the local copy of `image` in the `SpriteStore`, if any
+    sprite = models.CharField(max_length=100, blank=True, editable=False)
     name = models.CharField(max_length=100, unique=True)
     genus = models.CharField(max_length=50)
     types = models.ManyToManyField("pokepedia.Type")
     height = models.FloatField()
     weight = models.FloatField()
     flavor_text = models.TextField()
-    evolutions = models.ManyToManyField("self")
+
+    # place in the evolution family, see `EvolutionChain`
+    evolution_chain = models.ForeignKey(
+        "pokepedia.EvolutionChain",
+        null=True,
+        blank=True,
+        editable=False,
+        on_delete=models.SET_NULL,
+        related_name="pokemon",
+        # covered by `pokemon_evolution_tree_idx`
+        db_index=False,
+    )
+    evolves_from = models.ForeignKey(
+        "self",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="evolves_to",
+    )
+    evolution_stage = models.PositiveSmallIntegerField(default=0, editable=False)
+    evolution_position = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    # denormalized from `types`, see `pokepedia.summaries`
+    type_slots = models.JSONField(default=list, blank=True, editable=False)
+    weakness_mask = models.BigIntegerField(default=0, editable=False)
+    # types doing less than normal damage, immunities included
+    resistance_mask = models.BigIntegerField(default=0, editable=False)
+
+    # bumped on every change that shows on the pokemon's pages, see
+    # `pokepedia.summaries.touch_pokemon()`
+    updated_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    class Meta:
+        indexes = [
+            # the admin's genus filter, and the list of genera it offers
+            models.Index(fields=["genus"], name="pokemon_genus_idx"),
+            # evolution trees, read in chain order
+            models.Index(
+                fields=["evolution_chain", "evolution_position"],
+                name="pokemon_evolution_tree_idx",
+            ),
+            # covers the aggregates of `get_list_state_aggregates()`, so list
+            # requests do not read every row of the table
+            models.Index(
+                fields=["updated_at", "version"], name="pokemon_list_state_idx"
+            ),
+            # the height and weight ranges of `PokemonFilter`
+            models.Index(fields=["height"], name="pokemon_height_idx"),
+            models.Index(fields=["weight"], name="pokemon_weight_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # tells `save()` whether `evolves_from` changed, and signal receivers
+        # which chain the pokemon left
+        instance.loaded_evolution = (
+            instance.__dict__.get("evolves_from_id", models.DEFERRED),
+            instance.__dict__.get("evolution_chain_id"),
+        )
+        # a new image makes the stored sprite outdated
+        instance.loaded_image = instance.__dict__.get("image", models.DEFERRED)
+
+        return instance
+
+    def save(self, *args, **kwargs):
+        changed_fields = set()
+        if not self._state.adding:
+            self.version += 1
+            changed_fields.update(["updated_at", "version"])
+
+        loaded_evolves_from_id = getattr(self, "loaded_evolution", (None, None))[0]
+        if loaded_evolves_from_id is not models.DEFERRED and (
+            self.evolves_from_id != loaded_evolves_from_id
+        ):
+            self.move_in_evolution_chain()
+            changed_fields.update(
+                ["evolution_chain", "evolution_stage", "evolution_position"]
+            )
+
+        loaded_image = getattr(self, "loaded_image", models.DEFERRED)
+        if loaded_image is not models.DEFERRED and self.image != loaded_image:
+            self.sprite = ""
+            changed_fields.add("sprite")
+
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], *changed_fields}
+
+        super().save(*args, **kwargs)
+        self.loaded_evolution = (self.evolves_from_id, self.evolution_chain_id)
+        self.loaded_image = self.image
+
+    def move_in_evolution_chain(self):
+        """
+        Places this pokemon after `evolves_from` in its chain, creating the
+        chain if `evolves_from` has none; without `evolves_from`, the pokemon
+        leaves its chain.
+
+        The pokemon evolving from this one move along, below it: into the
+        chain of `evolves_from`, or into a chain of their own when this
+        pokemon leaves its chain.
+        """
+        descendants = self.get_descendants()
+        parent = self.evolves_from
+        if parent is None:
+            self.evolution_chain = (
+                EvolutionChain.objects.create() if descendants else None
+            )
+            self.evolution_stage = 0
+            self.evolution_position = 0
+        else:
+            if parent.evolution_chain_id is None:
+                parent.evolution_chain = EvolutionChain.objects.create()
+                parent.save(update_fields=["evolution_chain"])
+
+            last_position = parent.evolution_chain.pokemon.exclude(
+                pk__in=[self.pk, *(pokemon.pk for pokemon, _ in descendants)]
+            ).aggregate(last_position=Max("evolution_position"))["last_position"]
+            self.evolution_chain_id = parent.evolution_chain_id
+            self.evolution_stage = parent.evolution_stage + 1
+            self.evolution_position = last_position + 1
+
+        for position, (pokemon, depth) in enumerate(
+            descendants, self.evolution_position + 1
+        ):
+            pokemon.evolution_chain_id = self.evolution_chain_id
+            pokemon.evolution_stage = self.evolution_stage + depth
+            pokemon.evolution_position = position
+        Pokemon.objects.bulk_update(
+            [pokemon for pokemon, _ in descendants],
+            ["evolution_chain", "evolution_stage", "evolution_position"],
+        )
+
+    def get_descendants(self):
+        # `(pokemon, depth)` of every pokemon evolving from this one, directly
+        # or not, depth-first; they are all in the chain it was loaded with
+        chain_id = getattr(self, "loaded_evolution", (None, None))[1]
+        if self.pk is None or chain_id is None:
+            return []
+
+        evolutions = {}
+        for pokemon in (
+            Pokemon.objects.filter(evolution_chain_id=chain_id)
+            .exclude(pk=self.pk)
+            .only("evolves_from", "evolution_stage", "evolution_position")
+            .order_by("evolution_position", "pk")
+        ):
+            evolutions.setdefault(pokemon.evolves_from_id, []).append(pokemon)
+
+        descendants = []
+        stack = [(pokemon, 1) for pokemon in reversed(evolutions.get(self.pk, []))]
+        while stack:
+            pokemon, depth = stack.pop()
+            descendants.append((pokemon, depth))
+            stack.extend(
+                (evolution, depth + 1)
+                for evolution in reversed(evolutions.get(pokemon.pk, []))
+            )
+
+        return descendants
+
+    def get_image_url(self):
+        # the local copy, when there is one, saves a request to another host
+        if self.sprite:
+            return reverse("pokemon-sprite", args=[self.sprite])
+
+        return self.image
+
+    def get_thumbnail_url(self):
+        if self.sprite:
+            return reverse("pokemon-sprite-thumbnail", args=[self.sprite])
+
+        return ""
+
+    def get_type_names(self):
+        return self.type_slots
+
     def get_weaknesses(self):
-        results = []
+        weaknesses = get_type_chart().get_weaknesses(self.get_type_names())
 
-        types = self.types.all()
-        for pokemon_type in types:
-            weaknesses = pokemon_type.weaknesses.all()
-            for weakness in weaknesses:
-                results.append(weakness.name)
+        return ", ".join(name for name, multiplier in weaknesses)
 
-        return ", ".join(results)
+    def get_resistances(self):
+        resistances = get_type_chart().get_resistances(self.get_type_names())
 
-    def get_evolutions_list(self):
-        evolutions_list = []
-        for evolution in self.evolutions.all():
-            evolutions_list.append(evolution.name)
+        return ", ".join(name for name, multiplier in resistances)
+
+    def get_immunities(self):
+        immunities = get_type_chart().get_immunities(self.get_type_names())
+
+        return ", ".join(name for name, multiplier in immunities)
 
-        return evolutions_list
+    @cached_property
+    def evolution_tree(self):
+        """Every pokemon of this pokemon's chain, in stage and branch order."""
+        if self.evolution_chain_id is None:
+            return [self]
+
+        return list(self.get_evolution_tree_queryset())
+
+    def get_evolution_tree_queryset(self):
+        return (
+            Pokemon.objects.filter(evolution_chain_id=self.evolution_chain_id)
+            .only("name", "evolves_from", "evolution_stage", "evolution_position")
+            .order_by("evolution_position", "pk")
+        )
+
+    async def aload_evolution_tree(self):
+        """Loads `evolution_tree` with the async ORM, for async views."""
+        if self.evolution_chain_id is None:
+            self.evolution_tree = [self]
+            return
+
+        self.evolution_tree = [
+            pokemon async for pokemon in self.get_evolution_tree_queryset()
+        ]
+
+    def get_evolutions_list(self):
+        return [
+            evolution.name
+            for evolution in self.evolution_tree
+            if evolution.pk != self.pk
+        ]
 
     def get_types(self):
         return ", ".join([type.name for type in self.types.all()])
@@ -39,6 +254,22 @@ class Pokemon(models.Model):
     get_evolutions_list.short_description = "Evolution(s)"
     get_types.short_description = "Type(s)"
     get_weaknesses.short_description = "Weakness(es)"
+    get_resistances.short_description = "Resistance(s)"
+    get_immunities.short_description = "Immunity(ies)"
+
+
+class EvolutionChain(models.Model):
+    """
+    An evolution family. Its pokemon point to it, and to the pokemon they
+    evolve from, with `evolution_position` ordering them depth-first, so a
+    whole family tree is read with one query.
+    """
+
+    # PokeAPI evolution chain id; chains created by hand have none
+    api_id = models.PositiveIntegerField(unique=True, null=True, blank=True)
+
+    def __str__(self):
+        return f"Evolution chain #{self.api_id or self.pk}"
 
 
 class Type(models.Model):
@@ -47,6 +278,18 @@ class Type(models.Model):
         "self",
         symmetrical=False,
     )
+    resistances = models.ManyToManyField(
+        "self",
+        symmetrical=False,
+        related_name="+",
+        blank=True,
+    )
+    immunities = models.ManyToManyField(
+        "self",
+        symmetrical=False,
+        related_name="+",
+        blank=True,
+    )
 
     def __str__(self):
         return self.name
@@ -55,3 +298,46 @@ class Type(models.Model):
         return ", ".join([weakness.name for weakness in self.weaknesses.all()])
 
     get_weaknesses.short_description = "Weakness(es)"
+
+
+class PokemonSearchIndex(models.Model):
+    # the FTS5 table created by `pokepedia.search.install_search_index()`
+    pokemon = models.OneToOneField(
+        Pokemon,
+        primary_key=True,
+        db_column="rowid",
+        on_delete=models.DO_NOTHING,
+        related_name="search_index",
+    )
+    document = SearchDocumentField(db_column="pokepedia_pokemon_fts")
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "pokepedia_pokemon_fts"
+
+
+class DexRevision(models.Model):
+    """
+    Counts the changes to pokemon and types, in a row bumped by the triggers
+    of `pokepedia.snapshot.install_revision_triggers()`, so every process can
+    tell whether its `PokedexSnapshot` is still current.
+
+    Another row counts the changes to types alone, for `TypeChart`s, see
+    `pokepedia.typechart.bump_type_chart_revision()`.
+    """
+
+    revision = models.BigIntegerField()
+
+    def __str__(self):
+        return f"Revision {self.revision}"
+
+
+class IngestionCheckpoint(models.Model):
+    # progress of an `addpokemon` run, committed together with each batch
+    selection = models.CharField(max_length=255, unique=True)
+    completed_through = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.selection} (completed through #{self.completed_through})"
@@ -0,0 +1,308 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+BASE_API_URL = "https://pokeapi.co/api/v2"
+DEFAULT_CONCURRENCY = 8
+DEFAULT_CACHE_TTL = 60 * 60 * 24
+
+
+class CacheMiss(Exception):
+    pass
+
+
+def write_file(path, content):
+    # write to a temporary file first so readers never see partial content
+    path.parent.mkdir(parents=True, exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=path.parent)
+    with os.fdopen(file_descriptor, "wb") as temporary_file:
+        temporary_file.write(content)
+    os.replace(temporary_path, path)
+
+
+class CachedResponse:
+    def __init__(self, url, digest, fetched_at, etag=None, last_modified=None):
+        self.url = url
+        self.digest = digest
+        self.fetched_at = fetched_at
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def is_fresh(self, ttl):
+        return time.time() - self.fetched_at < ttl
+
+    def get_validators(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        return headers
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk store of PokeAPI responses.
+
+    Response bodies are saved once per distinct content under
+    `objects/<sha256>.json`, and `index/<sha256 of url>.json` records which body
+    a url last returned along with its fetch time and validators. A snapshot
+    archive is a zip file with the same layout; it is only ever read from, and
+    is consulted when the cache directory has no entry for a url.
+    """
+
+    def __init__(self, directory=None, ttl=DEFAULT_CACHE_TTL, archive=None):
+        self.directory = Path(directory) if directory else None
+        self.ttl = ttl
+        self.archive = zipfile.ZipFile(archive) if archive else None
+
+    @staticmethod
+    def get_key(url):
+        return hashlib.sha256(url.rstrip("/").encode()).hexdigest()
+
+    def lookup(self, url):
+        index_path = f"index/{self.get_key(url)}.json"
+        metadata = self._read(index_path)
+        if metadata is None:
+            return None
+
+        return CachedResponse(**json.loads(metadata))
+
+    def load(self, entry):
+        content = self._read(f"objects/{entry.digest}.json")
+        if content is None:
+            raise CacheMiss(f"missing cached content for {entry.url}")
+
+        return json.loads(content)
+
+    def store(self, url, content, etag=None, last_modified=None):
+        digest = hashlib.sha256(content).hexdigest()
+        entry = CachedResponse(url, digest, time.time(), etag, last_modified)
+
+        if self.directory:
+            object_path = self.directory / "objects" / f"{digest}.json"
+            if not object_path.exists():
+                self._write(object_path, content)
+            self.refresh(entry)
+
+        return entry
+
+    def refresh(self, entry):
+        entry.fetched_at = time.time()
+        if self.directory is None:
+            return
+
+        self._write(
+            self.directory / "index" / f"{self.get_key(entry.url)}.json",
+            json.dumps(vars(entry)).encode(),
+        )
+
+    def export(self, archive_path):
+        """Writes every cached response to a snapshot archive at `archive_path`."""
+        with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            for path in sorted(self.directory.glob("*/*.json")):
+                archive.write(path, path.relative_to(self.directory).as_posix())
+
+    def close(self):
+        if self.archive:
+            self.archive.close()
+
+    def _read(self, relative_path):
+        if self.directory and (self.directory / relative_path).exists():
+            return (self.directory / relative_path).read_bytes()
+
+        if self.archive:
+            try:
+                return self.archive.read(relative_path)
+            except KeyError:
+                return None
+
+        return None
+
+    def _write(self, path, content):
+        write_file(path, content)
+
+
+class PokeAPIClient:
+    """
+    Thin PokeAPI client that shares one pooled `requests.Session` between a
+    bounded pool of worker threads.
+
+    Pokemon, species and evolution chain lookups are pipelined: a pokemon's
+    species is requested by the same worker right after the pokemon itself,
+    and its evolution chain is queued as soon as the species response names it.
+
+    When given a `ResponseCache`, fresh responses are served from it, stale ones
+    are revalidated with their ETag, and `offline` clients never touch the
+    network at all.
+    """
+
+    def __init__(
+        self,
+        base_url=BASE_API_URL,
+        concurrency=DEFAULT_CONCURRENCY,
+        session=None,
+        timeout=30,
+        cache=None,
+        offline=False,
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.session = session or self._build_session()
+        self.cache = cache
+        self.offline = offline
+
+        if offline and cache is None:
+            raise ValueError("offline clients need a response cache")
+
+    def _build_session(self):
+        session = Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.concurrency,
+            pool_maxsize=self.concurrency,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+            ),
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        return session
+
+    def url(self, path):
+        if path.startswith(("http://", "https://")):
+            return path
+
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def get(self, path):
+        url = self.url(path)
+        if self.cache is None:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+
+            return response.json()
+
+        entry = self.cache.lookup(url)
+        if entry and (self.offline or entry.is_fresh(self.cache.ttl)):
+            return self.cache.load(entry)
+        if self.offline:
+            raise CacheMiss(f"{url} is not cached")
+
+        headers = entry.get_validators() if entry else {}
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+
+        if entry and response.status_code == 304:
+            self.cache.refresh(entry)
+            return self.cache.load(entry)
+
+        response.raise_for_status()
+        self.cache.store(
+            url,
+            response.content,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+
+        return response.json()
+
+    def close(self):
+        self.session.close()
+        if self.cache:
+            self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def fetch_types(self):
+        """Returns the full `/type/{name}` resource of every type, in API order."""
+        type_results = self.get("type/")["results"]
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return list(
+                executor.map(lambda result: self.get(result["url"]), type_results)
+            )
+
+    def fetch_pokemon(self, pokemon_indices):
+        """
+        Returns `(entries, chains)` for the given national pokedex numbers.
+
+        `entries` is a list of `(pokemon, species)` resource pairs ordered like
+        `pokemon_indices`, and `chains` maps each evolution chain url referenced
+        by those species to its resource.
+        """
+        pokemon_indices = list(pokemon_indices)
+        entries = [None] * len(pokemon_indices)
+        chains = {}
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            entry_futures = {
+                executor.submit(self._fetch_entry, pokemon_index): position
+                for position, pokemon_index in enumerate(pokemon_indices)
+            }
+            chain_futures = {}
+
+            for future in as_completed(entry_futures):
+                pokemon, species = future.result()
+                entries[entry_futures[future]] = (pokemon, species)
+
+                chain_url = species["evolution_chain"]["url"]
+                if chain_url not in chain_futures:
+                    chain_futures[chain_url] = executor.submit(self.get, chain_url)
+
+            for chain_url, future in chain_futures.items():
+                chains[chain_url] = future.result()
+
+        return entries, chains
+
+    def iter_pokemon_batches(self, pokemon_indices, batch_size):
+        """
+        Yields `(indices, entries, chains)` like `fetch_pokemon()` for
+        consecutive batches of `pokemon_indices`.
+
+        The next batch is retrieved in the background while the caller
+        processes the current one.
+        """
+        pokemon_indices = list(pokemon_indices)
+        batches = [
+            pokemon_indices[start : start + batch_size]
+            for start in range(0, len(pokemon_indices), batch_size)
+        ]
+        if not batches:
+            return
+
+        with ThreadPoolExecutor(max_workers=1) as prefetcher:
+            future = prefetcher.submit(self.fetch_pokemon, batches[0])
+            for position, batch in enumerate(batches):
+                entries, chains = future.result()
+                if position + 1 < len(batches):
+                    future = prefetcher.submit(
+                        self.fetch_pokemon, batches[position + 1]
+                    )
+
+                yield batch, entries, chains
+
+    def _fetch_entry(self, pokemon_index):
+        pokemon = self.get(f"pokemon/{pokemon_index}")
+        species = self.get(pokemon["species"]["url"])
+
+        return pokemon, species
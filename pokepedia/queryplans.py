@@ -0,0 +1,50 @@
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# an SQLite plan step reading a whole table, rather than searching it or
+# scanning one of its indexes; scans of subquery results are not full scans
+FULL_SCAN = re.compile(r"^SCAN (?!subquery)(?P<table>\w+)$")
+
+
+def is_explain_supported(using=connection):
+    return using.vendor == "sqlite"
+
+
+def get_query_plan(sql, using=connection):
+    """Returns the `EXPLAIN QUERY PLAN` steps of `sql`, one string per step."""
+    with using.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+
+        return [detail for _, _, _, detail in cursor.fetchall()]
+
+
+def capture_query_plans(function, using=connection):
+    """
+    Calls `function` and returns `(sql, plan)` for every query it ran.
+
+    Running the real code path, e.g., a request through the test client,
+    checks the queries the project actually makes.
+    """
+    with CaptureQueriesContext(using) as queries:
+        function()
+
+    return [
+        (query["sql"], get_query_plan(query["sql"], using))
+        for query in queries
+        if query["sql"].lstrip().upper().startswith("SELECT")
+    ]
+
+
+def find_full_scans(query_plans, allowed_tables=()):
+    """
+    Returns `(sql, table)` for every full table scan in `query_plans`, apart
+    from scans of `allowed_tables`.
+    """
+    return [
+        (sql, match["table"])
+        for sql, plan in query_plans
+        for step in plan
+        if (match := FULL_SCAN.match(step)) and match["table"] not in allowed_tables
+    ]
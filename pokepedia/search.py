@@ -0,0 +1,98 @@
+import re
+
+from django.db import connections
+
+from pokepedia.models import PokemonSearchIndex
+
+SEARCH_TABLE = PokemonSearchIndex._meta.db_table
+SEARCH_TRIGGERS = {
+    f"{SEARCH_TABLE}_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert
+        AFTER INSERT ON pokepedia_pokemon BEGIN
+            INSERT INTO {SEARCH_TABLE}(rowid, name, genus, flavor_text)
+            VALUES (new.id, new.name, new.genus, new.flavor_text);
+        END
+    """,
+    f"{SEARCH_TABLE}_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete
+        AFTER DELETE ON pokepedia_pokemon BEGIN
+            INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, genus, flavor_text)
+            VALUES ('delete', old.id, old.name, old.genus, old.flavor_text);
+        END
+    """,
+    f"{SEARCH_TABLE}_update": f"""
+        CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update
+        AFTER UPDATE OF name, genus, flavor_text ON pokepedia_pokemon BEGIN
+            INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, genus, flavor_text)
+            VALUES ('delete', old.id, old.name, old.genus, old.flavor_text);
+            INSERT INTO {SEARCH_TABLE}(rowid, name, genus, flavor_text)
+            VALUES (new.id, new.name, new.genus, new.flavor_text);
+        END
+    """,
+}
+
+
+def is_search_available(using="default"):
+    return connections[using].vendor == "sqlite"
+
+
+def install_search_index(using="default", **kwargs):
+    """
+    Creates the SQLite FTS5 index of pokemon names, genera and flavor texts,
+    and the triggers that keep it in sync with `pokepedia_pokemon`.
+
+    Runs after every `migrate`: SQLite migrations often rebuild the pokemon
+    table, which drops its triggers, so missing triggers are recreated and
+    the index is rebuilt from the table.
+    """
+    if not is_search_available(using):
+        return
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN (%s)"
+            % ", ".join(["%s"] * len(SEARCH_TRIGGERS)),
+            list(SEARCH_TRIGGERS),
+        )
+        if len(cursor.fetchall()) == len(SEARCH_TRIGGERS):
+            return
+
+        # the prefix indexes keep typeahead (prefix) queries fast, and matches
+        # in names rank higher than matches in genera and flavor texts
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+                name, genus, flavor_text,
+                content='pokepedia_pokemon', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'
+            )
+            """)
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rank) "
+            "VALUES ('rank', 'bm25(10.0, 4.0, 1.0)')"
+        )
+        for trigger_sql in SEARCH_TRIGGERS.values():
+            cursor.execute(trigger_sql)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+
+
+def get_match_query(query):
+    # every word of the query has to match the start of a word, in any column
+    words = re.findall(r"\w+", query)
+
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_pokemon(queryset, query):
+    """
+    Filters `queryset` to the pokemon matching `query`, best matches first.
+
+    Falls back to an unranked substring search of names on databases without
+    the FTS5 index.
+    """
+    match_query = get_match_query(query)
+    if not match_query or not is_search_available(queryset.db):
+        return queryset.filter(name__icontains=query)
+
+    return queryset.filter(search_index__document__match=match_query).order_by(
+        "search_index__rank", "pk"
+    )
@@ -0,0 +1,77 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from pokepedia.cache import clear_pokemon_cache, invalidate_pokemon
+from pokepedia.models import Pokemon, Type
+from pokepedia.summaries import (
+    SUMMARY_FIELDS,
+    refresh_pokemon_summaries,
+    touch_pokemon,
+)
+from pokepedia.typechart import bump_type_chart_revision, clear_type_chart
+
+
+@receiver(post_save, sender=Type)
+@receiver(post_delete, sender=Type)
+@receiver(m2m_changed, sender=Type.weaknesses.through)
+@receiver(m2m_changed, sender=Type.resistances.through)
+@receiver(m2m_changed, sender=Type.immunities.through)
+def type_chart_changed(action=None, raw=False, **kwargs):
+    if raw or action in ("pre_add", "pre_remove", "pre_clear"):
+        return
+
+    clear_type_chart()
+    bump_type_chart_revision()
+    clear_pokemon_cache()
+    refresh_pokemon_summaries()
+    # every pokemon page shows damage relations
+    touch_pokemon()
+
+
+@receiver(m2m_changed, sender=Pokemon.types.through)
+def pokemon_types_changed(instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if reverse:
+        refresh_pokemon_summaries(None if action == "post_clear" else pk_set)
+        return
+
+    for pokemon in refresh_pokemon_summaries([instance.pk]):
+        for field in SUMMARY_FIELDS:
+            setattr(instance, field, getattr(pokemon, field))
+
+
+def get_family_ids(pokemon):
+    # the other pokemon whose evolution tree shows `pokemon`, including the
+    # chain it was loaded with, in case it moved to another one
+    chain_ids = {
+        pokemon.evolution_chain_id,
+        getattr(pokemon, "loaded_evolution", (None, None))[1],
+    } - {None}
+    if not chain_ids:
+        return []
+
+    return list(
+        Pokemon.objects.filter(evolution_chain_id__in=chain_ids)
+        .exclude(pk=pokemon.pk)
+        .values_list("pk", flat=True)
+    )
+
+
+@receiver(post_save, sender=Pokemon)
+def pokemon_saved(instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    family_ids = get_family_ids(instance)
+    touch_pokemon(family_ids)
+    invalidate_pokemon([instance.pk, *family_ids])
+
+
+@receiver(pre_delete, sender=Pokemon)
+def pokemon_deleted(instance, **kwargs):
+    touch_pokemon(get_family_ids(instance))
+
+
+post_delete.connect(clear_pokemon_cache, sender=Pokemon)
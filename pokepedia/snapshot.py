@@ -0,0 +1,386 @@
+import threading
+from bisect import bisect_left, bisect_right
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import connections
+
+from pokepedia.models import DexRevision, Pokemon, Type
+from pokepedia.typechart import clear_type_chart, get_type_chart
+
+REVISION_TABLE = DexRevision._meta.db_table
+REVISION_ID = 1
+# every table whose rows show on the pokemon pages
+REVISED_TABLES = [
+    model._meta.db_table
+    for model in [
+        Pokemon,
+        Pokemon.types.through,
+        Type,
+        Type.weaknesses.through,
+        Type.resistances.through,
+        Type.immunities.through,
+    ]
+]
+# a revision row created anew, e.g., after a flush, starts at a random value,
+# so that it does not go back to a revision a process already loaded
+REVISION_TRIGGERS = {f"{REVISION_TABLE}_{table}_{event.lower()}": f"""
+        CREATE TRIGGER IF NOT EXISTS {REVISION_TABLE}_{table}_{event.lower()}
+        AFTER {event} ON {table} BEGIN
+            INSERT INTO {REVISION_TABLE}(id, revision)
+            VALUES ({REVISION_ID}, random() % 1000000000000)
+            ON CONFLICT(id) DO UPDATE SET revision = revision + 1;
+        END
+    """ for table in REVISED_TABLES for event in ["INSERT", "UPDATE", "DELETE"]}
+# the fields `PokemonFilter` selects ranges of
+RANGE_FIELDS = ["height", "weight"]
+# positions of the set bits of every byte value
+BYTE_POSITIONS = [
+    tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)
+]
+# most bitsets kept per range field, see `PokedexSnapshot.get_rank_bits()`
+MAX_RANK_BITSETS = 256
+RECORD_FIELDS = [
+    "pokedex_number",
+    "image",
+    "sprite",
+    "name",
+    "genus",
+    "height",
+    "weight",
+    "flavor_text",
+    "evolution_chain_id",
+    "evolves_from_id",
+    "evolution_stage",
+    "evolution_position",
+    "type_slots",
+    "weakness_mask",
+    "resistance_mask",
+    "updated_at",
+    "version",
+]
+
+
+def is_snapshot_available(using="default"):
+    return connections[using].vendor == "sqlite"
+
+
+def is_snapshot_enabled(using="default"):
+    return getattr(settings, "POKEPEDIA_SNAPSHOT", False) and is_snapshot_available(
+        using
+    )
+
+
+def install_revision_triggers(using="default", **kwargs):
+    """
+    Creates the triggers that bump the `DexRevision` on every change to
+    pokemon and types, whatever makes it: `save()`, bulk queries, or another
+    process.
+
+    Runs after every `migrate`, like `install_search_index()`, as SQLite
+    migrations often rebuild the tables, which drops their triggers.
+    """
+    if not is_snapshot_available(using):
+        return
+    # e.g., after migrating back past the migration creating it
+    if REVISION_TABLE not in connections[using].introspection.table_names():
+        return
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN (%s)"
+            % ", ".join(["%s"] * len(REVISION_TRIGGERS)),
+            list(REVISION_TRIGGERS),
+        )
+        if len(cursor.fetchall()) == len(REVISION_TRIGGERS):
+            return
+
+        for trigger_sql in REVISION_TRIGGERS.values():
+            cursor.execute(trigger_sql)
+
+
+def make_bitset(positions, size):
+    """Returns an int of `size` bits, with the bits at `positions` set."""
+    bits = bytearray((size + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+
+    return int.from_bytes(bits, "little")
+
+
+def iter_positions(bitset):
+    """Yields the positions of the bits set in `bitset`, lowest first."""
+    for index, byte in enumerate(
+        bitset.to_bytes((bitset.bit_length() + 7) // 8, "little")
+    ):
+        if byte:
+            for bit in BYTE_POSITIONS[byte]:
+                yield index * 8 + bit
+
+
+def get_revision(using="default"):
+    # None until the first change
+    return (
+        DexRevision.objects.using(using)
+        .filter(pk=REVISION_ID)
+        .values_list("revision", flat=True)
+        .first()
+    )
+
+
+class PokemonRecord:
+    """
+    A read-only pokemon of a `PokedexSnapshot`, with the fields and methods
+    the pokemon pages use.
+    """
+
+    __slots__ = ["pk", *RECORD_FIELDS, "position", "evolution_tree"]
+
+    # the model's methods only read fields that records have
+    get_image_url = Pokemon.get_image_url
+    get_thumbnail_url = Pokemon.get_thumbnail_url
+    get_type_names = Pokemon.get_type_names
+    get_weaknesses = Pokemon.get_weaknesses
+    get_resistances = Pokemon.get_resistances
+    get_immunities = Pokemon.get_immunities
+    get_evolutions_list = Pokemon.get_evolutions_list
+
+    def __init__(self, pk, *values):
+        self.pk = pk
+        for field, value in zip(RECORD_FIELDS, values):
+            setattr(self, field, value)
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f"<PokemonRecord: {self.name}>"
+
+
+class PokedexSnapshot:
+    """
+    Every pokemon as of `revision`, as `PokemonRecord`s in pk order, indexed
+    by id.
+
+    For `PokemonFilter`, the pokemon of each type, and those weak to and
+    resisting each type, are bitsets: ints with the bit at each record's
+    `position` in `pokemon_list` set. Heights and weights are sorted along
+    with the positions they belong to, and the bitsets of their lowest
+    values are kept every `rank_step` ranks.
+
+    Snapshots are never changed once loaded, so requests share them without
+    locking; a change to the database makes `get_snapshot()` load a new one.
+    """
+
+    def __init__(self, revision, records, type_links, type_chart):
+        self.revision = revision
+        self.pokemon_list = tuple(records)
+        self.by_id = {record.pk: record for record in self.pokemon_list}
+        for position, record in enumerate(self.pokemon_list):
+            record.position = position
+
+        size = len(self.pokemon_list)
+        self.all_bits = (1 << size) - 1
+
+        type_positions = {}
+        for type_id, pokemon_id in type_links:
+            if pokemon_id in self.by_id:
+                record = self.by_id[pokemon_id]
+                type_positions.setdefault(type_id, []).append(record.position)
+        self.type_bits = {
+            type_id: make_bitset(positions, size)
+            for type_id, positions in type_positions.items()
+        }
+        # mask bits follow the order of the type chart
+        self.weakness_bits, self.resistance_bits = [
+            {
+                type_chart.type_ids[index]: make_bitset(
+                    (
+                        record.position
+                        for record in self.pokemon_list
+                        if getattr(record, field) >> index & 1
+                    ),
+                    size,
+                )
+                for index in range(len(type_chart.type_ids))
+            }
+            for field in ["weakness_mask", "resistance_mask"]
+        ]
+        self.rank_step = max(64, -(-size // MAX_RANK_BITSETS))
+        self.sorted_values = {}
+        for field in RANGE_FIELDS:
+            records = sorted(self.pokemon_list, key=attrgetter(field))
+            positions = [record.position for record in records]
+            rank_bits = [0]
+            for start in range(0, size, self.rank_step):
+                rank_bits.append(
+                    rank_bits[-1]
+                    | make_bitset(positions[start : start + self.rank_step], size)
+                )
+            self.sorted_values[field] = (
+                [getattr(record, field) for record in records],
+                positions,
+                rank_bits,
+            )
+
+        # the whole family of a chain shares the tuple of its tree
+        trees = {}
+        for record in sorted(
+            self.pokemon_list, key=attrgetter("evolution_position", "pk")
+        ):
+            if record.evolution_chain_id is not None:
+                trees.setdefault(record.evolution_chain_id, []).append(record)
+        trees = {chain_id: tuple(tree) for chain_id, tree in trees.items()}
+        for record in self.pokemon_list:
+            record.evolution_tree = trees.get(record.evolution_chain_id, (record,))
+
+        # what `get_list_state_aggregates()` computes
+        self.list_state = {
+            "count": len(self.pokemon_list),
+            "updated_at": max(
+                (record.updated_at for record in self.pokemon_list), default=None
+            ),
+            "versions": sum(record.version for record in self.pokemon_list) or None,
+        }
+
+    def get_rank_bits(self, field, rank):
+        # the bitset of the `rank` pokemon with the lowest `field`: the kept
+        # bitset below it, and at most `rank_step` more positions
+        _, positions, rank_bits = self.sorted_values[field]
+        step = rank // self.rank_step
+        start = step * self.rank_step
+
+        return rank_bits[step] | make_bitset(
+            positions[start:rank], len(self.pokemon_list)
+        )
+
+    def get_range_bits(self, field, minimum=None, maximum=None):
+        """
+        Returns the bitset of the pokemon whose `field` is between `minimum`
+        and `maximum`, both included, either of which may be None.
+        """
+        values = self.sorted_values[field][0]
+        start = 0 if minimum is None else bisect_left(values, minimum)
+        end = len(values) if maximum is None else bisect_right(values, maximum)
+
+        return self.get_rank_bits(field, end) & ~self.get_rank_bits(field, start)
+
+    @classmethod
+    def from_database(cls, revision, using="default"):
+        records = [
+            PokemonRecord(*values)
+            for values in Pokemon.objects.using(using)
+            .order_by("pk")
+            .values_list("pk", *RECORD_FIELDS)
+            .iterator()
+        ]
+        # pokemon of the same types share their slots
+        type_slots = {}
+        for record in records:
+            slots = tuple(record.type_slots)
+            record.type_slots = type_slots.setdefault(slots, slots)
+        type_links = (
+            Pokemon.types.through.objects.using(using)
+            .order_by("pk")
+            .values_list("type_id", "pokemon_id")
+        )
+
+        return cls(revision, records, type_links, get_type_chart())
+
+
+class RecordSet:
+    """
+    The records of `snapshot` at the positions set in `bits`, in pk order.
+
+    Only the records a `RecordSet` is sliced to are looked up, so that
+    paginating a large set does not build a list of all of them.
+    """
+
+    def __init__(self, snapshot, bits):
+        self.snapshot = snapshot
+        self.bits = bits
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def __iter__(self):
+        for position in iter_positions(self.bits):
+            yield self.snapshot.pokemon_list[position]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return list(self)[index]
+            return self.get_records(start, stop)
+
+        if index < 0:
+            index += len(self)
+        records = self.get_records(index, index + 1) if index >= 0 else []
+        if not records:
+            raise IndexError("RecordSet index out of range")
+
+        return records[0]
+
+    def get_records(self, start, stop):
+        if self.bits == self.snapshot.all_bits:
+            return list(self.snapshot.pokemon_list[start:stop])
+
+        # whole bytes of bits are skipped until `start`
+        records = []
+        count = 0
+        for index, byte in enumerate(
+            self.bits.to_bytes((self.bits.bit_length() + 7) // 8, "little")
+        ):
+            if count >= stop:
+                break
+            bits = BYTE_POSITIONS[byte]
+            if count + len(bits) <= start:
+                count += len(bits)
+                continue
+            for bit in bits:
+                if start <= count < stop:
+                    records.append(self.snapshot.pokemon_list[index * 8 + bit])
+                count += 1
+
+        return records
+
+    def after(self, pk):
+        """Returns the records of this set with a pk above `pk`."""
+        position = bisect_right(self.snapshot.pokemon_list, pk, key=attrgetter("pk"))
+
+        return RecordSet(self.snapshot, self.bits >> position << position)
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot():
+    """
+    Returns this process's `PokedexSnapshot`, loading it on first use and
+    whenever the `DexRevision` changed since, with one query otherwise.
+    """
+    global _snapshot
+
+    revision = get_revision()
+    snapshot = _snapshot
+    if snapshot is None or snapshot.revision != revision:
+        with _snapshot_lock:
+            if _snapshot is None or _snapshot.revision != revision:
+                # the revision is read before the rows, so a change made while
+                # loading them only means another reload; the type chart may
+                # have been changed by another process
+                clear_type_chart()
+                get_type_chart()
+                _snapshot = PokedexSnapshot.from_database(revision)
+            snapshot = _snapshot
+
+    return snapshot
+
+
+def clear_snapshot():
+    global _snapshot
+
+    with _snapshot_lock:
+        _snapshot = None
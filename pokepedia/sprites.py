@@ -0,0 +1,152 @@
+import hashlib
+import io
+import mimetypes
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from urllib.parse import urlsplit
+
+from django.db.models import F
+from django.utils import timezone
+from requests import RequestException
+
+from pokepedia.cache import invalidate_pokemon
+from pokepedia.models import Pokemon
+from pokepedia.pokeapi import write_file
+
+# a stored sprite: the sha256 of its content and its file extension
+SPRITE_NAME = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]{1,5}$")
+THUMBNAIL_SIZE = (48, 48)
+
+
+def get_extension(url, content_type=None):
+    extension = mimetypes.guess_extension(content_type or "") or ""
+    if not extension:
+        extension = PurePosixPath(urlsplit(url).path).suffix.lower()
+
+    return extension if re.fullmatch(r"\.[a-z0-9]{1,5}", extension) else ".bin"
+
+
+def make_thumbnail(content, size=THUMBNAIL_SIZE):
+    """
+    Returns the image `content` scaled down to fit within `size`, in its own
+    format, or None when Pillow is not installed or cannot read the image.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            image_format = image.format
+            image.thumbnail(size)
+            thumbnail = io.BytesIO()
+            image.save(thumbnail, format=image_format)
+    except (OSError, ValueError):
+        return None
+
+    return thumbnail.getvalue()
+
+
+class SpriteStore:
+    """
+    Content-addressed on-disk store of pokemon sprites, laid out like
+    `ResponseCache`.
+
+    Each distinct image is saved once as `objects/<sha256>.<extension>`, the
+    name pokemon refer to it by, along with its thumbnail under `thumbnails/`
+    when Pillow is installed. `index/<sha256 of url>` records which image a
+    url returned, so images are only ever downloaded once.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    @staticmethod
+    def get_key(url):
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def lookup(self, url):
+        """Returns the name of the image stored for `url`, or None."""
+        index_path = self.directory / "index" / self.get_key(url)
+        if not index_path.exists():
+            return None
+
+        return index_path.read_text()
+
+    def store(self, url, content, content_type=None):
+        """Stores the image `content` that `url` returned, and returns its name."""
+        name = hashlib.sha256(content).hexdigest() + get_extension(url, content_type)
+
+        object_path = self.directory / "objects" / name
+        if not object_path.exists():
+            thumbnail = make_thumbnail(content)
+            if thumbnail is not None:
+                write_file(self.directory / "thumbnails" / name, thumbnail)
+            write_file(object_path, content)
+        write_file(self.directory / "index" / self.get_key(url), name.encode())
+
+        return name
+
+    def get_path(self, name, thumbnail=False):
+        """
+        Returns the path of the stored image `name`, or of its thumbnail,
+        falling back to the image itself when it has none; None when there is
+        no such image.
+        """
+        if not SPRITE_NAME.match(name):
+            return None
+
+        paths = [self.directory / "objects" / name]
+        if thumbnail:
+            paths.insert(0, self.directory / "thumbnails" / name)
+
+        return next((path for path in paths if path.is_file()), None)
+
+
+def download_sprites(client, store, pokemon_list):
+    """
+    Stores the `image` of every pokemon of `pokemon_list` in `store`, only
+    downloading the urls it does not have yet, and points the pokemon at
+    their stored copies.
+
+    Images that cannot be retrieved are left remote; offline clients only
+    use what is already stored. Returns `(downloaded, failed)` counts.
+    """
+    pokemon_list = [pokemon for pokemon in pokemon_list if pokemon.image]
+    names = {url: store.lookup(url) for url in {p.image for p in pokemon_list}}
+    missing_urls = [url for url, name in names.items() if name is None]
+
+    def download(url):
+        try:
+            response = client.session.get(url, timeout=client.timeout)
+            response.raise_for_status()
+        except RequestException:
+            return url, None
+
+        return url, store.store(
+            url, response.content, response.headers.get("Content-Type")
+        )
+
+    downloaded = 0
+    if not client.offline:
+        with ThreadPoolExecutor(max_workers=client.concurrency) as executor:
+            for url, name in executor.map(download, missing_urls):
+                names[url] = name
+                downloaded += name is not None
+
+    changed_pokemon = []
+    updated_at = timezone.now()
+    for pokemon in pokemon_list:
+        name = names[pokemon.image]
+        if name is not None and name != pokemon.sprite:
+            pokemon.sprite = name
+            pokemon.updated_at = updated_at
+            pokemon.version = F("version") + 1
+            changed_pokemon.append(pokemon)
+
+    Pokemon.objects.bulk_update(changed_pokemon, ["sprite", "updated_at", "version"])
+    invalidate_pokemon(pokemon.pk for pokemon in changed_pokemon)
+
+    return downloaded, len(missing_urls) - downloaded
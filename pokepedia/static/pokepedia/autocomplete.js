@@ -0,0 +1,39 @@
+// adds a search box before every `PokemonAutocompleteSelect`, which fills the
+// select with the pokemon matching what is typed
+"use strict";
+
+document.addEventListener("DOMContentLoaded", () => {
+    for (const select of document.querySelectorAll("select[data-autocomplete-url]")) {
+        const search = document.createElement("input");
+        search.type = "search";
+        search.placeholder = "Search pokemon";
+        search.autocomplete = "off";
+        select.before(search);
+
+        let timeout = null;
+        search.addEventListener("input", () => {
+            clearTimeout(timeout);
+            timeout = setTimeout(async () => {
+                const url = new URL(select.dataset.autocompleteUrl, window.location.href);
+                url.searchParams.set("q", search.value);
+                const response = await fetch(url);
+                if (!response.ok) {
+                    return;
+                }
+
+                const { results } = await response.json();
+                // keeps the empty and the chosen options
+                for (const option of [...select.options]) {
+                    if (option.value && !option.selected) {
+                        option.remove();
+                    }
+                }
+                for (const pokemon of results) {
+                    if (String(pokemon.id) !== select.value) {
+                        select.add(new Option(pokemon.name, pokemon.id));
+                    }
+                }
+            }, 200);
+        });
+    }
+});
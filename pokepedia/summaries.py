@@ -0,0 +1,80 @@
+from django.db.models import F
+from django.utils import timezone
+
+from pokepedia.cache import invalidate_pokemon
+from pokepedia.models import Pokemon
+from pokepedia.typechart import get_type_chart
+
+SUMMARY_FIELDS = ["type_slots", "weakness_mask", "resistance_mask"]
+
+
+def get_summary(type_chart, type_names):
+    """Returns the denormalized `Pokemon` fields for a pokemon of `type_names`."""
+    effectiveness = type_chart.get_effectiveness(type_names)
+
+    return {
+        "type_slots": list(type_names),
+        "weakness_mask": type_chart.get_mask(
+            name for name, multiplier in effectiveness if multiplier > 1.0
+        ),
+        "resistance_mask": type_chart.get_mask(
+            name for name, multiplier in effectiveness if multiplier < 1.0
+        ),
+    }
+
+
+def touch_pokemon(pokemon_ids=None):
+    """
+    Bumps `updated_at` and `version` of the given pokemon (or of every
+    pokemon), for changes that bypass `Pokemon.save()`.
+    """
+    pokemon_list = Pokemon.objects.all()
+    if pokemon_ids is not None:
+        pokemon_ids = list(pokemon_ids)
+        if not pokemon_ids:
+            return
+        pokemon_list = pokemon_list.filter(pk__in=pokemon_ids)
+
+    pokemon_list.update(updated_at=timezone.now(), version=F("version") + 1)
+
+
+def refresh_pokemon_summaries(pokemon_ids=None):
+    """
+    Recomputes the `SUMMARY_FIELDS` of the given pokemon (or of every
+    pokemon), and writes the ones that changed along with a new version.
+    Returns the changed pokemon.
+
+    Bits of the masks follow the order of `TypeChart.type_names`, so
+    every summary has to be refreshed whenever a type is added, renamed or
+    deleted, or its damage relations change.
+    """
+    type_chart = get_type_chart()
+
+    pokemon_types = Pokemon.types.through.objects.order_by("pk")
+    pokemon_list = Pokemon.objects.only(*SUMMARY_FIELDS)
+    if pokemon_ids is not None:
+        pokemon_types = pokemon_types.filter(pokemon_id__in=pokemon_ids)
+        pokemon_list = pokemon_list.filter(pk__in=pokemon_ids)
+
+    # through rows are created in slot order
+    type_slots = {}
+    for pokemon_id, type_name in pokemon_types.values_list("pokemon_id", "type__name"):
+        type_slots.setdefault(pokemon_id, []).append(type_name)
+
+    changed_pokemon = []
+    updated_at = timezone.now()
+    for pokemon in pokemon_list:
+        summary = get_summary(type_chart, type_slots.get(pokemon.pk, []))
+        if any(getattr(pokemon, field) != value for field, value in summary.items()):
+            for field, value in summary.items():
+                setattr(pokemon, field, value)
+            pokemon.updated_at = updated_at
+            pokemon.version = F("version") + 1
+            changed_pokemon.append(pokemon)
+
+    Pokemon.objects.bulk_update(
+        changed_pokemon, [*SUMMARY_FIELDS, "updated_at", "version"]
+    )
+    invalidate_pokemon(pokemon.pk for pokemon in changed_pokemon)
+
+    return changed_pokemon
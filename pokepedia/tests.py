@@ -1,8 +1,61 @@
+import gzip
+import hashlib
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+
+from asgiref.sync import async_to_sync, sync_to_async
 from django.contrib.auth.models import User
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections, transaction
+from django.db.models import F
+from django.test import (
+    Client,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from requests import HTTPError
 
-from pokepedia.models import Pokemon, Type
+from pokepedia.benchmark import SyntheticPokedex, compare_results, run_benchmark
+from pokepedia.cache import stats as cache_stats
+from pokepedia.filters import MATCH_ALL, PokemonFilter
+from pokepedia.forms import PokemonForm, PokemonSearchForm
+from pokepedia.ingest import (
+    PokedexData,
+    format_selection,
+    store_pokedex,
+    sync_pokedex,
+)
+from pokepedia.metrics import registry as metrics_registry
+from pokepedia.models import IngestionCheckpoint, Pokemon, Type
+from pokepedia.pokeapi import CacheMiss, PokeAPIClient, ResponseCache
+from pokepedia.queryplans import (
+    capture_query_plans,
+    find_full_scans,
+    is_explain_supported,
+)
+from pokepedia.search import get_match_query, install_search_index, search_pokemon
+from pokepedia.snapshot import (
+    PokedexSnapshot,
+    clear_snapshot,
+    get_revision,
+    get_snapshot,
+)
+from pokepedia.sprites import SpriteStore
+from pokepedia.typechart import bump_type_chart_revision, get_type_chart
 
 
 class TypeModelTests(TestCase):
@@ -16,71 +69,1467 @@ class TypeModelTests(TestCase):
         self.water.weaknesses.add(self.grass)
         self.grass.weaknesses.add(self.fire)
 
-    def test_type_creation(self):
-        """Is pokemon Type resource with name `Fire` created?"""
-        self.assertEqual(self.fire.name, "Fire")
-        self.assertTrue(isinstance(self.fire, Type))
-        self.assertEqual(str(self.fire), "Fire")
+    def test_type_creation(self):
+        """Is pokemon Type resource with name `Fire` created?"""
+        self.assertEqual(self.fire.name, "Fire")
+        self.assertTrue(isinstance(self.fire, Type))
+        self.assertEqual(str(self.fire), "Fire")
+
+    def test_type_weaknesses(self):
+        """Is `Fire` type pokemon weak to `Water` types?"""
+        self.assertEqual(self.fire.get_weaknesses(), "Water")
+
+        """Is `Water` type pokemon weak to `Grass` types?"""
+        self.assertEqual(self.water.get_weaknesses(), "Grass")
+
+        """Is `Grass` type pokemon weak to `Firer` types?"""
+        self.assertEqual(self.grass.get_weaknesses(), "Fire")
+
+
+class PokemonModelTests(TestCase):
+    def setUp(self):
+        self.fire = Type.objects.create(name="Fire")
+        self.flying = Type.objects.create(name="Flying")
+        self.water = Type.objects.create(name="Water")
+
+        self.charizard = Pokemon.objects.create(
+            image="https://example.com/charizard.jpg",
+            name="Charizard",
+            genus="Flame Pokemon",
+            height=1.7,
+            weight=90.5,
+            flavor_text="Breathes fire of such great heat that it melts anything.",
+        )
+        self.charizard.types.add(self.fire, self.flying)
+
+        self.charmeleon = Pokemon.objects.create(
+            image="https://example.com/charmeleon.jpg",
+            name="Charmeleon",
+            genus="Flame Pokemon",
+            height=1.1,
+            weight=19.0,
+            flavor_text="When it swings its burning tail, it elevates the temperature.",
+        )
+
+        # Set up evolution chain
+        self.charizard.evolves_from = self.charmeleon
+        self.charizard.save()
+
+    def test_pokemon_creation(self):
+        """Is pokemon `Charizard` created?"""
+        self.assertEqual(self.charizard.name, "Charizard")
+        self.assertTrue(isinstance(self.charizard, Pokemon))
+        self.assertEqual(str(self.charizard), "Charizard")
+
+    def test_pokemon_types(self):
+        """Does `Charizard` have `Fire` and `Flying` types assigned?"""
+        self.assertEqual(self.charizard.get_types(), "Fire, Flying")
+
+    def test_pokemon_evolutions(self):
+        """Does `Charizard` have `Charmeleon` in its evolution tree/chan (and vice versa)?"""
+        self.assertEqual(self.charizard.get_evolutions_list(), ["Charmeleon"])
+        self.assertEqual(self.charmeleon.get_evolutions_list(), ["Charizard"])
+
+    def test_move_with_evolutions(self):
+        """Do the evolutions of a pokemon move along with it, in both directions?"""
+        charmander = Pokemon.objects.create(
+            image="https://example.com/charmander.jpg",
+            name="Charmander",
+            genus="Lizard Pokemon",
+            height=0.6,
+            weight=8.5,
+            flavor_text="The flame on its tail shows the strength of its life force.",
+        )
+        charmeleon = Pokemon.objects.get(pk=self.charmeleon.pk)
+        charmeleon.evolves_from = charmander
+        charmeleon.save()
+
+        def get_chain(pokemon):
+            return [
+                (evolution.name, evolution.evolution_stage)
+                for evolution in Pokemon.objects.get(pk=pokemon.pk).evolution_tree
+            ]
+
+        self.assertEqual(
+            get_chain(self.charizard),
+            [("Charmander", 0), ("Charmeleon", 1), ("Charizard", 2)],
+        )
+
+        charmeleon = Pokemon.objects.get(pk=self.charmeleon.pk)
+        charmeleon.evolves_from = None
+        charmeleon.save()
+
+        self.assertEqual(get_chain(charmander), [("Charmander", 0)])
+        self.assertEqual(
+            get_chain(self.charizard), [("Charmeleon", 0), ("Charizard", 1)]
+        )
+
+    def test_pokemon_weaknesses(self):
+        """Does `Charizard` (Fire-type pokemon) have weakness to the `Water` type?"""
+        # Assuming Fire is weak to Water
+        self.fire.weaknesses.add(self.water)
+        self.assertEqual(self.charizard.get_weaknesses(), "Water")
+
+
+class TypeChartTests(TestCase):
+    def setUp(self):
+        self.fire = Type.objects.create(name="Fire")
+        self.flying = Type.objects.create(name="Flying")
+        self.water = Type.objects.create(name="Water")
+        self.rock = Type.objects.create(name="Rock")
+        self.ground = Type.objects.create(name="Ground")
+        self.grass = Type.objects.create(name="Grass")
+
+        self.fire.weaknesses.add(self.water, self.rock, self.ground)
+        self.fire.resistances.add(self.fire, self.grass)
+        self.flying.weaknesses.add(self.rock)
+        self.flying.resistances.add(self.grass)
+        self.flying.immunities.add(self.ground)
+
+        self.charizard = Pokemon.objects.create(
+            image="https://example.com/charizard.jpg",
+            name="Charizard",
+            genus="Flame Pokemon",
+            height=1.7,
+            weight=90.5,
+            flavor_text="Breathes fire of such great heat that it melts anything.",
+        )
+        self.charizard.types.add(self.fire, self.flying)
+
+    def test_dual_type_multipliers(self):
+        """Are the multipliers of dual types combined, instead of listed twice?"""
+        chart = get_type_chart()
+
+        self.assertEqual(
+            chart.get_weaknesses(["Fire", "Flying"]), [("Water", 2.0), ("Rock", 4.0)]
+        )
+        self.assertEqual(
+            chart.get_resistances(["Fire", "Flying"]), [("Fire", 0.5), ("Grass", 0.25)]
+        )
+        # Flying's immunity cancels Fire's weakness to Ground
+        self.assertEqual(chart.get_immunities(["Fire", "Flying"]), [("Ground", 0.0)])
+
+    def test_lookups_without_queries(self):
+        """Are lookups served from the cached chart, without any query?"""
+        get_type_chart()
+
+        with self.assertNumQueries(0):
+            get_type_chart().get_weaknesses(["Fire"])
+
+    def test_chart_invalidation(self):
+        """Is the chart reloaded after a damage relation changes?"""
+        self.assertEqual(get_type_chart().get_weaknesses(["Grass"]), [])
+
+        self.grass.weaknesses.add(self.fire)
+
+        self.assertEqual(get_type_chart().get_weaknesses(["Grass"]), [("Fire", 2.0)])
+
+    def test_other_process_changes(self):
+        """Is the chart reloaded after another process changed the types?"""
+        get_type_chart()
+
+        # like a change made by another process, which only clears its own
+        # chart, but bumps the shared revision
+        Type.weaknesses.through.objects.filter(from_type=self.fire).delete()
+        bump_type_chart_revision()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(len(get_type_chart().get_weaknesses(["Fire"])), 3)
+        with override_settings(POKEPEDIA_TYPE_CHART_CHECK_INTERVAL=0):
+            self.assertEqual(get_type_chart().get_weaknesses(["Fire"]), [])
+
+    def test_pokemon_effectiveness(self):
+        """Does `Charizard` list each weakness, resistance and immunity once?"""
+        self.assertEqual(self.charizard.get_weaknesses(), "Water, Rock")
+        self.assertEqual(self.charizard.get_resistances(), "Fire, Grass")
+        self.assertEqual(self.charizard.get_immunities(), "Ground")
+
+
+class PokemonSummaryTests(TestCase):
+    def setUp(self):
+        self.fire = Type.objects.create(name="Fire")
+        self.flying = Type.objects.create(name="Flying")
+        self.water = Type.objects.create(name="Water")
+        self.rock = Type.objects.create(name="Rock")
+        self.fire.weaknesses.add(self.water, self.rock)
+        self.flying.weaknesses.add(self.rock)
+
+        self.charizard = Pokemon.objects.create(
+            image="https://example.com/charizard.jpg",
+            name="Charizard",
+            genus="Flame Pokemon",
+            height=1.7,
+            weight=90.5,
+            flavor_text="Breathes fire of such great heat that it melts anything.",
+        )
+        self.charizard.types.add(self.fire)
+        self.charizard.types.add(self.flying)
+
+    def test_summary_fields(self):
+        """Are the types and weaknesses of `Charizard` stored on its row?"""
+        charizard = Pokemon.objects.get(pk=self.charizard.pk)
+
+        self.assertEqual(charizard.type_slots, ["Fire", "Flying"])
+        self.assertEqual(
+            get_type_chart().get_names(charizard.weakness_mask), ["Water", "Rock"]
+        )
+
+    def test_summary_without_queries(self):
+        """Are types and weaknesses read without querying the relations?"""
+        charizard = Pokemon.objects.get(pk=self.charizard.pk)
+        get_type_chart()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(charizard.get_weaknesses(), "Water, Rock")
+
+    def test_summary_type_changes(self):
+        """Are summaries updated when types are removed from either side?"""
+        self.charizard.types.remove(self.fire)
+        self.assertEqual(self.charizard.type_slots, ["Flying"])
+
+        self.water.pokemon_set.add(self.charizard)
+        self.assertEqual(
+            Pokemon.objects.get(pk=self.charizard.pk).type_slots, ["Flying", "Water"]
+        )
+
+    def test_summary_weakness_changes(self):
+        """Are summaries updated when a type's weaknesses change?"""
+        self.flying.weaknesses.add(self.water)
+        self.fire.weaknesses.remove(self.rock)
+
+        charizard = Pokemon.objects.get(pk=self.charizard.pk)
+        self.assertEqual(
+            get_type_chart().get_names(charizard.weakness_mask), ["Water", "Rock"]
+        )
+        self.assertEqual(charizard.get_weaknesses(), "Water, Rock")
+
+    def test_rebuildsummaries(self):
+        """Does `rebuildsummaries` fix outdated summaries?"""
+        Pokemon.objects.update(type_slots=[], weakness_mask=0)
+
+        call_command("rebuildsummaries", stdout=StringIO())
+
+        charizard = Pokemon.objects.get(pk=self.charizard.pk)
+        self.assertEqual(charizard.type_slots, ["Fire", "Flying"])
+        self.assertNotEqual(charizard.weakness_mask, 0)
+
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", password="admin")
+        self.client.force_login(self.admin)
+
+        self.fire = Type.objects.create(name="Fire")
+        self.water = Type.objects.create(name="Water")
+        self.grass = Type.objects.create(name="Grass")
+
+    def _add_rows(self, count):
+        start = Pokemon.objects.count()
+        for index in range(start, start + count):
+            pokemon = Pokemon.objects.create(
+                image=f"https://example.com/{index}.png",
+                name=f"pokemon-{index}",
+                genus=f"Genus {index % 3}",
+                height=index,
+                weight=index,
+                flavor_text=f"Entry {index}",
+            )
+            pokemon.types.add(self.fire, self.water)
+
+            pokemon_type = Type.objects.create(name=f"type-{index}")
+            pokemon_type.weaknesses.add(self.fire, self.grass)
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+
+        return len(queries), response
+
+    def test_pokemon_changelist_queries(self):
+        """Does the pokemon changelist make the same number of queries for any page size?"""
+        url = reverse("admin:pokepedia_pokemon_changelist")
+
+        self._add_rows(2)
+        small_count, response = self._count_queries(url)
+        self._add_rows(20)
+        large_count, response = self._count_queries(url)
+
+        self.assertEqual(small_count, large_count)
+        self.assertContains(response, "Fire, Water")
+
+    def test_type_changelist_queries(self):
+        """Does the type changelist make the same number of queries for any page size?"""
+        url = reverse("admin:pokepedia_type_changelist")
+
+        self._add_rows(2)
+        small_count, response = self._count_queries(url)
+        self._add_rows(20)
+        large_count, response = self._count_queries(url)
+
+        self.assertEqual(small_count, large_count)
+        self.assertContains(response, "Fire, Grass")
+
+        # filtering by weakness keeps every weakness of the listed types
+        response = self.client.get(url, {"weaknesses__id__exact": self.grass.pk})
+        self.assertContains(response, "Fire, Grass")
+
+
+class PokemonListPaginationTests(TestCase):
+    def setUp(self):
+        self.fire = Type.objects.create(name="Fire")
+        self.pokemon_list = Pokemon.objects.bulk_create(
+            [
+                Pokemon(
+                    image=f"https://example.com/{index}.png",
+                    name=f"pokemon-{index:03}",
+                    genus="Test Pokemon",
+                    height=index,
+                    weight=index,
+                    flavor_text=f"Entry {index}",
+                )
+                for index in range(120)
+            ]
+        )
+        for pokemon in self.pokemon_list[::2]:
+            pokemon.types.add(self.fire)
+
+    def _get_content(self, response):
+        return b"".join(response.streaming_content).decode()
+
+    def test_page_numbers(self):
+        """Is the list split into numbered pages?"""
+        response = self.client.get(reverse("pokemon-list"), {"page": 2})
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            list(response.context["pokemon_list"]), self.pokemon_list[50:100]
+        )
+        content = self._get_content(response)
+        self.assertIn("pokemon-050", content)
+        self.assertNotIn("pokemon-049", content)
+        self.assertIn("Page 2 of 3", content)
+
+    def test_keyset(self):
+        """Does `?after=<id>` return the page following that pokemon?"""
+        after = self.pokemon_list[99].pk
+
+        # the list version and the page itself; the type choices of the search
+        # form come from the type chart
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("pokemon-list"), {"after": after})
+            content = self._get_content(response)
+
+        self.assertEqual(response.context["pokemon_list"], self.pokemon_list[100:])
+        self.assertIsNone(response.context["next_after"])
+        self.assertIn("pokemon-119", content)
+
+        response = self.client.get(
+            reverse("pokemon-list"), {"after": self.pokemon_list[0].pk}
+        )
+        self.assertEqual(response.context["next_after"], self.pokemon_list[50].pk)
+
+    def test_search_parameters_kept(self):
+        """Do page links keep the search form parameters?"""
+        response = self.client.get(
+            reverse("pokemon-list"), {"pokemon_type": self.fire.pk, "after": 0}
+        )
+        content = self._get_content(response)
+
+        self.assertEqual(len(response.context["pokemon_list"]), 50)
+        self.assertIn(
+            f"?pokemon_type={self.fire.pk}&amp;after={self.pokemon_list[98].pk}",
+            content,
+        )
+
+    def test_empty_page(self):
+        """Is the "not found" text streamed for empty results?"""
+        response = self.client.get(reverse("pokemon-list"), {"pokemon_name": "mew"})
+
+        self.assertIn("No Pokemon Found.", self._get_content(response))
+
+    def test_invalid_keyset(self):
+        """Is a malformed `after` value a 404?"""
+        response = self.client.get(reverse("pokemon-list"), {"after": "abc"})
+
+        self.assertEqual(response.status_code, 404)
+
+
+class PokemonSearchTests(TestCase):
+    def setUp(self):
+        self.charizard = Pokemon.objects.create(
+            image="https://example.com/charizard.jpg",
+            name="Charizard",
+            genus="Flame Pokemon",
+            height=1.7,
+            weight=90.5,
+            flavor_text="Breathes fire of such great heat that it melts anything.",
+        )
+        self.charmander = Pokemon.objects.create(
+            image="https://example.com/charmander.jpg",
+            name="Charmander",
+            genus="Lizard Pokemon",
+            height=0.6,
+            weight=8.5,
+            flavor_text="The flame on its tail shows the strength of its life force.",
+        )
+        self.squirtle = Pokemon.objects.create(
+            image="https://example.com/squirtle.jpg",
+            name="Squirtle",
+            genus="Tiny Turtle Pokemon",
+            height=0.5,
+            weight=9.0,
+            flavor_text="Shoots water at prey, and hides in its shell when in danger.",
+        )
+
+    def _search(self, query):
+        return list(search_pokemon(Pokemon.objects.all(), query))
+
+    def test_match_query(self):
+        """Is every word of a search matched as a prefix?"""
+        self.assertEqual(get_match_query('mr. "mime'), '"mr"* "mime"*')
+        self.assertEqual(get_match_query("?!"), "")
+
+    def test_prefix_search(self):
+        """Do the first letters of a name find the pokemon?"""
+        self.assertEqual(self._search("char"), [self.charizard, self.charmander])
+        self.assertEqual(self._search("CHARM"), [self.charmander])
+        self.assertEqual(self._search("tiny turt"), [self.squirtle])
+
+    def test_ranking(self):
+        """Do name matches rank above genus and flavor text matches?"""
+        self.charizard.flavor_text = "Its flame burns hotter than any other flame."
+        self.charizard.save()
+
+        self.assertEqual(self._search("flame"), [self.charizard, self.charmander])
+        self.squirtle.name = "Flame"
+        self.squirtle.save()
+        self.assertEqual(self._search("flame")[0], self.squirtle)
+
+    def test_index_kept_in_sync(self):
+        """Are created, updated and deleted pokemon reflected in the index?"""
+        bulbasaur = Pokemon.objects.bulk_create(
+            [
+                Pokemon(
+                    image="https://example.com/bulbasaur.jpg",
+                    name="Bulbasaur",
+                    genus="Seed Pokemon",
+                    height=0.7,
+                    weight=6.9,
+                    flavor_text="A strange seed was planted on its back at birth.",
+                )
+            ]
+        )[0]
+        self.assertEqual(self._search("seed"), [bulbasaur])
+
+        Pokemon.objects.filter(pk=bulbasaur.pk).update(
+            genus="Bulb Pokemon", flavor_text="It grows by soaking up sunlight."
+        )
+        self.assertEqual(self._search("bulb"), [bulbasaur])
+        self.assertEqual(self._search("seed"), [])
+
+        bulbasaur.delete()
+        self.assertEqual(self._search("bulb"), [])
+
+    def test_index_repaired(self):
+        """Is a pokemon table that lost its triggers indexed again?"""
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER pokepedia_pokemon_fts_update")
+        Pokemon.objects.filter(pk=self.squirtle.pk).update(name="Wartortle")
+
+        install_search_index()
+
+        self.assertEqual(self._search("wartortle"), [self.squirtle])
+        self.assertEqual(self._search("squirtle"), [])
+
+    def test_search_view(self):
+        """Are search results ranked, ignoring `after`?"""
+        # the list version, the count and the page
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                reverse("pokemon-list"), {"pokemon_name": "flame", "after": 0}
+            )
+            b"".join(response.streaming_content)
+
+        # `Flame Pokemon` is Charizard's genus, but only Charmander's flavor text
+        self.assertEqual(
+            list(response.context["pokemon_list"]), [self.charizard, self.charmander]
+        )
+
+
+class PokemonFilterTests(TestCase):
+    def setUp(self):
+        self.fire = Type.objects.create(name="Fire")
+        self.flying = Type.objects.create(name="Flying")
+        self.water = Type.objects.create(name="Water")
+        self.ground = Type.objects.create(name="Ground")
+        self.fire.weaknesses.add(self.water)
+        self.flying.immunities.add(self.ground)
+        self.water.resistances.add(self.fire)
+
+        for name, types, height, weight in [
+            ("Charizard", [self.fire, self.flying], 1.7, 90.5),
+            ("Charmander", [self.fire], 0.6, 8.5),
+            ("Squirtle", [self.water], 0.5, 9.0),
+            ("Pidgey", [self.flying], 0.3, 1.8),
+        ]:
+            pokemon = Pokemon.objects.create(
+                image=f"https://example.com/{name}.jpg",
+                name=name,
+                genus="Test Pokemon",
+                height=height,
+                weight=weight,
+                flavor_text="A pokemon.",
+            )
+            pokemon.types.add(*types)
+
+    def _filter(self, pokemon_filter):
+        """Returns the names matching `pokemon_filter`, from both sources."""
+        names = [
+            pokemon.name
+            for pokemon in pokemon_filter.filter_queryset(
+                Pokemon.objects.order_by("pk")
+            )
+        ]
+        snapshot = PokedexSnapshot.from_database(get_revision())
+        self.assertEqual(
+            [record.name for record in pokemon_filter.filter_records(snapshot)],
+            names,
+        )
+
+        return names
+
+    def test_types(self):
+        """Are pokemon filtered on any or all of several types?"""
+        type_ids = [self.fire.pk, self.flying.pk]
+
+        self.assertEqual(
+            self._filter(PokemonFilter(type_ids)),
+            ["Charizard", "Charmander", "Pidgey"],
+        )
+        self.assertEqual(
+            self._filter(PokemonFilter(type_ids, match=MATCH_ALL)), ["Charizard"]
+        )
+        self.assertEqual(self._filter(PokemonFilter([self.ground.pk])), [])
+
+    def test_weaknesses_and_resistances(self):
+        """Are pokemon filtered on what they are weak to and resist, immunities included?"""
+        self.assertEqual(
+            self._filter(PokemonFilter(weak_to=self.water.pk)),
+            ["Charizard", "Charmander"],
+        )
+        self.assertEqual(
+            self._filter(PokemonFilter(resists=self.ground.pk)),
+            ["Charizard", "Pidgey"],
+        )
+        self.assertEqual(
+            self._filter(PokemonFilter([self.water.pk], resists=self.fire.pk)),
+            ["Squirtle"],
+        )
+
+    def test_deleted_type(self):
+        """Does a type deleted since the form was validated match nothing?"""
+        weak_to_water = PokemonFilter(weak_to=self.water.pk)
+        self.water.delete()
+
+        self.assertEqual(self._filter(weak_to_water), [])
+
+    def test_ranges(self):
+        """Are pokemon filtered on height and weight ranges, bounds included?"""
+        self.assertEqual(
+            self._filter(PokemonFilter(ranges={"height": (0.5, 1.0)})),
+            ["Charmander", "Squirtle"],
+        )
+        self.assertEqual(
+            self._filter(
+                PokemonFilter(ranges={"height": (None, 0.6), "weight": (2.0, None)})
+            ),
+            ["Charmander", "Squirtle"],
+        )
+        self.assertEqual(
+            self._filter(
+                PokemonFilter([self.fire.pk], ranges={"weight": (None, 10.0)})
+            ),
+            ["Charmander"],
+        )
+
+    def test_snapshot_ranges(self):
+        """Are ranges past the kept bitsets, and slices of their records, right?"""
+        Pokemon.objects.bulk_create(
+            Pokemon(
+                image=f"https://example.com/{number}.jpg",
+                name=f"Pokemon {number}",
+                genus="Test Pokemon",
+                height=number % 37 / 10,
+                weight=number,
+                flavor_text="A pokemon.",
+            )
+            for number in range(300)
+        )
+        snapshot = PokedexSnapshot.from_database(get_revision())
+        records = PokemonFilter(ranges={"height": (0.5, 2.5)}).filter_records(snapshot)
+        expected = [
+            record for record in snapshot.pokemon_list if 0.5 <= record.height <= 2.5
+        ]
+
+        self.assertEqual(list(records), expected)
+        self.assertEqual(len(records), len(expected))
+        self.assertEqual(records[10:150], expected[10:150])
+        self.assertEqual(records[-1], expected[-1])
+        self.assertEqual(
+            records.after(expected[99].pk)[:5],
+            [record for record in expected if record.pk > expected[99].pk][:5],
+        )
+
+    def test_list_view(self):
+        """Does the list page combine its filters with name searches?"""
+        response = self.client.get(
+            reverse("pokemon-list"),
+            {
+                "pokemon_type": [self.fire.pk, self.flying.pk],
+                "type_match": "all",
+            },
+        )
+        b"".join(response.streaming_content)
+        self.assertEqual(
+            [pokemon.name for pokemon in response.context["pokemon_list"]],
+            ["Charizard"],
+        )
+
+        response = self.client.get(
+            reverse("pokemon-list"),
+            {"pokemon_name": "char", "weak_to": self.water.pk, "max_height": 1},
+        )
+        b"".join(response.streaming_content)
+        self.assertEqual(
+            [pokemon.name for pokemon in response.context["pokemon_list"]],
+            ["Charmander"],
+        )
+
+    def test_invalid_range(self):
+        """Is a range with its maximum below its minimum an error?"""
+        form = PokemonSearchForm({"min_weight": 10, "max_weight": 5})
+
+        self.assertFalse(form.is_valid())
+        self.assertIn("max_weight", form.errors)
+
+
+class QueryPlanTests(TestCase):
+    def setUp(self):
+        if not is_explain_supported():
+            self.skipTest("query plans are only checked on SQLite")
+
+        cache.clear()
+        self.fire = Type.objects.create(name="Fire")
+        self.water = Type.objects.create(name="Water")
+        self.water.weaknesses.add(self.fire)
+        self.pokemon_list = []
+        for index in range(30):
+            pokemon = Pokemon.objects.create(
+                image=f"https://example.com/pokemon-{index}.jpg",
+                name=f"pokemon-{index}",
+                genus=f"Genus {index % 3}",
+                height=1.0,
+                weight=1.0,
+                flavor_text="A made up pokemon.",
+                evolves_from=self.pokemon_list[-1] if index % 3 else None,
+            )
+            pokemon.types.add(self.fire if index % 2 else self.water)
+            self.pokemon_list.append(pokemon)
+
+        self.admin = User.objects.create_superuser(username="admin", password="admin")
+
+    def _get(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            b"".join(response.streaming_content)
+
+    def _assert_no_full_scans(self, function, allowed_tables=()):
+        query_plans = capture_query_plans(function)
+        self.assertTrue(query_plans)
+        self.assertEqual(find_full_scans(query_plans, allowed_tables), [])
+
+    def test_list_plans(self):
+        """Do filtered and keyset list pages avoid full scans of the pokemon?"""
+        list_url = reverse("pokemon-list")
+        for params in [
+            {"after": self.pokemon_list[10].pk},
+            {"pokemon_type": self.fire.pk},
+            {"pokemon_type": self.fire.pk, "after": self.pokemon_list[10].pk},
+            {"pokemon_type": [self.fire.pk, self.water.pk]},
+            {"pokemon_type": [self.fire.pk, self.water.pk], "type_match": "all"},
+            {"min_height": 0.5, "max_height": 1.5},
+            {"pokemon_name": "pokemon"},
+        ]:
+            with self.subTest(params=params):
+                self._assert_no_full_scans(lambda: self._get(list_url, params))
+
+        # offset pages walk the table in primary key order, stopping after
+        # the page, and so do pages filtered on weakness masks, which no index
+        # covers, or on open ranges, which match many pokemon
+        for params in [{}, {"weak_to": self.fire.pk, "max_weight": 2.0}]:
+            with self.subTest(params=params):
+                self._assert_no_full_scans(
+                    lambda: self._get(list_url, params),
+                    allowed_tables=["pokepedia_pokemon"],
+                )
+
+    def test_detail_plans(self):
+        """Are the pokemon and its evolution tree read through indexes?"""
+        url = reverse("pokemon-details", kwargs={"pk": self.pokemon_list[4].pk})
+        self._assert_no_full_scans(lambda: self._get(url))
+
+    def test_admin_plans(self):
+        """Do the admin's genus and type filters avoid full scans of the pokemon?"""
+        self.client.force_login(self.admin)
+        url = reverse("admin:pokepedia_pokemon_changelist")
+        for params in [{"genus": "Genus 1"}, {"types__id__exact": self.fire.pk}]:
+            with self.subTest(params=params):
+                # the type filter lists every type
+                self._assert_no_full_scans(
+                    lambda: self._get(url, params), allowed_tables=["pokepedia_type"]
+                )
+
+    def test_weakness_plans(self):
+        """Are weaknesses looked up through indexes, both ways?"""
+        self._assert_no_full_scans(
+            lambda: [
+                list(self.water.weaknesses.all()),
+                list(Type.objects.filter(weaknesses=self.fire)),
+            ]
+        )
+
+    def test_find_full_scans(self):
+        """Are unindexed filters reported as full scans?"""
+        query_plans = capture_query_plans(
+            lambda: list(Pokemon.objects.filter(flavor_text="A made up pokemon."))
+        )
+
+        self.assertEqual(
+            [table for _, table in find_full_scans(query_plans)],
+            ["pokepedia_pokemon"],
+        )
+
+
+class DatabaseProfileTests(SimpleTestCase):
+    def test_sqlite_profile(self):
+        """Are SQLite files opened in WAL mode, waiting on busy locks?"""
+        if connection.vendor != "sqlite":
+            self.skipTest("only the SQLite profile is checked")
+
+        with tempfile.TemporaryDirectory() as directory:
+            default = connections["default"]
+            database = type(default)(
+                {**default.settings_dict, "NAME": str(Path(directory) / "db")},
+                alias="profile",
+            )
+            try:
+                with database.cursor() as cursor:
+                    pragmas = {}
+                    for pragma in ["journal_mode", "synchronous", "busy_timeout"]:
+                        cursor.execute(f"PRAGMA {pragma}")
+                        pragmas[pragma] = cursor.fetchone()[0]
+            finally:
+                database.close()
+
+        self.assertEqual(
+            pragmas, {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 20000}
+        )
+
+
+class PokemonAPITests(TestCase):
+    def setUp(self):
+        self.fire = Type.objects.create(name="Fire")
+        self.water = Type.objects.create(name="Water")
+        self.fire.weaknesses.add(self.water)
+        self.fire.resistances.add(self.fire)
+
+        self.pokemon_list = []
+        for index in range(6):
+            pokemon = Pokemon.objects.create(
+                image=f"https://example.com/{index}.png",
+                name=f"pokemon-{index}",
+                genus="Test Pokemon",
+                height=index,
+                weight=index,
+                flavor_text=f"Entry {index}",
+            )
+            pokemon.types.add(self.fire if index % 2 else self.water)
+            self.pokemon_list.append(pokemon)
+        # every pair of pokemon is an evolution chain
+        for first, second in zip(self.pokemon_list[::2], self.pokemon_list[1::2]):
+            second.evolves_from = first
+            second.save()
+
+    def test_pokemon_details(self):
+        """Is a pokemon returned with its types, weaknesses and evolutions?"""
+        pokemon = self.pokemon_list[1]
+        response = self.client.get(
+            reverse("api-pokemon-details", kwargs={"pk": pokemon.pk})
+        )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["name"], "pokemon-1")
+        self.assertEqual(data["types"], ["Fire"])
+        self.assertEqual(data["weaknesses"], ["Water"])
+        self.assertEqual(data["resistances"], ["Fire"])
+        self.assertEqual(data["immunities"], [])
+        self.assertEqual(data["evolutions"], ["pokemon-0"])
+
+    def test_sparse_fields(self):
+        """Does `?fields=` limit the returned fields?"""
+        response = self.client.get(
+            reverse("api-pokemon-details", kwargs={"pk": self.pokemon_list[0].pk}),
+            {"fields": "name,types"},
+        )
+        self.assertEqual(response.json(), {"name": "pokemon-0", "types": ["Water"]})
+
+        response = self.client.get(reverse("api-pokemon-list"), {"fields": "name,hp"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "unknown fields: hp"})
+
+    def test_batch(self):
+        """Does `?ids=` return the requested pokemon in the requested order?"""
+        ids = [self.pokemon_list[4].pk, self.pokemon_list[1].pk, 999]
+        response = self.client.get(
+            reverse("api-pokemon-list"),
+            {"ids": ",".join(map(str, ids)), "fields": "name"},
+        )
+
+        self.assertEqual(
+            response.json()["results"], [{"name": "pokemon-4"}, {"name": "pokemon-1"}]
+        )
+        response = self.client.get(reverse("api-pokemon-list"), {"ids": "1,a"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_pages(self):
+        """Is the list paginated, with a link to the next page?"""
+        response = self.client.get(
+            reverse("api-pokemon-list"), {"limit": 4, "fields": "name"}
+        )
+        data = response.json()
+        self.assertEqual(len(data["results"]), 4)
+
+        data = self.client.get(data["next"]).json()
+        self.assertEqual(
+            data["results"], [{"name": "pokemon-4"}, {"name": "pokemon-5"}]
+        )
+        self.assertIsNone(data["next"])
+
+        response = self.client.get(reverse("api-pokemon-list"), {"limit": 0})
+        self.assertEqual(response.status_code, 400)
+
+    def test_constant_queries(self):
+        """Does the number of queries stay the same for more pokemon?"""
+        get_type_chart()
+        url = reverse("api-pokemon-list")
+
+        with self.assertNumQueries(2):
+            self.client.get(url, {"limit": 2})
+        with self.assertNumQueries(2):
+            self.client.get(url, {"limit": 6})
+        with self.assertNumQueries(1):
+            self.client.get(url, {"fields": "name,types,weaknesses"})
+
+    def test_types(self):
+        """Are types listed with their damage relations?"""
+        response = self.client.get(reverse("api-type-list"))
+        self.assertEqual(
+            response.json()["results"][0],
+            {
+                "id": self.fire.pk,
+                "name": "Fire",
+                "weaknesses": ["Water"],
+                "resistances": ["Fire"],
+                "immunities": [],
+            },
+        )
+
+        response = self.client.get(reverse("api-type-details", kwargs={"pk": 999}))
+        self.assertEqual(response.status_code, 404)
+
+
+class PokemonDetailCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        cache_stats.reset()
+
+        self.fire = Type.objects.create(name="Fire")
+        self.water = Type.objects.create(name="Water")
+        self.fire.weaknesses.add(self.water)
+        self.charmander = Pokemon.objects.create(
+            image="https://example.com/charmander.jpg",
+            name="Charmander",
+            genus="Lizard Pokemon",
+            height=0.6,
+            weight=8.5,
+            flavor_text="The flame on its tail shows the strength of its life force.",
+        )
+        self.charmeleon = Pokemon.objects.create(
+            image="https://example.com/charmeleon.jpg",
+            name="Charmeleon",
+            genus="Flame Pokemon",
+            height=1.1,
+            weight=19.0,
+            flavor_text="It has a barbaric nature.",
+        )
+        self.charmander.types.add(self.fire)
+        self.charmeleon.evolves_from = self.charmander
+        self.charmeleon.save()
+        self.url = reverse("pokemon-details", kwargs={"pk": self.charmander.pk})
+
+    def test_cached_details(self):
+        """Is a cached pokemon rendered without its queries, and counted as a hit?"""
+        get_type_chart()
+        self.client.get(self.url)
+
+        # only the version lookup for conditional requests
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertContains(response, "Charmeleon")
+        self.assertContains(response, "Water")
+        self.assertEqual(cache_stats.as_dict(), {"hits": 1, "misses": 1})
+
+    def test_invalidation(self):
+        """Are changes to a pokemon, its evolutions and types shown right away?"""
+        self.client.get(self.url)
+
+        self.charmeleon.name = "Charmeleon-renamed"
+        self.charmeleon.save()
+        self.assertContains(self.client.get(self.url), "Charmeleon-renamed")
+
+        self.charmander.types.add(self.water)
+        self.assertContains(self.client.get(self.url), "<li>Water</li>")
+
+        self.water.name = "Aqua"
+        self.water.save()
+        self.assertContains(self.client.get(self.url), "<li>Aqua</li>")
+
+        self.charmeleon.evolves_from = None
+        self.charmeleon.save()
+        self.assertNotContains(self.client.get(self.url), "Charmeleon-renamed")
+
+        self.charmander.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_other_process_changes(self):
+        """Is a pokemon changed without dropping this process's cache reloaded?"""
+        self.client.get(self.url)
+
+        # like a save from another process, which only clears its own cache
+        Pokemon.objects.filter(pk=self.charmander.pk).update(
+            genus="Changed Pokemon", version=F("version") + 1
+        )
+
+        self.assertContains(self.client.get(self.url), "Changed Pokemon")
+        self.assertEqual(cache_stats.as_dict(), {"hits": 0, "misses": 2})
+
+    def test_bulk_writes(self):
+        """Do bulk writes from ingestion drop cached pokemon?"""
+        self.client.get(self.url)
+
+        data = PokedexData()
+        data.add_type(
+            {
+                "name": "Fire",
+                "damage_relations": {
+                    "double_damage_from": [],
+                    "half_damage_from": [],
+                    "no_damage_from": [],
+                },
+            }
+        )
+        sync_pokedex(data)
+
+        self.assertNotContains(self.client.get(self.url), "Water")
+
+
+class TemplateFragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.fire = Type.objects.create(name="Fire")
+        self.bulbasaur = Pokemon.objects.create(
+            image="https://example.com/bulbasaur.jpg",
+            name="Bulbasaur",
+            genus="Seed Pokemon",
+            height=0.7,
+            weight=6.9,
+            flavor_text="A strange seed was planted on its back at birth.",
+        )
+        self.bulbasaur.types.add(self.fire)
+        self.url = reverse("pokemon-list")
+
+    def get_list(self, url=None):
+        response = self.client.get(url or self.url)
+
+        return b"".join(response.streaming_content).decode()
+
+    def test_list_items(self):
+        """Are list items cached per version, and re-rendered once edited?"""
+        self.get_list()
+        self.bulbasaur.refresh_from_db()
+        key = make_template_fragment_key(
+            "pokemon-list-item",
+            [self.bulbasaur.pk, self.bulbasaur.version, self.bulbasaur.updated_at],
+        )
+        self.assertIn("Bulbasaur (Fire)", cache.get(key))
+
+        self.bulbasaur.name = "Ivysaur"
+        self.bulbasaur.save()
+        content = self.get_list()
+
+        self.assertIn("Ivysaur (Fire)", content)
+        self.assertNotIn("Bulbasaur", content)
+
+    def test_reloaded_pokedex(self):
+        """Are list items of a reloaded pokedex, reusing pks and versions, rendered anew?"""
+        self.get_list()
+
+        # like a flush and another pokedex stored with the same ids
+        Pokemon.objects.filter(pk=self.bulbasaur.pk).update(
+            name="Keychar", updated_at=timezone.now()
+        )
+        content = self.get_list()
+
+        self.assertIn("Keychar (Fire)", content)
+        self.assertNotIn("Bulbasaur", content)
+
+    def test_search_form(self):
+        """Does the cached search form keep what was searched, and list new types?"""
+        self.assertIn('value="bulba"', self.get_list(f"{self.url}?pokemon_name=bulba"))
+        self.assertNotIn('value="bulba"', self.get_list())
+
+        grass = Type.objects.create(name="Grass")
+        self.assertIn(f'<option value="{grass.pk}">Grass</option>', self.get_list())
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.fire = Type.objects.create(name="Fire")
+        self.charmander = Pokemon.objects.create(
+            image="https://example.com/charmander.jpg",
+            name="Charmander",
+            genus="Lizard Pokemon",
+            height=0.6,
+            weight=8.5,
+            flavor_text="The flame on its tail shows the strength of its life force.",
+        )
+        self.charmeleon = Pokemon.objects.create(
+            image="https://example.com/charmeleon.jpg",
+            name="Charmeleon",
+            genus="Flame Pokemon",
+            height=1.1,
+            weight=19.0,
+            flavor_text="It has a barbaric nature.",
+        )
+        self.detail_url = reverse("pokemon-details", kwargs={"pk": self.charmander.pk})
+        self.list_url = reverse("pokemon-list")
+
+    def _get_etag(self, url):
+        response = self.client.get(url)
+        if response.streaming:
+            b"".join(response.streaming_content)
+
+        return response["ETag"]
+
+    def test_versions(self):
+        """Do saves, m2m changes and type changes bump pokemon versions?"""
+        self.assertEqual(self.charmander.version, 1)
+
+        self.charmander.genus = "Flame Pokemon"
+        self.charmander.save(update_fields=["genus"])
+        self.charmander.refresh_from_db()
+        self.assertEqual(self.charmander.version, 2)
+
+        self.charmander.types.add(self.fire)
+        self.charmander.refresh_from_db()
+        self.assertEqual(self.charmander.version, 3)
+
+        # the chain is created on `charmander`, then `charmeleon` joins it
+        self.charmeleon.evolves_from = self.charmander
+        self.charmeleon.save()
+        self.charmander.refresh_from_db()
+        self.assertEqual(self.charmander.version, 5)
+
+        # the new resistance also changes charmander's summary
+        self.fire.resistances.add(self.fire)
+        self.charmander.refresh_from_db()
+        self.charmeleon.refresh_from_db()
+        self.assertEqual(self.charmander.version, 7)
+        self.assertEqual(self.charmeleon.version, 3)
+
+    def test_detail_not_modified(self):
+        """Is an unchanged pokemon answered with a 304 and a single query?"""
+        etag = self._get_etag(self.detail_url)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        last_modified = self.client.get(self.detail_url)["Last-Modified"]
+        response = self.client.get(
+            self.detail_url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 304)
+
+        self.charmeleon.evolves_from = self.charmander
+        self.charmeleon.save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail_reseeded(self):
+        """Is a pokemon reseeded with a deleted one's pk and version not a 304?"""
+        etag = self._get_etag(self.detail_url)
+        async_url = reverse("async-pokemon-details", kwargs={"pk": self.charmander.pk})
+        async_etag = self._get_etag(async_url)
+
+        # like `addpokemon` flushing and storing another pokedex
+        Pokemon.objects.all().delete()
+        Pokemon.objects.create(
+            pk=self.charmander.pk,
+            image="https://example.com/bulbasaur.jpg",
+            name="Bulbasaur",
+            genus="Seed Pokemon",
+            height=0.7,
+            weight=6.9,
+            flavor_text="A strange seed was planted on its back at birth.",
+        )
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Bulbasaur")
+        response = self.client.get(async_url, HTTP_IF_NONE_MATCH=async_etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_not_modified(self):
+        """Is an unchanged list answered with a 304, until a pokemon changes?"""
+        etag = self._get_etag(self.list_url)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(self.list_url, {"page": 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        self.charmeleon.delete()
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_without_last_modified(self):
+        """Is a list that lost a pokemon not answered with a 304 by date?"""
+        response = self.client.get(self.list_url)
+        b"".join(response.streaming_content)
+        self.assertNotIn("Last-Modified", response)
+
+        # a delete leaves the latest `updated_at` as it was
+        self.charmander.delete()
+        response = self.client.get(
+            self.list_url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60)
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_per_session(self):
+        """Do signed in users get pages of their own?"""
+        etag = self._get_etag(self.detail_url)
+
+        User.objects.create_user(username="testuser", password="testpass123")
+        self.client.login(username="testuser", password="testpass123")
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(POKEPEDIA_SNAPSHOT=True)
+class PokedexSnapshotTests(TestCase):
+    def setUp(self):
+        clear_snapshot()
+        cache.clear()
+
+        self.fire = Type.objects.create(name="Fire")
+        self.water = Type.objects.create(name="Water")
+        self.fire.weaknesses.add(self.water)
+        self.pokemon_list = [
+            Pokemon.objects.create(
+                image=f"https://example.com/{name}.jpg",
+                name=name,
+                genus="Lizard Pokemon",
+                height=0.6,
+                weight=8.5,
+                flavor_text="The flame on its tail shows its life force.",
+            )
+            for name in ["Charmander", "Charmeleon", "Squirtle"]
+        ]
+        self.charmander, self.charmeleon, self.squirtle = self.pokemon_list
+        self.charmander.types.add(self.fire)
+        self.squirtle.types.add(self.water)
+        self.charmeleon.evolves_from = self.charmander
+        self.charmeleon.save()
+        self.list_url = reverse("pokemon-list")
+        self.detail_url = reverse("pokemon-details", kwargs={"pk": self.charmander.pk})
+
+    def get_list(self, params=None):
+        response = self.client.get(self.list_url, params)
+
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_list(self):
+        """Are list pages and searches served from the snapshot?"""
+        self.get_list()
+
+        # only the revision
+        with self.assertNumQueries(1):
+            response, content = self.get_list()
+        self.assertEqual(
+            [pokemon.pk for pokemon in response.context["pokemon_list"]],
+            [pokemon.pk for pokemon in self.pokemon_list],
+        )
+        self.assertIn("Charmander (Fire)", content)
+
+        response, _ = self.get_list({"pokemon_type": self.water.pk})
+        self.assertEqual(
+            [pokemon.name for pokemon in response.context["pokemon_list"]],
+            ["Squirtle"],
+        )
+
+        response, _ = self.get_list({"after": self.charmander.pk})
+        self.assertEqual(
+            [pokemon.name for pokemon in response.context["pokemon_list"]],
+            ["Charmeleon", "Squirtle"],
+        )
+
+        response, _ = self.get_list(
+            {"pokemon_name": "char", "pokemon_type": self.fire.pk}
+        )
+        self.assertEqual(
+            [pokemon.name for pokemon in response.context["pokemon_list"]],
+            ["Charmander"],
+        )
+
+    def test_details(self):
+        """Are pokemon details served from the snapshot, with their evolutions?"""
+        self.client.get(self.detail_url)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url)
+
+        self.assertContains(response, "Charmeleon")
+        self.assertContains(response, "Water")
+        response = self.client.get(reverse("pokemon-details", kwargs={"pk": 0}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_reload(self):
+        """Is the snapshot reloaded after any change, even one bypassing signals?"""
+        snapshot = get_snapshot()
+        self.assertIs(get_snapshot(), snapshot)
+
+        Pokemon.objects.filter(pk=self.squirtle.pk).update(name="Wartortle")
+        self.assertIsNot(get_snapshot(), snapshot)
+        self.assertIn("Wartortle", self.get_list()[1])
+
+        self.water.name = "Aqua"
+        self.water.save()
+        self.assertContains(self.client.get(self.detail_url), "Aqua")
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.fire = Type.objects.create(name="Fire")
+        self.charmander = Pokemon.objects.create(
+            image="https://example.com/charmander.jpg",
+            name="Charmander",
+            genus="Lizard Pokemon",
+            height=0.6,
+            weight=8.5,
+            flavor_text="The flame on its tail shows the strength of its life force.",
+        )
+        self.charmander.types.add(self.fire)
+        self.charmeleon = Pokemon.objects.create(
+            image="https://example.com/charmeleon.jpg",
+            name="Charmeleon",
+            genus="Flame Pokemon",
+            height=1.1,
+            weight=19.0,
+            flavor_text="It has a barbaric nature.",
+            evolves_from=self.charmander,
+        )
+
+    async def _get_content(self, url, **kwargs):
+        response = await self.async_client.get(url, **kwargs)
+        if response.streaming:
+            content = b"".join([chunk async for chunk in response.streaming_content])
+        else:
+            content = response.content
+
+        return response, content.decode()
+
+    async def test_async_pokemon_list(self):
+        """Does the async list show the same pokemon and pages as the sync one?"""
+        for params in [{}, {"pokemon_name": "char"}, {"after": 0}]:
+            response, content = await self._get_content(
+                reverse("async-pokemon-list"), query_params=params
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("Charmander", content)
+            self.assertIn("Charmeleon", content)
+
+        response, _ = await self._get_content(
+            reverse("async-pokemon-list"), query_params={"page": 9}
+        )
+        self.assertEqual(response.status_code, 404)
+        response, _ = await self._get_content(
+            reverse("async-pokemon-list"), query_params={"after": "abc"}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    async def test_async_pokemon_details(self):
+        """Does the async detail page show the pokemon and its evolution tree?"""
+        url = reverse("async-pokemon-details", kwargs={"pk": self.charmeleon.pk})
+        response, content = await self._get_content(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Flame Pokemon", content)
+        self.assertIn("Stage 1:", content)
+        self.assertIn("Charmander", content)
+
+        response, _ = await self._get_content(
+            url, headers={"if-none-match": response["ETag"]}
+        )
+        self.assertEqual(response.status_code, 304)
+
+        response, _ = await self._get_content(
+            reverse("async-pokemon-details", kwargs={"pk": 999})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(POKEPEDIA_TYPE_CHART_CHECK_INTERVAL=0)
+    async def test_async_details_checking_type_chart(self):
+        """Does the async detail page render while the type chart checks for changes?"""
+        await sync_to_async(self.fire.weaknesses.add)(self.fire)
+        url = reverse("async-pokemon-details", kwargs={"pk": self.charmander.pk})
+        response, content = await self._get_content(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(content, r"Weakness:</h3>\s*<p>Fire")
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics_registry.reset()
+        self.charmander = Pokemon.objects.create(
+            image="https://example.com/charmander.jpg",
+            name="Charmander",
+            genus="Lizard Pokemon",
+            height=0.6,
+            weight=8.5,
+            flavor_text="The flame on its tail shows the strength of its life force.",
+        )
+        self.detail_url = reverse("pokemon-details", kwargs={"pk": self.charmander.pk})
+        # loaded outside of the measured requests
+        get_type_chart()
+
+    def test_server_timing(self):
+        """Are the queries and cache lookups of a request in its `Server-Timing`?"""
+        response = self.client.get(self.detail_url)
+        self.assertIn('desc="2 queries"', response["Server-Timing"])
+        self.assertIn('desc="0 hits, 1 misses"', response["Server-Timing"])
+
+        response = self.client.get(self.detail_url)
+        self.assertIn('desc="1 queries"', response["Server-Timing"])
+        self.assertIn('desc="1 hits, 0 misses"', response["Server-Timing"])
+
+    def test_metrics_per_url_name(self):
+        """Are requests summarized per url name, async views included?"""
+        self.client.get(self.detail_url)
+        self.client.get(self.detail_url)
+        async_to_sync(self.async_client.get)(
+            reverse("async-pokemon-details", kwargs={"pk": self.charmander.pk})
+        )
+
+        metrics = metrics_registry.as_dict()
+        self.assertEqual(metrics["pokemon-details"]["requests"], 2)
+        self.assertEqual(metrics["pokemon-details"]["cache_hits"], 1)
+        self.assertEqual(metrics["pokemon-details"]["query_count_p50"], 1.5)
+        self.assertGreater(metrics["pokemon-details"]["template_time_p50"], 0)
+        self.assertEqual(metrics["async-pokemon-details"]["query_count_p50"], 1)
 
-    def test_type_weaknesses(self):
-        """Is `Fire` type pokemon weak to `Water` types?"""
-        self.assertEqual(self.fire.get_weaknesses(), "Water")
+    def test_metrics_page(self):
+        """Is the metrics page only shown to staff?"""
+        self.client.get(self.detail_url)
 
-        """Is `Water` type pokemon weak to `Grass` types?"""
-        self.assertEqual(self.water.get_weaknesses(), "Grass")
+        response = self.client.get(reverse("performance-metrics"))
+        self.assertEqual(response.status_code, 302)
 
-        """Is `Grass` type pokemon weak to `Firer` types?"""
-        self.assertEqual(self.grass.get_weaknesses(), "Fire")
+        User.objects.create_superuser(username="admin", password="admin")
+        self.client.login(username="admin", password="admin")
+        response = self.client.get(reverse("performance-metrics"))
+        self.assertContains(response, "pokemon-details")
 
 
-class PokemonModelTests(TestCase):
-    def setUp(self):
-        self.fire = Type.objects.create(name="Fire")
-        self.flying = Type.objects.create(name="Flying")
-        self.water = Type.objects.create(name="Water")
+class BenchmarkTests(TestCase):
+    def test_synthetic_pokedex(self):
+        """Is the synthetic pokedex the same for a seed, with chains for all?"""
+        pokedex = SyntheticPokedex(40, seed=1)
 
-        self.charizard = Pokemon.objects.create(
-            image="https://example.com/charizard.jpg",
-            name="Charizard",
-            genus="Flame Pokemon",
-            height=1.7,
-            weight=90.5,
-            flavor_text="Breathes fire of such great heat that it melts anything.",
+        self.assertEqual(
+            [pokemon["name"] for pokemon, _ in pokedex.entries],
+            [pokemon["name"] for pokemon, _ in SyntheticPokedex(40, seed=1).entries],
         )
-        self.charizard.types.add(self.fire, self.flying)
+        self.assertEqual(len(pokedex.chains), 40)
 
-        self.charmeleon = Pokemon.objects.create(
-            image="https://example.com/charmeleon.jpg",
-            name="Charmeleon",
-            genus="Flame Pokemon",
-            height=1.1,
-            weight=19.0,
-            flavor_text="When it swings its burning tail, it elevates the temperature.",
+    def test_run_benchmark(self):
+        """Are ingestion and every page timed against the synthetic pokedex?"""
+        results = run_benchmark(40, repeat=1, batch_size=15)
+
+        self.assertEqual(Pokemon.objects.count(), 40)
+        self.assertEqual(
+            Pokemon.objects.filter(evolution_chain__isnull=True).count(), 0
         )
+        scenarios = {result["scenario"]: result for result in results}
+        self.assertEqual(scenarios["ingest"]["size"], 40)
+        self.assertIn("p95_ms", scenarios["admin-changelist"])
+        self.assertEqual(scenarios["detail-warm"]["queries"], 1)
 
-        # Set up evolution chain
-        self.charizard.evolutions.add(self.charmeleon)
+        baseline = [dict(result) for result in results]
+        for result in baseline:
+            result.update(p50_ms=1.0, seconds=1.0)
+        ratios = list(compare_results(results, baseline))
+        self.assertEqual(len(ratios), len(results))
 
-    def test_pokemon_creation(self):
-        """Is pokemon `Charizard` created?"""
-        self.assertEqual(self.charizard.name, "Charizard")
-        self.assertTrue(isinstance(self.charizard, Pokemon))
-        self.assertEqual(str(self.charizard), "Charizard")
 
-    def test_pokemon_types(self):
-        """Does `Charizard` have `Fire` and `Flying` types assigned?"""
-        self.assertEqual(self.charizard.get_types(), "Fire, Flying")
+class LoadBenchCommandTests(TransactionTestCase):
+    # the benchmark reads from other threads, which would wait on the
+    # transaction of a `TestCase`
 
-    def test_pokemon_evolutions(self):
-        """Does `Charizard` have `Charmeleon` in its evolution tree/chan (and vice versa)?"""
-        self.assertEqual(self.charizard.get_evolutions_list(), ["Charmeleon"])
-        self.assertEqual(self.charmeleon.get_evolutions_list(), ["Charizard"])
+    def test_loadbench(self):
+        """Does `loadbench` request the sync and async pages?"""
+        Pokemon.objects.create(
+            image="https://example.com/charmander.jpg",
+            name="Charmander",
+            genus="Lizard Pokemon",
+            height=0.6,
+            weight=8.5,
+            flavor_text="The flame on its tail shows the strength of its life force.",
+        )
+        out = StringIO()
+        call_command("loadbench", requests=4, concurrency=2, stdout=out)
 
-    def test_pokemon_weaknesses(self):
-        """Does `Charizard` (Fire-type pokemon) have weakness to the `Water` type?"""
-        # Assuming Fire is weak to Water
-        self.fire.weaknesses.add(self.water)
-        self.assertEqual(self.charizard.get_weaknesses(), "Water")
+        for page in ["list", "details", "search"]:
+            self.assertIn(f"{page:<8} sync", out.getvalue())
+            self.assertIn(f"{page:<8} async", out.getvalue())
+        self.assertIn("SUCCESS", out.getvalue())
+
+    def test_loadbench_without_pokemon(self):
+        """Does `loadbench` refuse to run against an empty pokedex?"""
+        with self.assertRaises(CommandError):
+            call_command("loadbench", requests=4, stdout=StringIO())
 
 
 # class PokemonFormTests(TestCase):
@@ -295,7 +1744,7 @@ class PokemonViewTests(TestCase):
             "weight": 22.5,
             "flavor_text": "Often hides in water to stalk unwary prey.",
             "types": [self.water.id],
-            "evolutions": [self.charizard.id],  # Add evolution relationship
+            "evolves_from": self.charizard.id,  # Add evolution relationship
         }
         response = self.client.post(reverse("pokemon-create"), new_pokemon_data)
 
@@ -304,7 +1753,97 @@ class PokemonViewTests(TestCase):
 
         # Verify pokemon was created with evolution
         created_pokemon = Pokemon.objects.get(name="Wartortle")
-        self.assertTrue(self.charizard in created_pokemon.evolutions.all())
+        self.assertEqual(created_pokemon.evolves_from, self.charizard)
+        self.assertEqual(created_pokemon.evolution_stage, 1)
+        self.assertEqual(created_pokemon.get_evolutions_list(), ["Charizard"])
+
+    def test_pokemon_evolution_cycle(self):
+        """Is a pokemon kept from evolving from its own evolution?"""
+        self.client.login(username="testuser", password="testpass123")
+        charmeleon = Pokemon.objects.create(
+            image="https://example.com/charmeleon.jpg",
+            name="Charmeleon",
+            genus="Flame Pokemon",
+            height=1.1,
+            weight=19.0,
+            flavor_text="It has a barbaric nature.",
+            evolves_from=self.charizard,
+        )
+        form = PokemonForm(
+            instance=self.charizard,
+            data={
+                "image": self.charizard.image,
+                "name": self.charizard.name,
+                "genus": self.charizard.genus,
+                "height": self.charizard.height,
+                "weight": self.charizard.weight,
+                "flavor_text": self.charizard.flavor_text,
+                "types": [self.fire.id],
+                "evolves_from": charmeleon.id,
+            },
+        )
+
+        self.assertFalse(form.is_valid())
+        self.assertIn("evolves_from", form.errors)
+
+    def test_search_form_type_choices(self):
+        """Are the search form's types listed from the type chart, and kept current?"""
+        get_type_chart()
+        with self.assertNumQueries(0):
+            form = PokemonSearchForm({"pokemon_type": self.fire.pk})
+            self.assertTrue(form.is_valid())
+            html = form.as_p()
+        self.assertEqual(form.cleaned_data["pokemon_type"], [self.fire.pk])
+        self.assertIn(f'<option value="{self.water.pk}">Water</option>', html)
+
+        grass = Type.objects.create(name="Grass")
+        self.assertIn(
+            (grass.pk, "Grass"), PokemonSearchForm().fields["pokemon_type"].choices
+        )
+
+        response = self.client.get(
+            reverse("pokemon-list"), {"pokemon_type": self.water.pk}
+        )
+        self.assertNotIn("Charizard", b"".join(response.streaming_content).decode())
+
+    def test_pokemon_form_evolves_from_options(self):
+        """Does the pokemon form only list the pokemon it evolves from?"""
+        self.client.login(username="testuser", password="testpass123")
+        charmeleon = Pokemon.objects.create(
+            image="https://example.com/charmeleon.jpg",
+            name="Charmeleon",
+            genus="Flame Pokemon",
+            height=1.1,
+            weight=19.0,
+            flavor_text="It has a barbaric nature.",
+        )
+
+        response = self.client.get(reverse("pokemon-create"))
+        self.assertNotContains(response, "Charizard</option>")
+        self.assertContains(response, "pokepedia/autocomplete.js")
+
+        charmeleon.evolves_from = self.charizard
+        charmeleon.save()
+        response = self.client.get(
+            reverse("pokemon-update", kwargs={"pk": charmeleon.pk})
+        )
+        self.assertContains(
+            response,
+            f'<option value="{self.charizard.pk}" selected>Charizard</option>',
+            html=True,
+        )
+        self.assertContains(response, f'<option value="{self.fire.pk}">Fire</option>')
+
+    def test_pokemon_autocomplete(self):
+        """Does the autocomplete endpoint return the matching pokemon?"""
+        response = self.client.get(reverse("pokemon-autocomplete"), {"q": "chari"})
+        self.assertEqual(
+            response.json(),
+            {"results": [{"id": self.charizard.pk, "name": "Charizard"}]},
+        )
+
+        response = self.client.get(reverse("pokemon-autocomplete"))
+        self.assertEqual(response.json(), {"results": []})
 
     def test_pokemon_create_multiple_types(self):
         """Can create a pokemon with multiple types from create view?"""
@@ -384,3 +1923,907 @@ class PokemonViewTests(TestCase):
         self.client.login(username="testuser", password="testpass123")
         response = self.client.post(reverse("pokemon-delete", kwargs={"pk": 99999}))
         self.assertEqual(response.status_code, 404)
+
+
+class StubPokeAPIHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.requested.append(self.path)
+
+        try:
+            time.sleep(server.delay)
+            payload = server.routes.get(self.path.rstrip("/"))
+
+            if payload is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            if isinstance(payload, bytes):
+                body, content_type = payload, "image/png"
+            else:
+                body, content_type = json.dumps(payload).encode(), "application/json"
+            etag = f'"{hashlib.sha256(body).hexdigest()}"'
+            if self.headers.get("If-None-Match") == etag:
+                with server.lock:
+                    server.not_modified += 1
+                self.send_response(304)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubPokeAPIServer(ThreadingHTTPServer):
+    """Local PokeAPI stand-in serving `pokemon_count` generated pokemon."""
+
+    daemon_threads = True
+
+    def __init__(self, pokemon_count=151, delay=0):
+        super().__init__(("127.0.0.1", 0), StubPokeAPIHandler)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.not_modified = 0
+        self.requested = []
+        self.root_url = f"http://127.0.0.1:{self.server_port}"
+        self.base_url = f"{self.root_url}/api/v2"
+        self.routes = self._build_routes(pokemon_count)
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+    def _build_routes(self, pokemon_count):
+        base_url = self.base_url
+        routes = {
+            "/api/v2/type": {
+                "results": [
+                    {"name": name, "url": f"{base_url}/type/{name}/"}
+                    for name in ["fire", "water", "grass"]
+                ]
+            },
+        }
+
+        for name, weakness in [
+            ("fire", "water"),
+            ("water", "grass"),
+            ("grass", "fire"),
+        ]:
+            routes[f"/api/v2/type/{name}"] = {
+                "name": name,
+                "damage_relations": {
+                    "double_damage_from": [{"name": weakness}],
+                    "half_damage_from": [{"name": name}],
+                    "no_damage_from": [],
+                },
+            }
+
+        for index in range(1, pokemon_count + 1):
+            chain_id = (index - 1) // 3 + 1
+            routes[f"/api/v2/pokemon/{index}"] = {
+                "id": index,
+                "name": f"pokemon-{index}",
+                "height": index,
+                "weight": index * 10,
+                "sprites": {"front_default": f"{self.root_url}/sprites/{index}.png"},
+                "species": {"url": f"{base_url}/pokemon-species/{index}/"},
+                "types": [
+                    {"slot": 1, "type": {"name": ["fire", "water", "grass"][index % 3]}}
+                ],
+            }
+            routes[f"/sprites/{index}.png"] = f"sprite {index}".encode()
+            routes[f"/api/v2/pokemon-species/{index}"] = {
+                "genera": [
+                    {"genus": f"Genus {index}", "language": {"name": "en"}},
+                ],
+                "flavor_text_entries": [
+                    {"flavor_text": f"Entry {index}", "language": {"name": "en"}},
+                ],
+                "evolution_chain": {"url": f"{base_url}/evolution-chain/{chain_id}/"},
+            }
+
+        for chain_id in range(1, (pokemon_count - 1) // 3 + 2):
+            stages = [
+                index
+                for index in range(chain_id * 3 - 2, chain_id * 3 + 1)
+                if index <= pokemon_count
+            ]
+            chain = None
+            for index in reversed(stages):
+                chain = {
+                    "species": {"name": f"pokemon-{index}"},
+                    "evolves_to": [chain] if chain else [],
+                }
+            routes[f"/api/v2/evolution-chain/{chain_id}"] = {
+                "id": chain_id,
+                "chain": chain,
+            }
+
+        return routes
+
+
+class PokeAPIClientTests(SimpleTestCase):
+    def test_fetch_pokemon_pipeline(self):
+        """Are pokemon, species and evolution chains all retrieved, in pokedex order?"""
+        with StubPokeAPIServer(pokemon_count=9) as server:
+            with PokeAPIClient(base_url=server.base_url, concurrency=4) as client:
+                entries, chains = client.fetch_pokemon(range(1, 10))
+
+        self.assertEqual(
+            [pokemon["name"] for pokemon, species in entries],
+            [f"pokemon-{index}" for index in range(1, 10)],
+        )
+        self.assertEqual(entries[0][1]["genera"][0]["genus"], "Genus 1")
+        self.assertEqual(len(chains), 3)
+
+        # every evolution chain is only requested once
+        chain_requests = [path for path in server.requested if "evolution" in path]
+        self.assertEqual(len(chain_requests), 3)
+
+    def test_concurrency_limit(self):
+        """Are requests overlapped, but never more than `concurrency` at a time?"""
+        with StubPokeAPIServer(pokemon_count=12, delay=0.02) as server:
+            with PokeAPIClient(base_url=server.base_url, concurrency=3) as client:
+                client.fetch_pokemon(range(1, 13))
+
+        self.assertGreater(server.max_in_flight, 1)
+        self.assertLessEqual(server.max_in_flight, 3)
+
+    def test_invalid_concurrency(self):
+        """Is a concurrency below 1 rejected?"""
+        with self.assertRaises(ValueError):
+            PokeAPIClient(concurrency=0)
+
+    def test_http_error(self):
+        """Are missing resources raised as `HTTPError`?"""
+        with StubPokeAPIServer(pokemon_count=1) as server:
+            with PokeAPIClient(base_url=server.base_url) as client:
+                with self.assertRaises(HTTPError):
+                    client.fetch_pokemon([2])
+
+
+class ResponseCacheTests(SimpleTestCase):
+    def setUp(self):
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self.directory = Path(temporary_directory.name)
+
+    def test_cached_responses(self):
+        """Are fresh responses served from the cache, without any request?"""
+        with StubPokeAPIServer(pokemon_count=1) as server:
+            cache = ResponseCache(self.directory)
+            with PokeAPIClient(base_url=server.base_url, cache=cache) as client:
+                first = client.get("pokemon/1")
+                second = client.get("pokemon/1/")
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(server.requested), 1)
+
+    def test_content_addressed(self):
+        """Are identical response bodies only stored once?"""
+        cache = ResponseCache(self.directory)
+        cache.store("https://example.com/a", b'{"name": "bulbasaur"}')
+        cache.store("https://example.com/b", b'{"name": "bulbasaur"}')
+
+        self.assertEqual(len(list((self.directory / "objects").iterdir())), 1)
+        self.assertEqual(len(list((self.directory / "index").iterdir())), 2)
+
+    def test_revalidation(self):
+        """Are stale responses revalidated with their ETag?"""
+        with StubPokeAPIServer(pokemon_count=1) as server:
+            cache = ResponseCache(self.directory, ttl=0)
+            with PokeAPIClient(base_url=server.base_url, cache=cache) as client:
+                first = client.get("pokemon/1")
+                second = client.get("pokemon/1")
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(server.requested), 2)
+        self.assertEqual(server.not_modified, 1)
+
+    def test_offline(self):
+        """Do offline clients serve stale responses, and never make requests?"""
+        with StubPokeAPIServer(pokemon_count=2) as server:
+            cache = ResponseCache(self.directory, ttl=0)
+            with PokeAPIClient(base_url=server.base_url, cache=cache) as client:
+                client.get("pokemon/1")
+
+            offline_cache = ResponseCache(self.directory, ttl=0)
+            with PokeAPIClient(
+                base_url=server.base_url, cache=offline_cache, offline=True
+            ) as client:
+                self.assertEqual(client.get("pokemon/1")["name"], "pokemon-1")
+                with self.assertRaises(CacheMiss):
+                    client.get("pokemon/2")
+
+        self.assertEqual(len(server.requested), 1)
+
+    def test_snapshot_archive(self):
+        """Are responses read back from an exported snapshot archive?"""
+        cache = ResponseCache(self.directory / "cache")
+        cache.store("https://example.com/a", b'{"name": "bulbasaur"}')
+        cache.export(self.directory / "snapshot.zip")
+
+        snapshot = ResponseCache(archive=self.directory / "snapshot.zip")
+        entry = snapshot.lookup("https://example.com/a")
+        self.assertEqual(snapshot.load(entry), {"name": "bulbasaur"})
+        self.assertIsNone(snapshot.lookup("https://example.com/b"))
+        snapshot.close()
+
+
+class AddPokemonCommandTests(TestCase):
+    def setUp(self):
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self.cache_dir = Path(temporary_directory.name) / "cache"
+        self.snapshot = Path(temporary_directory.name) / "snapshot.zip"
+
+    def test_addpokemon(self):
+        """Does `addpokemon` store types, pokemon and evolutions from the API?"""
+        with StubPokeAPIServer() as server:
+            call_command(
+                "addpokemon",
+                api_url=server.base_url,
+                concurrency=4,
+                no_cache=True,
+                stdout=StringIO(),
+            )
+
+        self.assertEqual(Pokemon.objects.count(), 151)
+        self.assertEqual(Type.objects.get(name="fire").get_weaknesses(), "water")
+
+        pokemon = Pokemon.objects.get(name="pokemon-1")
+        self.assertEqual(pokemon.genus, "Genus 1")
+        self.assertEqual(pokemon.get_types(), "water")
+        self.assertEqual(
+            sorted(pokemon.get_evolutions_list()), ["pokemon-2", "pokemon-3"]
+        )
+
+    def test_addpokemon_api_error(self):
+        """Is an unreachable API reported as a `CommandError`?"""
+        with StubPokeAPIServer(pokemon_count=150) as server:
+            with self.assertRaises(CommandError):
+                call_command(
+                    "addpokemon",
+                    api_url=server.base_url,
+                    no_cache=True,
+                    stdout=StringIO(),
+                    stderr=StringIO(),
+                )
+
+    def test_addpokemon_sync(self):
+        """Does `addpokemon --sync` keep users and existing rows?"""
+        with StubPokeAPIServer() as server:
+            call_command(
+                "addpokemon", api_url=server.base_url, no_cache=True, stdout=StringIO()
+            )
+            pokemon_id = Pokemon.objects.get(name="pokemon-1").pk
+            user = User.objects.create_user(username="ash", password="pikachu123")
+
+            stdout = StringIO()
+            call_command(
+                "addpokemon",
+                api_url=server.base_url,
+                sync=True,
+                no_cache=True,
+                stdout=stdout,
+            )
+
+        self.assertIn("0 created, 0 updated, 0 deleted", stdout.getvalue())
+        self.assertTrue(User.objects.filter(pk=user.pk).exists())
+        self.assertEqual(Pokemon.objects.get(name="pokemon-1").pk, pokemon_id)
+
+    def test_addpokemon_range(self):
+        """Are only the pokemon in `--range` stored, in checkpointed batches?"""
+        stdout = StringIO()
+        with StubPokeAPIServer(pokemon_count=20) as server:
+            call_command(
+                "addpokemon",
+                api_url=server.base_url,
+                range="4-10",
+                batch_size=3,
+                no_cache=True,
+                stdout=stdout,
+            )
+
+        self.assertEqual(
+            list(
+                Pokemon.objects.order_by("pokedex_number").values_list(
+                    "name", flat=True
+                )
+            ),
+            [f"pokemon-{index}" for index in range(4, 11)],
+        )
+        self.assertIn("stored pokemon #10-#10 (7/7)", stdout.getvalue())
+        self.assertFalse(IngestionCheckpoint.objects.exists())
+
+    def test_addpokemon_generation(self):
+        """Does `--generation` select the pokemon of that generation?"""
+        with StubPokeAPIServer(pokemon_count=0) as server:
+            with self.assertRaises(CommandError):
+                call_command(
+                    "addpokemon",
+                    api_url=server.base_url,
+                    generation=[2],
+                    no_cache=True,
+                    stdout=StringIO(),
+                    stderr=StringIO(),
+                )
+
+        self.assertIn("/api/v2/pokemon/152", server.requested)
+        self.assertNotIn("/api/v2/pokemon/151", server.requested)
+
+    def test_addpokemon_invalid_range(self):
+        """Are malformed ranges rejected?"""
+        for invalid_range in ["abc", "10-1", "0-5"]:
+            with self.assertRaises(CommandError):
+                call_command("addpokemon", range=invalid_range, stdout=StringIO())
+
+    def test_addpokemon_resume(self):
+        """Does `--resume` continue after the last stored batch of a failed run?"""
+        with StubPokeAPIServer(pokemon_count=9) as server:
+            missing_route = server.routes.pop("/api/v2/pokemon/8")
+
+            with self.assertRaises(CommandError):
+                call_command(
+                    "addpokemon",
+                    api_url=server.base_url,
+                    range="1-9",
+                    batch_size=3,
+                    no_cache=True,
+                    stdout=StringIO(),
+                    stderr=StringIO(),
+                )
+
+            self.assertEqual(Pokemon.objects.count(), 6)
+            self.assertEqual(
+                IngestionCheckpoint.objects.get(selection="1-9").completed_through, 6
+            )
+
+            server.routes["/api/v2/pokemon/8"] = missing_route
+            server.requested.clear()
+            call_command(
+                "addpokemon",
+                api_url=server.base_url,
+                range="1-9",
+                batch_size=3,
+                resume=True,
+                no_cache=True,
+                stdout=StringIO(),
+            )
+
+        self.assertNotIn("/api/v2/pokemon/1", server.requested)
+        self.assertEqual(Pokemon.objects.count(), 9)
+        self.assertEqual(
+            sorted(Pokemon.objects.get(name="pokemon-7").get_evolutions_list()),
+            ["pokemon-8", "pokemon-9"],
+        )
+        self.assertFalse(IngestionCheckpoint.objects.exists())
+
+    def test_addpokemon_offline(self):
+        """Can the database be rebuilt from cached responses alone?"""
+        with StubPokeAPIServer() as server:
+            call_command(
+                "addpokemon",
+                api_url=server.base_url,
+                cache_dir=self.cache_dir,
+                stdout=StringIO(),
+            )
+            requested = len(server.requested)
+
+            call_command(
+                "addpokemon",
+                api_url=server.base_url,
+                cache_dir=self.cache_dir,
+                offline=True,
+                stdout=StringIO(),
+            )
+
+        self.assertEqual(len(server.requested), requested)
+        self.assertEqual(Pokemon.objects.count(), 151)
+
+    def test_addpokemon_offline_cache_miss(self):
+        """Does an offline run without cached data fail, keeping existing data?"""
+        Pokemon.objects.create(
+            image="https://example.com/mew.png",
+            name="mew",
+            genus="New Species Pokemon",
+            height=4,
+            weight=40,
+            flavor_text="So rare that it is still said to be a mirage.",
+        )
+
+        with self.assertRaises(CommandError):
+            call_command(
+                "addpokemon",
+                cache_dir=self.cache_dir,
+                offline=True,
+                stdout=StringIO(),
+                stderr=StringIO(),
+            )
+
+        self.assertTrue(Pokemon.objects.filter(name="mew").exists())
+
+    def test_addpokemon_snapshot(self):
+        """Can the database be rebuilt from an exported snapshot archive?"""
+        with StubPokeAPIServer() as server:
+            call_command(
+                "addpokemon",
+                api_url=server.base_url,
+                cache_dir=self.cache_dir,
+                export_snapshot=self.snapshot,
+                stdout=StringIO(),
+            )
+
+        call_command(
+            "addpokemon",
+            api_url=server.base_url,
+            cache_dir=self.cache_dir / "empty",
+            snapshot=self.snapshot,
+            offline=True,
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(Pokemon.objects.count(), 151)
+
+    def test_addpokemon_unreadable_snapshot(self):
+        """Is a missing or corrupt snapshot archive reported with its path?"""
+        self.snapshot.write_bytes(b"not a zip file")
+
+        for snapshot in [self.snapshot, self.snapshot.with_name("missing.zip")]:
+            with self.subTest(snapshot=snapshot):
+                with self.assertRaisesMessage(CommandError, str(snapshot)):
+                    call_command(
+                        "addpokemon",
+                        cache_dir=self.cache_dir,
+                        snapshot=snapshot,
+                        offline=True,
+                        stdout=StringIO(),
+                    )
+
+
+def fetch_stub_pokedex(server, pokemon_count):
+    with PokeAPIClient(base_url=server.base_url) as client:
+        type_resources = client.fetch_types()
+        entries, chains = client.fetch_pokemon(range(1, pokemon_count + 1))
+
+    pokedex = PokedexData()
+    for type_resource in type_resources:
+        pokedex.add_type(type_resource)
+    for pokemon_resource, species_resource in entries:
+        pokedex.add_pokemon(pokemon_resource, species_resource)
+    for chain_resource in chains.values():
+        pokedex.add_evolution_chain(chain_resource)
+
+    return pokedex
+
+
+class PokemonSpriteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        settings_override = override_settings(
+            POKEPEDIA_SPRITE_DIR=temporary_directory.name
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.store = SpriteStore(temporary_directory.name)
+
+    def test_download_sprites(self):
+        """Does `addpokemon --download-sprites` store each sprite once and use it?"""
+        with StubPokeAPIServer(pokemon_count=3) as server:
+            for sync in [False, True]:
+                stdout = StringIO()
+                call_command(
+                    "addpokemon",
+                    api_url=server.base_url,
+                    range="1-3",
+                    no_cache=True,
+                    sync=sync,
+                    download_sprites=True,
+                    stdout=stdout,
+                )
+
+        self.assertIn("downloaded 0 new sprite(s)", stdout.getvalue())
+        sprite_requests = [path for path in server.requested if "sprites" in path]
+        self.assertEqual(len(sprite_requests), 3)
+
+        pokemon = Pokemon.objects.get(name="pokemon-1")
+        sprite_url = reverse("pokemon-sprite", args=[pokemon.sprite])
+        self.assertContains(
+            self.client.get(reverse("pokemon-details", args=[pokemon.pk])),
+            f'src="{sprite_url}"',
+        )
+        self.assertEqual(self.client.get(sprite_url).content, b"sprite 1")
+
+        # a new image makes the stored copy outdated
+        pokemon.image = "https://example.com/1.png"
+        pokemon.save()
+        self.assertEqual(Pokemon.objects.get(pk=pokemon.pk).sprite, "")
+
+    def test_sprite_view(self):
+        """Are sprites served with long-lived validators, 304s and byte ranges?"""
+        name = self.store.store("https://example.com/1.png", b"0123456789")
+        url = reverse("pokemon-sprite", args=[name])
+
+        response = self.client.get(url)
+        self.assertEqual(response.content, b"0123456789")
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertIn("immutable", response["Cache-Control"])
+
+        response = self.client.get(url, headers={"If-None-Match": response["ETag"]})
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(url, headers={"Range": "bytes=2-5"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content, b"2345")
+        self.assertEqual(response["Content-Range"], "bytes 2-5/10")
+
+        response = self.client.get(url, headers={"Range": "bytes=-3"})
+        self.assertEqual(response.content, b"789")
+
+        response = self.client.get(url, headers={"Range": "bytes=10-"})
+        self.assertEqual(response.status_code, 416)
+
+        # without a thumbnail, e.g., without Pillow, the sprite itself is served
+        thumbnail_url = reverse("pokemon-sprite-thumbnail", args=[name])
+        self.assertEqual(self.client.get(thumbnail_url).status_code, 200)
+
+        for name in ["0" * 64 + ".png", "..", "sprite.png"]:
+            response = self.client.get(reverse("pokemon-sprite", args=[name]))
+            self.assertEqual(response.status_code, 404)
+
+
+class StorePokedexTests(TestCase):
+    def _build_pokedex(self, pokemon_count):
+        with StubPokeAPIServer(pokemon_count=pokemon_count) as server:
+            return fetch_stub_pokedex(server, pokemon_count)
+
+    def _count_store_queries(self, pokemon_count):
+        pokedex = self._build_pokedex(pokemon_count)
+
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                store_pokedex(pokedex)
+            transaction.set_rollback(True)
+
+        return len(queries)
+
+    def test_store_pokedex(self):
+        """Are types, weaknesses, pokemon and evolutions all stored?"""
+        store_pokedex(self._build_pokedex(6))
+
+        self.assertEqual(Type.objects.count(), 3)
+        self.assertEqual(Type.objects.get(name="grass").get_weaknesses(), "fire")
+        self.assertEqual(
+            list(
+                Type.objects.get(name="grass").resistances.values_list(
+                    "name", flat=True
+                )
+            ),
+            ["grass"],
+        )
+        self.assertEqual(Pokemon.objects.count(), 6)
+        self.assertEqual(Pokemon.objects.get(name="pokemon-5").get_types(), "grass")
+        self.assertEqual(
+            sorted(Pokemon.objects.get(name="pokemon-5").get_evolutions_list()),
+            ["pokemon-4", "pokemon-6"],
+        )
+
+    def test_branched_evolution_chain(self):
+        """Are the stages and branches of a chain stored in tree order?"""
+        pokedex = PokedexData()
+        for index, name in enumerate(["eevee", "vaporeon", "jolteon"], start=1):
+            pokedex.add_pokemon(
+                {
+                    "id": index,
+                    "name": name,
+                    "height": 3,
+                    "weight": 65,
+                    "sprites": {"front_default": f"https://example.com/{name}.png"},
+                    "types": [],
+                },
+                {
+                    "genera": [{"genus": "Test", "language": {"name": "en"}}],
+                    "flavor_text_entries": [
+                        {"flavor_text": "Test", "language": {"name": "en"}}
+                    ],
+                },
+            )
+
+        def get_node(name, *evolutions):
+            return {"species": {"name": name}, "evolves_to": list(evolutions)}
+
+        pokedex.add_evolution_chain(
+            {
+                "id": 67,
+                "chain": get_node("eevee", get_node("vaporeon"), get_node("jolteon")),
+            }
+        )
+        store_pokedex(pokedex)
+
+        jolteon = Pokemon.objects.get(name="jolteon")
+        self.assertEqual(jolteon.evolves_from.name, "eevee")
+        self.assertEqual(jolteon.evolution_stage, 1)
+        self.assertEqual(jolteon.evolution_chain.api_id, 67)
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                [pokemon.name for pokemon in jolteon.evolution_tree],
+                ["eevee", "vaporeon", "jolteon"],
+            )
+
+    def test_new_chain_member(self):
+        """Does a pokemon get a new version when a later batch joins its chain?"""
+        with StubPokeAPIServer(pokemon_count=3) as server:
+            pokedex = fetch_stub_pokedex(server, 3)
+
+        # pokemon-3 is stored later, and without pokemon-2 it evolves from
+        first_batch, later_batch = PokedexData(), PokedexData()
+        for batch, name in [(first_batch, "pokemon-1"), (later_batch, "pokemon-3")]:
+            pokemon = next(
+                pokemon for pokemon in pokedex.pokemon if pokemon.name == name
+            )
+            batch.add_pokemon_instance(pokemon, pokedex.pokemon_types[name])
+            batch.evolution_chains = pokedex.evolution_chains
+        store_pokedex(first_batch)
+        version = Pokemon.objects.get(name="pokemon-1").version
+
+        store_pokedex(later_batch)
+
+        pokemon = Pokemon.objects.get(name="pokemon-1")
+        self.assertGreater(pokemon.version, version)
+        self.assertEqual(
+            [evolution.name for evolution in pokemon.evolution_tree],
+            ["pokemon-1", "pokemon-3"],
+        )
+
+    def test_format_selection(self):
+        """Are pokedex numbers compacted into ranges?"""
+        self.assertEqual(format_selection([1, 2, 3, 5, 7, 8]), "1-3,5,7-8")
+
+    def test_store_pokedex_query_count(self):
+        """Is the number of queries independent of the number of pokemon?"""
+        # storing generation 1 one row at a time took 1,300+ queries; 50
+        # pokemon still fit in one insert of SQLite's backend
+        small_count = self._count_store_queries(3)
+        large_count = self._count_store_queries(50)
+
+        self.assertEqual(small_count, large_count)
+        # including the type chart revision, bumped and read back
+        self.assertLessEqual(large_count, 22)
+
+
+class SyncPokedexTests(TestCase):
+    def setUp(self):
+        self.server = StubPokeAPIServer(pokemon_count=9)
+        self.server.__enter__()
+        self.addCleanup(self.server.__exit__)
+
+        store_pokedex(fetch_stub_pokedex(self.server, 9))
+
+    def test_sync_unchanged(self):
+        """Does syncing unchanged data not write anything?"""
+        pokedex = fetch_stub_pokedex(self.server, 9)
+
+        with CaptureQueriesContext(connection) as queries:
+            changes = sync_pokedex(pokedex)
+
+        self.assertEqual(changes, {"created": 0, "updated": 0, "deleted": 0})
+        self.assertFalse(
+            [
+                query
+                for query in queries
+                if query["sql"].startswith(("INSERT", "UPDATE", "DELETE"))
+            ]
+        )
+
+    def test_sync_changes(self):
+        """Are only the new, changed and removed pokemon written?"""
+        user = User.objects.create_user(username="ash", password="pikachu123")
+        pokemon_ids = dict(Pokemon.objects.values_list("name", "pk"))
+
+        self.server.routes["/api/v2/pokemon/2"]["weight"] = 999
+        self.server.routes["/api/v2/pokemon/3"]["types"] = [
+            {"slot": 1, "type": {"name": "fire"}},
+            {"slot": 2, "type": {"name": "grass"}},
+        ]
+        self.server.routes["/api/v2/type/fire"]["damage_relations"][
+            "double_damage_from"
+        ].append({"name": "grass"})
+        Pokemon.objects.filter(name="pokemon-9").delete()
+        pokedex = fetch_stub_pokedex(self.server, 9)
+        pokedex.pokemon = [
+            pokemon for pokemon in pokedex.pokemon if pokemon.name != "pokemon-8"
+        ]
+        del pokedex.pokemon_types["pokemon-8"]
+
+        changes = sync_pokedex(pokedex)
+
+        self.assertEqual(changes, {"created": 1, "updated": 1, "deleted": 1})
+        self.assertTrue(User.objects.filter(pk=user.pk).exists())
+        self.assertEqual(Pokemon.objects.get(name="pokemon-2").weight, 999)
+        self.assertEqual(
+            Pokemon.objects.get(name="pokemon-3").get_types(), "fire, grass"
+        )
+        self.assertEqual(Type.objects.get(name="fire").get_weaknesses(), "water, grass")
+        self.assertFalse(Pokemon.objects.filter(name="pokemon-8").exists())
+        self.assertEqual(
+            Pokemon.objects.get(name="pokemon-9").get_evolutions_list(), ["pokemon-7"]
+        )
+
+        # unchanged pokemon keep their primary keys
+        self.assertEqual(
+            Pokemon.objects.get(name="pokemon-1").pk, pokemon_ids["pokemon-1"]
+        )
+
+
+class PokedexFileTests(TestCase):
+    def setUp(self):
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self.path = Path(temporary_directory.name) / "pokedex.jsonl.gz"
+
+        with StubPokeAPIServer(pokemon_count=9) as server:
+            store_pokedex(fetch_stub_pokedex(server, 9))
+
+        # an evolution made by hand, without a PokeAPI chain
+        fields = {
+            "genus": "Custom Pokemon",
+            "height": 1,
+            "weight": 1,
+            "flavor_text": "Made by hand.",
+        }
+        custom = Pokemon.objects.create(
+            image="https://example.com/custom.png", name="custom", **fields
+        )
+        Pokemon.objects.create(
+            image="https://example.com/custom-evolution.png",
+            name="custom-evolution",
+            evolves_from=custom,
+            **fields,
+        )
+        custom.types.add(Type.objects.get(name="fire"))
+
+    def get_pokedex_state(self):
+        return {
+            "pokemon": sorted(
+                Pokemon.objects.values_list(
+                    "name",
+                    "pokedex_number",
+                    "image",
+                    "genus",
+                    "weight",
+                    "evolves_from__name",
+                    "evolution_stage",
+                    "evolution_position",
+                    "type_slots",
+                    "weakness_mask",
+                )
+            ),
+            "relations": [
+                sorted(
+                    getattr(Type, field).through.objects.values_list(
+                        "from_type__name", "to_type__name"
+                    )
+                )
+                for field in ["weaknesses", "resistances", "immunities"]
+            ],
+        }
+
+    def test_export_import(self):
+        """Does importing an export restore the same pokedex, batch by batch?"""
+        state = self.get_pokedex_state()
+        call_command("exportdex", self.path, batch_size=4, stdout=StringIO())
+        Pokemon.objects.filter(name="pokemon-1").delete()
+        Type.objects.create(name="ghost")
+
+        stdout = StringIO()
+        call_command("importdex", self.path, batch_size=4, stdout=stdout)
+
+        self.assertIn("imported 11 pokemon", stdout.getvalue())
+        self.assertEqual(self.get_pokedex_state(), state)
+        self.assertFalse(Type.objects.filter(name="ghost").exists())
+        self.assertEqual(
+            set(
+                search_pokemon(Pokemon.objects.all(), "made").values_list(
+                    "name", flat=True
+                )
+            ),
+            {"custom", "custom-evolution"},
+        )
+
+    def test_import_sync(self):
+        """Does `importdex --sync` only change what differs, keeping primary keys?"""
+        call_command("exportdex", self.path, stdout=StringIO())
+        pokemon_ids = dict(Pokemon.objects.values_list("name", "pk"))
+        Pokemon.objects.filter(name="pokemon-2").update(weight=999)
+
+        call_command("importdex", self.path, sync=True, stdout=StringIO())
+
+        self.assertEqual(Pokemon.objects.get(name="pokemon-2").weight, 20)
+        self.assertEqual(dict(Pokemon.objects.values_list("name", "pk")), pokemon_ids)
+
+    def test_invalid_file(self):
+        """Is a file that is not an export rejected before anything is deleted?"""
+        self.path.write_text("not a pokedex")
+
+        with self.assertRaises(CommandError):
+            call_command("importdex", self.path, stdout=StringIO())
+
+        self.assertEqual(Pokemon.objects.count(), 11)
+
+    def test_invalid_later_batch(self):
+        """Is a file broken after its first batch rejected before anything is deleted?"""
+        call_command("exportdex", self.path, batch_size=4, stdout=StringIO())
+        with gzip.open(self.path, "at", encoding="utf-8") as dex_file:
+            dex_file.write('["move", "tackle"]\n')
+
+        with self.assertRaises(CommandError):
+            call_command("importdex", self.path, batch_size=4, stdout=StringIO())
+
+        self.assertEqual(Pokemon.objects.count(), 11)
+
+    def test_malformed_records(self):
+        """Are records of the wrong shape reported with their line, as errors?"""
+        call_command("exportdex", self.path, stdout=StringIO())
+        with gzip.open(self.path, "rt", encoding="utf-8") as dex_file:
+            header_line, *lines = dex_file.read().splitlines()
+        columns = json.loads(header_line)["pokemon_columns"]
+
+        for header_columns, line in [
+            (columns, '["pokemon"]'),
+            (columns, '["pokemon", ["short"]]'),
+            (columns, '["type", "ghost", ["weaknesses"]]'),
+            (columns, '["chain", 7, [["pokemon-1", null]]]'),
+            (columns, '{"kind": "pokemon"}'),
+            ([*columns[:-1], "moves"], lines[-1]),
+        ]:
+            with self.subTest(line=line):
+                with gzip.open(self.path, "wt", encoding="utf-8") as dex_file:
+                    header = {
+                        **json.loads(header_line),
+                        "pokemon_columns": header_columns,
+                    }
+                    dex_file.write("\n".join([json.dumps(header), *lines, line]))
+
+                with self.assertRaisesMessage(CommandError, "line "):
+                    call_command("importdex", self.path, stdout=StringIO())
+
+        self.assertEqual(Pokemon.objects.count(), 11)
+
+    def test_missing_sprites(self):
+        """Are sprites this host does not have dropped on import?"""
+        sprite_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(sprite_directory.cleanup)
+        store = SpriteStore(sprite_directory.name)
+        stored_sprite = store.store("https://example.com/stored.png", b"stored")
+        Pokemon.objects.filter(name="pokemon-1").update(sprite=stored_sprite)
+        Pokemon.objects.filter(name="pokemon-2").update(sprite="0" * 64 + ".png")
+        call_command("exportdex", self.path, stdout=StringIO())
+
+        with override_settings(POKEPEDIA_SPRITE_DIR=sprite_directory.name):
+            call_command("importdex", self.path, stdout=StringIO())
+
+        self.assertEqual(Pokemon.objects.get(name="pokemon-1").sprite, stored_sprite)
+        self.assertEqual(Pokemon.objects.get(name="pokemon-2").sprite, "")
@@ -0,0 +1,210 @@
+import random
+import threading
+import time
+from array import array
+
+from django.conf import settings
+
+# damage multiplier of each `Type` damage relation, from the defending type's side
+DAMAGE_RELATIONS = {
+    "weaknesses": 2.0,
+    "resistances": 0.5,
+    "immunities": 0.0,
+}
+# the `DexRevision` row counting the changes to types; row 1 is the
+# snapshot's, see `pokepedia.snapshot`
+TYPE_CHART_REVISION_ID = 2
+# seconds a process uses its chart before checking for changes made by others
+DEFAULT_CHECK_INTERVAL = 1.0
+
+
+class TypeChart:
+    """
+    Damage multipliers between every pair of types.
+
+    The chart is one flat `array`, with a row per defending type holding the
+    multiplier of every attacking type against it. The effectiveness against
+    a combination of types is the product of their rows.
+
+    Charts loaded from the database keep the type chart `revision` they were
+    loaded at, and when it was last checked.
+    """
+
+    def __init__(self, type_names, relations, type_ids=()):
+        self.revision = None
+        self.checked_at = time.monotonic()
+        self.type_names = list(type_names)
+        self.type_ids = list(type_ids)
+        self.type_indices = {name: index for index, name in enumerate(self.type_names)}
+        self.type_id_indices = {
+            type_id: index for index, type_id in enumerate(self.type_ids)
+        }
+
+        size = len(self.type_names)
+        self.multipliers = array("f", [1.0]) * (size * size)
+        for defending_name, attacking_name, multiplier in relations:
+            row = self.type_indices[defending_name] * size
+            self.multipliers[row + self.type_indices[attacking_name]] = multiplier
+
+    @classmethod
+    def from_database(cls):
+        from pokepedia.models import Type
+
+        # read before the types, so a change made meanwhile only means another
+        # reload
+        revision = get_type_chart_revision()
+        type_chart = cls.from_type_model(Type)
+        type_chart.revision = revision
+
+        return type_chart
+
+    @classmethod
+    def from_type_model(cls, type_model):
+        type_names = dict(type_model.objects.order_by("pk").values_list("pk", "name"))
+        relations = [
+            (type_names[defending_id], type_names[attacking_id], multiplier)
+            for field, multiplier in DAMAGE_RELATIONS.items()
+            for defending_id, attacking_id in getattr(
+                type_model, field
+            ).through.objects.values_list("from_type_id", "to_type_id")
+        ]
+
+        return cls(type_names.values(), relations, type_ids=type_names.keys())
+
+    def get_mask(self, type_names):
+        """Returns a bitmask with the bit of each type in `type_names` set."""
+        mask = 0
+        for type_name in type_names:
+            if type_name in self.type_indices:
+                mask |= 1 << self.type_indices[type_name]
+
+        return mask
+
+    def get_names(self, mask):
+        return [
+            type_name
+            for index, type_name in enumerate(self.type_names)
+            if mask & (1 << index)
+        ]
+
+    def get_row(self, defending_name):
+        size = len(self.type_names)
+        start = self.type_indices[defending_name] * size
+
+        return self.multipliers[start : start + size]
+
+    def get_multipliers(self, defending_names):
+        """Returns the multiplier of every attacking type against `defending_names`."""
+        combined = array("f", [1.0]) * len(self.type_names)
+        for defending_name in defending_names:
+            if defending_name in self.type_indices:
+                row = self.get_row(defending_name)
+                combined = array("f", map(float.__mul__, combined, row))
+
+        return combined
+
+    def get_effectiveness(self, defending_names):
+        """Returns `(type name, multiplier)` for every attacking type that is not 1x."""
+        return [
+            (name, multiplier)
+            for name, multiplier in zip(
+                self.type_names, self.get_multipliers(defending_names)
+            )
+            if multiplier != 1.0
+        ]
+
+    def get_weaknesses(self, defending_names):
+        return [
+            (name, multiplier)
+            for name, multiplier in self.get_effectiveness(defending_names)
+            if multiplier > 1.0
+        ]
+
+    def get_resistances(self, defending_names):
+        return [
+            (name, multiplier)
+            for name, multiplier in self.get_effectiveness(defending_names)
+            if 0.0 < multiplier < 1.0
+        ]
+
+    def get_immunities(self, defending_names):
+        return [
+            (name, multiplier)
+            for name, multiplier in self.get_effectiveness(defending_names)
+            if multiplier == 0.0
+        ]
+
+
+def get_type_chart_revision():
+    # None until the first change
+    from pokepedia.models import DexRevision
+
+    return (
+        DexRevision.objects.filter(pk=TYPE_CHART_REVISION_ID)
+        .values_list("revision", flat=True)
+        .first()
+    )
+
+
+def bump_type_chart_revision():
+    """
+    Records a change to the types, in the current transaction, so that other
+    processes reload their `TypeChart`.
+    """
+    from django.db import connection
+
+    from pokepedia.models import DexRevision
+
+    # a row created anew, e.g., after a flush, starts at a random value, like
+    # the snapshot's
+    table = connection.ops.quote_name(DexRevision._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (id, revision) VALUES (%s, %s) "
+            f"ON CONFLICT (id) DO UPDATE SET revision = {table}.revision + 1",
+            [TYPE_CHART_REVISION_ID, random.randrange(10**12)],
+        )
+
+
+def is_current(type_chart):
+    # checks the revision at most every `POKEPEDIA_TYPE_CHART_CHECK_INTERVAL`
+    interval = getattr(
+        settings, "POKEPEDIA_TYPE_CHART_CHECK_INTERVAL", DEFAULT_CHECK_INTERVAL
+    )
+    if time.monotonic() - type_chart.checked_at < interval:
+        return True
+    if get_type_chart_revision() != type_chart.revision:
+        return False
+
+    type_chart.checked_at = time.monotonic()
+
+    return True
+
+
+_type_chart = None
+_type_chart_lock = threading.Lock()
+
+
+def get_type_chart():
+    """
+    Returns this process's `TypeChart`, loading it on first use, and again
+    once the types were changed, by this process or another one.
+    """
+    global _type_chart
+
+    type_chart = _type_chart
+    if type_chart is None or not is_current(type_chart):
+        with _type_chart_lock:
+            if _type_chart is type_chart:
+                _type_chart = TypeChart.from_database()
+            type_chart = _type_chart
+
+    return type_chart
+
+
+def clear_type_chart(**kwargs):
+    """Discards the cached `TypeChart`; doubles as a signal receiver."""
+    global _type_chart
+
+    with _type_chart_lock:
+        _type_chart = None
@@ -1,17 +1,61 @@
+from django.conf import settings
 from django.urls import path
 
+from pokepedia.api import (
+    PokemonAPIDetailView,
+    PokemonAPIListView,
+    TypeAPIDetailView,
+    TypeAPIListView,
+)
 from pokepedia.views import (
+    AsyncPokemonDetailView,
+    AsyncPokemonListView,
+    PerformanceMetricsView,
+    PokemonAutocompleteView,
     PokemonCreateView,
     PokemonDeleteView,
     PokemonDetailView,
     PokemonListView,
+    PokemonSpriteView,
     PokemonUpdateView,
 )
 
+# the "asgi" profile serves the read-only pages with their async views
+if settings.POKEPEDIA_SERVER_PROFILE == "asgi":
+    list_view, detail_view = AsyncPokemonListView, AsyncPokemonDetailView
+else:
+    list_view, detail_view = PokemonListView, PokemonDetailView
+
 urlpatterns = [
-    path("", PokemonListView.as_view(), name="pokemon-list"),
-    path("<int:pk>", PokemonDetailView.as_view(), name="pokemon-details"),
+    path("", list_view.as_view(), name="pokemon-list"),
+    path("<int:pk>", detail_view.as_view(), name="pokemon-details"),
     path("create/", PokemonCreateView.as_view(), name="pokemon-create"),
+    path(
+        "autocomplete/",
+        PokemonAutocompleteView.as_view(),
+        name="pokemon-autocomplete",
+    ),
     path("<int:pk>/delete/", PokemonDeleteView.as_view(), name="pokemon-delete"),
     path("<int:pk>/update/", PokemonUpdateView.as_view(), name="pokemon-update"),
+    path("async/", AsyncPokemonListView.as_view(), name="async-pokemon-list"),
+    path(
+        "async/<int:pk>",
+        AsyncPokemonDetailView.as_view(),
+        name="async-pokemon-details",
+    ),
+    path("sprites/<str:name>", PokemonSpriteView.as_view(), name="pokemon-sprite"),
+    path(
+        "sprites/thumbnails/<str:name>",
+        PokemonSpriteView.as_view(thumbnail=True),
+        name="pokemon-sprite-thumbnail",
+    ),
+    path("metrics/", PerformanceMetricsView.as_view(), name="performance-metrics"),
+    path("api/pokemon/", PokemonAPIListView.as_view(), name="api-pokemon-list"),
+    path(
+        "api/pokemon/<int:pk>",
+        PokemonAPIDetailView.as_view(),
+        name="api-pokemon-details",
+    ),
+    path("api/types/", TypeAPIListView.as_view(), name="api-type-list"),
+    path("api/types/<int:pk>", TypeAPIDetailView.as_view(), name="api-type-details"),
 ]
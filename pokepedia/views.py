@@ -1,56 +1,575 @@
+import hashlib
+import mimetypes
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Count, Max, Sum
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.template import loader
 from django.urls import reverse_lazy
+from django.utils.cache import get_conditional_response
+from django.utils.decorators import method_decorator
+from django.utils.http import http_date, quote_etag
+from django.utils.safestring import mark_safe
+from django.views.decorators.http import condition
 from django.views.generic import (
     CreateView,
     DeleteView,
     DetailView,
     ListView,
+    TemplateView,
     UpdateView,
+    View,
 )
 
+from pokepedia.cache import aget_cached_pokemon, get_cached_pokemon
+from pokepedia.filters import PokemonFilter
 from pokepedia.forms import PokemonForm, PokemonSearchForm
+from pokepedia.metrics import registry as metrics_registry
 from pokepedia.models import Pokemon
+from pokepedia.search import search_pokemon
+from pokepedia.snapshot import get_snapshot, is_snapshot_enabled
+from pokepedia.sprites import SpriteStore
+
+# where the streamed pokemon are spliced into `PokemonListView`'s template
+ITEMS_MARKER = "<!-- pokemon-list-items -->"
+# stored sprites never change, as they are named after their content
+SPRITE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def get_page_etag(request, user, *state):
+    # pages greet signed in users and embed their CSRF token, both of which
+    # change with the session
+    session_key = request.session.session_key if user.is_authenticated else ""
+    key = ":".join(map(str, [*state, request.get_full_path(), session_key]))
+
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def get_list_state_aggregates():
+    # the count and the sum of versions change with deletes and with edits
+    # made within the same second
+    return {
+        "count": Count("pk"),
+        "updated_at": Max("updated_at"),
+        "versions": Sum("version"),
+    }
+
+
+def get_request_snapshot(request):
+    # the `PokedexSnapshot` a request is served from, if any, checked once
+    if not hasattr(request, "pokedex_snapshot"):
+        request.pokedex_snapshot = get_snapshot() if is_snapshot_enabled() else None
+
+    return request.pokedex_snapshot
+
+
+def get_pokemon_list_state(request):
+    # computed once per request, for both `condition()` callbacks
+    if not hasattr(request, "pokemon_list_state"):
+        snapshot = get_request_snapshot(request)
+        if snapshot is not None:
+            request.pokemon_list_state = snapshot.list_state
+        else:
+            request.pokemon_list_state = Pokemon.objects.aggregate(
+                **get_list_state_aggregates()
+            )
+
+    return request.pokemon_list_state
+
+
+def get_pokemon_list_etag(request, *args, **kwargs):
+    state = get_pokemon_list_state(request)
+
+    return get_page_etag(
+        request, request.user, state["count"], state["updated_at"], state["versions"]
+    )
+
+
+def get_pokemon_state(request, pk):
+    if not hasattr(request, "pokemon_state"):
+        snapshot = get_request_snapshot(request)
+        if snapshot is not None:
+            record = snapshot.by_id.get(pk)
+            request.pokemon_state = None
+            if record is not None:
+                request.pokemon_state = {
+                    "version": record.version,
+                    "updated_at": record.updated_at,
+                }
+        else:
+            request.pokemon_state = (
+                Pokemon.objects.filter(pk=pk).values("version", "updated_at").first()
+            )
+
+    return request.pokemon_state
+
+
+def get_pokemon_etag(request, pk):
+    state = get_pokemon_state(request, pk)
+    if state is None:
+        return None
+
+    # pk and version both repeat once the pokedex is flushed and reseeded
+    return get_page_etag(
+        request, request.user, pk, state["version"], state["updated_at"]
+    )
+
+
+def get_pokemon_last_modified(request, pk):
+    state = get_pokemon_state(request, pk)
+
+    return state["updated_at"] if state else None
+
+
+def get_search_queryset(form):
+    """
+    Returns the pokemon matching a bound `PokemonSearchForm`, in list order,
+    and whether that order is a search ranking.
+    """
+    queryset = Pokemon.objects.order_by("pk")
+    is_ranked = False
+
+    if form.is_valid():
+        pokemon_name = form.cleaned_data["pokemon_name"]
+
+        if pokemon_name:
+            queryset = search_pokemon(queryset, pokemon_name)
+            is_ranked = True
+        queryset = PokemonFilter.from_form(form).filter_queryset(queryset)
+
+    return queryset, is_ranked
+
+
+def get_snapshot_search_results(snapshot, form):
+    """
+    `get_search_queryset()` served from `snapshot`, as a `RecordSet` of
+    `PokemonRecord`s, or a list of them when ranked.
+
+    Searches by name still rank the pokemon with the search index, but only
+    read their ids from it.
+    """
+    pokemon_list = PokemonFilter().filter_records(snapshot)
+    is_ranked = False
+
+    if form.is_valid():
+        pokemon_name = form.cleaned_data["pokemon_name"]
+        pokemon_filter = PokemonFilter.from_form(form)
+
+        if pokemon_name:
+            pokemon_ids = search_pokemon(Pokemon.objects.order_by("pk"), pokemon_name)
+            pokemon_list = pokemon_filter.filter_records(
+                snapshot,
+                [
+                    snapshot.by_id[pk]
+                    for pk in pokemon_ids.values_list("pk", flat=True)
+                    if pk in snapshot.by_id
+                ],
+            )
+            is_ranked = True
+        else:
+            pokemon_list = pokemon_filter.filter_records(snapshot)
+
+    return pokemon_list, is_ranked
+
+
+def parse_after(after):
+    try:
+        return int(after)
+    except ValueError:
+        raise Http404("Invalid `after` value.")
+
+
+def get_keyset_page(pokemon_list, page_size):
+    # `pokemon_list` holds one extra row, which tells whether there is a next
+    # page without a count
+    has_next = len(pokemon_list) > page_size
+    pokemon_list = pokemon_list[:page_size]
+
+    return pokemon_list, pokemon_list[-1].pk if has_next else None
+
+
+def render_page_frame(template_names, context, request):
+    """Renders a list page without its pokemon, returning what goes around them."""
+    context["items_marker"] = mark_safe(ITEMS_MARKER)
+    template = loader.select_template(template_names)
+
+    return template.render(context, request).split(ITEMS_MARKER, 1)
+
+
+def render_item_chunks(template_name, pokemon_list, chunk_size):
+    items_template = loader.get_template(template_name)
+    chunk = []
+    is_empty = True
+    for pokemon in pokemon_list:
+        chunk.append(pokemon)
+        if len(chunk) == chunk_size:
+            yield items_template.render({"pokemon_list": chunk})
+            chunk = []
+            is_empty = False
+
+    # an empty page still renders the items template, for its "not found" text
+    if chunk or is_empty:
+        yield items_template.render({"pokemon_list": chunk})
+
+
+def parse_byte_range(header, size):
+    """
+    Returns `(start, end)`, inclusive, of a single `bytes=` range of `header`
+    over `size` bytes, `(None, None)` when the range is beyond them, or None
+    when `header` is not a single byte range.
+    """
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", header.strip())
+    if match is None or not (match[1] or match[2]):
+        return None
+
+    if match[1]:
+        start = int(match[1])
+        if match[2] and int(match[2]) < start:
+            return None
+        end = min(int(match[2]), size - 1) if match[2] else size - 1
+    else:
+        # the last bytes, e.g., `bytes=-500`
+        start, end = size - min(int(match[2]), size), size - 1
+
+    if start > end:
+        return None, None
+
+    return start, end
+
+
+def set_validators(response, etag, last_modified):
+    response.headers.setdefault("ETag", quote_etag(etag))
+    if last_modified:
+        response.headers.setdefault(
+            "Last-Modified", http_date(last_modified.timestamp())
+        )
+
+    return response
 
 
 # Create your views here.
+@method_decorator(
+    condition(etag_func=get_pokemon_list_etag),
+    name="dispatch",
+)
 class PokemonListView(ListView):
+    """
+    Lists pokemon one page at a time, either by page number (`?page=2`) or,
+    for deep pages, by keyset (`?after=<id>`), which only reads the rows of
+    the page no matter how far into the list it is.
+
+    Searches by name match whole words or their beginnings in names, genera
+    and flavor texts, and are ranked best match first; keyset pagination
+    only applies to the unranked list. Pokemon can also be filtered on their
+    types, weaknesses, resistances, height and weight, see `PokemonFilter`.
+
+    With `POKEPEDIA_SNAPSHOT`, pages are read from the `PokedexSnapshot`
+    rather than the database.
+
+    The page is streamed: the surrounding template is sent first, then the
+    pokemon a few at a time. Clients revalidating with `If-None-Match` get a
+    304 after one aggregate query when no pokemon changed. There is no
+    `Last-Modified`, as deleting a pokemon leaves the latest `updated_at` as
+    it was; the ETag covers it through the count.
+    """
+
     model = Pokemon
     context_object_name = "pokemon_list"
     template_name = "pokemon-list.html"
-
-    form = PokemonSearchForm
+    items_template_name = "pokemon-list-items.html"
+    paginate_by = 50
+    stream_chunk_size = 10
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["form"] = self.form
+        context["form"] = self.search_form
 
         return context
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        form = PokemonSearchForm(self.request.GET)
-
-        if form.is_valid():
-            pokemon_name = form.cleaned_data["pokemon_name"]
-            pokemon_type = form.cleaned_data["pokemon_type"]
-
-            if pokemon_name and pokemon_type:
-                queryset = Pokemon.objects.filter(name__icontains=pokemon_name).filter(
-                    types__name=pokemon_type
-                )
-            elif pokemon_name:
-                queryset = Pokemon.objects.filter(name__icontains=pokemon_name)
-            elif pokemon_type:
-                queryset = Pokemon.objects.filter(types__name=pokemon_type)
+        self.search_form = PokemonSearchForm(self.request.GET)
+        self.snapshot = get_request_snapshot(self.request)
+        if self.snapshot is not None:
+            pokemon_list, self.is_ranked = get_snapshot_search_results(
+                self.snapshot, self.search_form
+            )
+            return pokemon_list
+
+        queryset, self.is_ranked = get_search_queryset(self.search_form)
 
         return queryset
 
+    def paginate_queryset(self, queryset, page_size):
+        after = self.request.GET.get("after")
+        if after is None or self.is_ranked:
+            return super().paginate_queryset(queryset, page_size)
+
+        after = parse_after(after)
+        if self.snapshot is not None:
+            pokemon_list = queryset.after(after)[: page_size + 1]
+        else:
+            pokemon_list = list(queryset.filter(pk__gt=after)[: page_size + 1])
+        pokemon_list, self.next_after = get_keyset_page(pokemon_list, page_size)
+
+        return (None, None, pokemon_list, True)
+
+    def render_to_response(self, context, **response_kwargs):
+        context["next_after"] = getattr(self, "next_after", None)
+        head, tail = render_page_frame(self.get_template_names(), context, self.request)
+
+        return StreamingHttpResponse(
+            self._stream_page(head, context["pokemon_list"], tail),
+            content_type="text/html; charset=utf-8",
+            **response_kwargs,
+        )
+
+    def _stream_page(self, head, pokemon_list, tail):
+        yield head
+        yield from render_item_chunks(
+            self.items_template_name, pokemon_list, self.stream_chunk_size
+        )
+        yield tail
 
+
+@method_decorator(
+    condition(get_pokemon_etag, get_pokemon_last_modified), name="dispatch"
+)
 class PokemonDetailView(DetailView):
+    """
+    Shows a pokemon from `pokepedia.cache`, see `get_cached_pokemon()`, or
+    with `POKEPEDIA_SNAPSHOT`, from the `PokedexSnapshot`.
+
+    Conditional requests are answered from the pokemon's `version` and
+    `updated_at` alone.
+    """
+
     model = Pokemon
     context_object_name = "pokemon"
     template_name = "pokemon-details.html"
 
+    def get_object(self, queryset=None):
+        snapshot = get_request_snapshot(self.request)
+        if snapshot is not None:
+            pokemon = snapshot.by_id.get(self.kwargs["pk"])
+        else:
+            # the state the ETag was computed from, read once per request
+            state = get_pokemon_state(self.request, self.kwargs["pk"])
+            pokemon = state and get_cached_pokemon(
+                self.kwargs["pk"], state["version"], state["updated_at"]
+            )
+        if pokemon is None:
+            raise Http404("No pokemon found matching the query.")
+
+        return pokemon
+
+
+class AsyncPokemonListView(View):
+    """
+    `PokemonListView` for ASGI servers, reading the page with the async ORM.
+
+    Only validating the search form and rendering the page around the pokemon
+    run in a worker thread, as both are synchronous in Django.
+    """
+
+    template_name = PokemonListView.template_name
+    items_template_name = PokemonListView.items_template_name
+    paginate_by = PokemonListView.paginate_by
+    stream_chunk_size = PokemonListView.stream_chunk_size
+
+    async def get(self, request):
+        user = await request.auser()
+        state = await Pokemon.objects.aaggregate(**get_list_state_aggregates())
+        etag = get_page_etag(
+            request, user, state["count"], state["updated_at"], state["versions"]
+        )
+        response = get_conditional_response(request, etag=quote_etag(etag))
+        if response is not None:
+            return response
+
+        form = PokemonSearchForm(request.GET)
+        queryset, is_ranked = await sync_to_async(get_search_queryset)(form)
+        context = {
+            "form": form,
+            "user": user,
+            "page_obj": None,
+            "paginator": None,
+            "is_paginated": True,
+            "next_after": None,
+        }
+
+        after = request.GET.get("after")
+        if after is None or is_ranked:
+            page = await self.apaginate(queryset)
+            pokemon_list = page.object_list
+            context.update(
+                page_obj=page,
+                paginator=page.paginator,
+                is_paginated=page.has_other_pages(),
+            )
+        else:
+            pokemon_list, context["next_after"] = get_keyset_page(
+                [
+                    pokemon
+                    async for pokemon in queryset.filter(pk__gt=parse_after(after))[
+                        : self.paginate_by + 1
+                    ]
+                ],
+                self.paginate_by,
+            )
+        context["pokemon_list"] = pokemon_list
+
+        head, tail = await sync_to_async(render_page_frame)(
+            [self.template_name], context, request
+        )
+        response = StreamingHttpResponse(
+            self._stream_page(head, pokemon_list, tail),
+            content_type="text/html; charset=utf-8",
+        )
+
+        return set_validators(response, etag, None)
+
+    async def apaginate(self, queryset):
+        # `Paginator` with the count and the page read asynchronously
+        paginator = Paginator(queryset, self.paginate_by)
+        paginator.count = await queryset.acount()
+
+        page_number = self.request.GET.get("page") or 1
+        if page_number == "last":
+            page_number = paginator.num_pages
+        try:
+            page = paginator.page(int(page_number))
+        except (InvalidPage, ValueError):
+            raise Http404("Invalid page.")
+
+        page.object_list = [pokemon async for pokemon in page.object_list]
+
+        return page
+
+    async def _stream_page(self, head, pokemon_list, tail):
+        yield head
+        for chunk in render_item_chunks(
+            self.items_template_name, pokemon_list, self.stream_chunk_size
+        ):
+            yield chunk
+        yield tail
+
+
+class AsyncPokemonDetailView(View):
+    """`PokemonDetailView` for ASGI servers, see `aget_cached_pokemon()`."""
+
+    template_name = PokemonDetailView.template_name
+
+    async def get(self, request, pk):
+        user = await request.auser()
+        state = (
+            await Pokemon.objects.filter(pk=pk).values("version", "updated_at").afirst()
+        )
+        if state is None:
+            raise Http404("No pokemon found matching the query.")
+
+        etag = get_page_etag(request, user, pk, state["version"], state["updated_at"])
+        response = get_conditional_response(
+            request,
+            etag=quote_etag(etag),
+            last_modified=int(state["updated_at"].timestamp()),
+        )
+        if response is not None:
+            return response
+
+        pokemon = await aget_cached_pokemon(pk, state["version"], state["updated_at"])
+        if pokemon is None:
+            raise Http404("No pokemon found matching the query.")
+
+        # the template reads damage relations from the process's type chart,
+        # which checks the database for changes and may reload
+        template = loader.get_template(self.template_name)
+        content = await sync_to_async(template.render)(
+            {"pokemon": pokemon, "user": user}, request
+        )
+        response = HttpResponse(content)
+
+        return set_validators(response, etag, state["updated_at"])
+
+
+class PokemonAutocompleteView(View):
+    """
+    Returns `{"results": [{"id": ..., "name": ...}]}` for the pokemon best
+    matching `?q=`, for `PokemonAutocompleteSelect`.
+    """
+
+    limit = 20
+
+    def get(self, request):
+        query = request.GET.get("q", "").strip()
+        results = []
+        if query:
+            results = list(
+                search_pokemon(Pokemon.objects.order_by("pk"), query).values(
+                    "id", "name"
+                )[: self.limit]
+            )
+
+        return JsonResponse({"results": results})
+
+
+class PokemonSpriteView(View):
+    """
+    Serves a sprite from the `SpriteStore`, or its thumbnail when
+    `thumbnail` is set, with a year-long `Cache-Control`, an ETag and single
+    byte ranges.
+    """
+
+    thumbnail = False
+
+    def get(self, request, name):
+        path = SpriteStore(settings.POKEPEDIA_SPRITE_DIR).get_path(
+            name, thumbnail=self.thumbnail
+        )
+        if path is None:
+            raise Http404("No such sprite.")
+
+        etag = quote_etag(f"{path.parent.name}-{name}")
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={SPRITE_MAX_AGE}, immutable",
+            "Accept-Ranges": "bytes",
+        }
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            for header, value in headers.items():
+                response.headers[header] = value
+            return response
+
+        content = path.read_bytes()
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+        byte_range = None
+        if "Range" in request.headers and request.headers.get("If-Range", etag) == etag:
+            byte_range = parse_byte_range(request.headers["Range"], len(content))
+
+        if byte_range == (None, None):
+            response = HttpResponse(status=416, headers=headers)
+            response.headers["Content-Range"] = f"bytes */{len(content)}"
+            return response
+
+        if byte_range is not None:
+            start, end = byte_range
+            response = HttpResponse(
+                content[start : end + 1],
+                status=206,
+                content_type=content_type,
+                headers=headers,
+            )
+            response.headers["Content-Range"] = f"bytes {start}-{end}/{len(content)}"
+            return response
+
+        return HttpResponse(content, content_type=content_type, headers=headers)
+
 
 class PokemonCreateView(LoginRequiredMixin, CreateView):
     model = Pokemon
@@ -71,3 +590,16 @@ class PokemonDeleteView(LoginRequiredMixin, DeleteView):
     context_object_name = "pokemon"
     template_name = "pokemon-delete.html"
     success_url = reverse_lazy("pokemon-list")
+
+
+@method_decorator(staff_member_required, name="dispatch")
+class PerformanceMetricsView(TemplateView):
+    """Shows this process's request metrics, see `RequestMetricsMiddleware`."""
+
+    template_name = "performance-metrics.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["metrics"] = metrics_registry.as_dict()
+
+        return context